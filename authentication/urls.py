@@ -11,6 +11,7 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('dashboard/', views.dashboard_view, name='dashboard'),
+    path('dashboard/live/', views.dashboard_live_view, name='dashboard_live'),
     
     # User Management URLs
     path('users/', views.users_list_view, name='users_list'),
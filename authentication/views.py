@@ -9,11 +9,13 @@ from django.views.decorators.csrf import csrf_protect
 from django.db.models import Count, Q
 from django.core.paginator import Paginator
 from django.utils import timezone
-from core.models import ItemsGroup, Item, PriceList, Store, StoreGroup, CustomerVendor, InvoiceMaster
+from core.models import Item, CustomerVendor, InvoiceMaster
+from core import agent_auth, counters, live
+from core.partitioning import created_in_range
 from .forms import CustomUserCreationForm, CustomUserEditForm
 
 # API imports
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.hashers import check_password
 import json
@@ -76,25 +78,25 @@ def dashboard_view(request):
     Dashboard page showing system overview
     Requires user authentication
     """
-    # Get statistics for dashboard
+    # Get statistics for dashboard (one read of the counter table kept by core.counters)
     try:
-        items_groups_count = ItemsGroup.objects.filter(isDeleted=False).count()
-        items_count = Item.objects.filter(isDeleted=False).count()
-        price_lists_count = PriceList.objects.filter(isDeleted=False).count()
-        store_groups_count = StoreGroup.objects.filter(isDeleted=False).count()
-        stores_count = Store.objects.filter(isDeleted=False).count()
+        counts = counters.dashboard_counts()
+        items_groups_count = counts['items_groups']
+        items_count = counts['items']
+        price_lists_count = counts['price_lists']
+        store_groups_count = counts['store_groups']
+        stores_count = counts['stores']
         
         # Customer and vendor counts
-        customers_count = CustomerVendor.objects.filter(isDeleted=False, type__in=[1, 3]).count()
-        vendors_count = CustomerVendor.objects.filter(isDeleted=False, type__in=[2, 3]).count()
+        customers_count = counts['customers']
+        vendors_count = counts['vendors']
         
         # Invoice counts by type
-        from core.models import InvoiceMaster
-        purchase_invoices_count = InvoiceMaster.objects.filter(isDeleted=False, invoiceType=1).count()
-        sales_invoices_count = InvoiceMaster.objects.filter(isDeleted=False, invoiceType=2).count()
-        return_purchase_invoices_count = InvoiceMaster.objects.filter(isDeleted=False, invoiceType=3).count()
-        return_sales_invoices_count = InvoiceMaster.objects.filter(isDeleted=False, invoiceType=4).count()
-        total_invoices_count = InvoiceMaster.objects.filter(isDeleted=False).count()
+        purchase_invoices_count = counts['purchase_invoices']
+        sales_invoices_count = counts['sales_invoices']
+        return_purchase_invoices_count = counts['return_purchase_invoices']
+        return_sales_invoices_count = counts['return_sales_invoices']
+        total_invoices_count = counts['total_invoices']
         
     except Exception as e:
         # In case of database issues, set counts to 0
@@ -136,6 +138,9 @@ def dashboard_view(request):
         'visit_plans': is_superuser or is_admin or (not is_store_keeper and True),        # خطط الزيارات
         'inventory': is_superuser or is_admin or is_store_keeper,                          # إدارة المخزون
         'users_manage': is_superuser or is_admin or (not is_store_keeper and True),       # إدارة المستخدمين
+        
+        # Live KPIs
+        'live_kpis': is_superuser or is_admin or (not is_store_keeper and True),          # مؤشرات اليوم
     }
     
     context = {
@@ -159,6 +164,21 @@ def dashboard_view(request):
     return render(request, 'authentication/dashboard.html', context)
 
 
+@login_required
+def dashboard_live_view(request):
+    """
+    Server-sent events with today's KPIs per agent (sales, returns, vouchers, visits).
+    Pushed whenever postings commit; see core.live
+    """
+    response = StreamingHttpResponse(
+        live.stream(request.headers.get('Last-Event-ID')),
+        content_type='text/event-stream; charset=utf-8',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 def index_view(request):
     """
     Index page - redirects to login if not authenticated, dashboard if authenticated
@@ -559,10 +579,8 @@ def agent_detail_view(request, agent_id):
     # Type 1: Receipt vouchers (customer payments for sales)
     # Type 2: Payment vouchers (agent payments for returns) - only cash/bank accounts
     # Exclude customer account entries which are just accounting records
-    from core.models import Account
-    cash_bank_accounts = Account.objects.filter(
-        accountName__in=['Store Cash', 'Main Bank', 'Cash', 'Bank']
-    ).values_list('id', flat=True)
+    from core import accounts
+    cash_bank_accounts = accounts.cash_bank_ids()
     
     query = Q(agentID=agent) & Q(isDeleted=False) & Q(accountID__in=cash_bank_accounts)
     
@@ -577,14 +595,14 @@ def agent_detail_view(request, agent_id):
     if date_from:
         try:
             date_from_parsed = datetime.strptime(date_from, '%Y-%m-%d').date()
-            query &= Q(createdAt__date__gte=date_from_parsed)
+            query &= created_in_range(date_from=date_from_parsed)
         except ValueError:
             messages.warning(request, 'تاريخ البداية غير صحيح')
     
     if date_to:
         try:
             date_to_parsed = datetime.strptime(date_to, '%Y-%m-%d').date()
-            query &= Q(createdAt__date__lte=date_to_parsed)
+            query &= created_in_range(date_to=date_to_parsed)
         except ValueError:
             messages.warning(request, 'تاريخ النهاية غير صحيح')
     
@@ -823,15 +841,16 @@ def agent_login_api(request):
         
         # Check password
         if check_password(password, agent.agentPassword):
-            # Generate simple token (agent ID as token for simplicity)
-            token = str(agent.id)
+            # Signed access/refresh tokens (see core.agent_auth); 'token' is the access token
+            tokens = agent_auth.issue_tokens(agent)
             
             return JsonResponse({
                 'success': True,
                 'message': 'Login successful',
                 'id': agent.id,
                 'name': agent.agentName,
-                'token': token,
+                'token': tokens['access_token'],
+                **tokens,
                 'storeID': agent.storeID.id if agent.storeID else None
             })
         else:
@@ -968,14 +987,14 @@ def agent_invoices_filtered_api(request):
         if date_from:
             try:
                 date_from_parsed = datetime.strptime(date_from, '%Y-%m-%d').date()
-                query &= Q(createdAt__date__gte=date_from_parsed)
+                query &= created_in_range(date_from=date_from_parsed)
             except ValueError:
                 pass
         
         if date_to:
             try:
                 date_to_parsed = datetime.strptime(date_to, '%Y-%m-%d').date()
-                query &= Q(createdAt__date__lte=date_to_parsed)
+                query &= created_in_range(date_to=date_to_parsed)
             except ValueError:
                 pass
         
@@ -1083,10 +1102,8 @@ def agent_transactions_filtered_api(request):
         # Type 1: Receipt vouchers (customer payments for sales)
         # Type 2: Payment vouchers (agent payments for returns) - only cash/bank accounts
         # Exclude customer account entries which are just accounting records
-        from core.models import Account
-        cash_bank_accounts = Account.objects.filter(
-            accountName__in=['Store Cash', 'Main Bank', 'Cash', 'Bank']
-        ).values_list('id', flat=True)
+        from core import accounts
+        cash_bank_accounts = accounts.cash_bank_ids()
         
         query = Q(agentID=agent) & Q(isDeleted=False) & Q(accountID__in=cash_bank_accounts)
         
@@ -1098,14 +1115,14 @@ def agent_transactions_filtered_api(request):
         if date_from:
             try:
                 date_from_parsed = datetime.strptime(date_from, '%Y-%m-%d').date()
-                query &= Q(createdAt__date__gte=date_from_parsed)
+                query &= created_in_range(date_from=date_from_parsed)
             except ValueError:
                 pass
         
         if date_to:
             try:
                 date_to_parsed = datetime.strptime(date_to, '%Y-%m-%d').date()
-                query &= Q(createdAt__date__lte=date_to_parsed)
+                query &= created_in_range(date_to=date_to_parsed)
             except ValueError:
                 pass
         
@@ -1128,8 +1145,8 @@ def agent_transactions_filtered_api(request):
         # Filter for cash/payment transactions only (receipts and payments)
         payment_transactions = []
         for transaction in all_transactions:
-            # Include cash account transactions (Account ID 35 = Cash, 10 = Bank/Visa)
-            if transaction.accountID and transaction.accountID.id in [35, 10]:
+            # Include cash and bank/visa account transactions
+            if transaction.accountID_id in cash_bank_accounts:
                 # For receipt vouchers (type 1): positive amounts in cash accounts
                 # For payment vouchers (type 2): negative amounts in cash accounts
                 if ((transaction_type == '1' and transaction.amount > 0) or 
@@ -1175,53 +1192,23 @@ def agent_transactions_filtered_api(request):
 
 def get_agent_basic_auth(request):
     """
-    Helper function to handle Basic Auth for Agent model
+    Helper function to authenticate the agent of an API request
+    (Bearer token from agent login, or Basic Auth with agent credentials; see core.agent_auth)
     Returns tuple (agent, error_response)
     If authentication successful: returns (agent, None)
     If authentication failed: returns (None, JsonResponse)
     """
-    import base64
-    from django.contrib.auth.hashers import check_password
-    from core.models import Agent
-
-    auth_header = request.META.get('HTTP_AUTHORIZATION')
-    if not auth_header or not auth_header.startswith('Basic '):
-        return None, JsonResponse({
-            'success': False,
-            'message': 'Authentication credentials were not provided.'
-        }, status=401, headers={'WWW-Authenticate': 'Basic realm="Agent API"'})
-
     try:
-        encoded_credentials = auth_header.split(' ')[1]
-        decoded_credentials = base64.b64decode(encoded_credentials).decode('utf-8')
-        username, password = decoded_credentials.split(':', 1)
-    except Exception:
-        return None, JsonResponse({
+        return agent_auth.authenticate(request), None
+    except agent_auth.AgentAuthenticationError as error:
+        response = JsonResponse({
             'success': False,
-            'message': 'Invalid authentication credentials.'
-        }, status=401, headers={'WWW-Authenticate': 'Basic realm="Agent API"'})
-
-    try:
-        agent = Agent.objects.get(agentUsername=username, isDeleted=False)
-    except Agent.DoesNotExist:
-        return None, JsonResponse({
-            'success': False,
-            'message': 'Invalid username or password.'
-        }, status=401, headers={'WWW-Authenticate': 'Basic realm="Agent API"'})
-
-    if not agent.isActive:
-        return None, JsonResponse({
-            'success': False,
-            'message': 'Agent account is inactive.'
-        }, status=403)
-
-    if not check_password(password, agent.agentPassword):
-        return None, JsonResponse({
-            'success': False,
-            'message': 'Invalid username or password.'
-        }, status=401, headers={'WWW-Authenticate': 'Basic realm="Agent API"'})
-
-    return agent, None
+            'error': error.code,
+            'message': error.message
+        }, status=error.http_status)
+        if error.http_status == 401:
+            response['WWW-Authenticate'] = 'Bearer realm="Agent API"'
+        return None, response
 
 
 @csrf_exempt
@@ -0,0 +1,157 @@
+"""
+Registry of well-known accounts.
+Resolves the accounts that posting and reporting code depend on (cash, bank/visa,
+customers and vendors control accounts) from settings.WELL_KNOWN_ACCOUNTS.
+The accounts are loaded once per worker process and kept while a shared accounts version
+(see core/versions.py) is unchanged; any Account save or delete bumps it, so every worker
+reloads them on its next lookup.
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+from . import versions
+from .models import Account
+
+logger = logging.getLogger(__name__)
+
+CASH = 'CASH'
+VISA = 'VISA'
+CUSTOMERS_DEFERRED = 'CUSTOMERS_DEFERRED'
+VENDORS_PAYABLE = 'VENDORS_PAYABLE'
+VENDORS_DEFERRED = 'VENDORS_DEFERRED'
+
+# Accounts that represent money in hand (used to tell vouchers apart from control entries)
+CASH_BANK_KEYS = (CASH, VISA)
+
+DEFAULT_ACCOUNTS = {
+    CASH: 35,
+    VISA: 10,
+    CUSTOMERS_DEFERRED: 36,
+    VENDORS_PAYABLE: 37,
+    VENDORS_DEFERRED: 38,
+}
+
+VERSION_KEY = 'accounts:version'
+
+_lock = threading.Lock()
+# (accounts version, {key: Account})
+_accounts = None
+
+
+def configured_ids():
+    """Return the key -> account ID mapping from settings, validated for shape."""
+    mapping = dict(DEFAULT_ACCOUNTS)
+    mapping.update(getattr(settings, 'WELL_KNOWN_ACCOUNTS', {}))
+
+    unknown = set(mapping) - set(DEFAULT_ACCOUNTS)
+    if unknown:
+        raise ImproperlyConfigured(
+            f'WELL_KNOWN_ACCOUNTS has unknown keys: {", ".join(sorted(unknown))}'
+        )
+    for key, account_id in mapping.items():
+        if not isinstance(account_id, int) or account_id <= 0:
+            raise ImproperlyConfigured(
+                f'WELL_KNOWN_ACCOUNTS[{key!r}] must be a positive account ID, got {account_id!r}'
+            )
+    return mapping
+
+
+def _load():
+    mapping = configured_ids()
+    found = Account.objects.filter(id__in=set(mapping.values()), isDeleted=False).in_bulk()
+    missing = {key: account_id for key, account_id in mapping.items() if account_id not in found}
+    if missing:
+        logger.error(f'Well-known accounts not found: {missing}')
+    return {key: found[account_id] for key, account_id in mapping.items() if account_id in found}
+
+
+def _registry():
+    global _accounts
+    version = versions.get(VERSION_KEY)
+    loaded = _accounts
+    if loaded is None or loaded[0] != version:
+        with _lock:
+            if _accounts is None or _accounts[0] != version:
+                _accounts = (version, _load())
+            loaded = _accounts
+    return loaded[1]
+
+
+def invalidate():
+    """
+    Drop the cached accounts; the next lookup reloads them from the database, in this worker
+    now and in the others once the current transaction commits.
+    """
+    global _accounts
+    with _lock:
+        _accounts = None
+    versions.bump_on_commit(VERSION_KEY)
+
+
+def get(key):
+    """Return the Account configured for a well-known key."""
+    try:
+        return _registry()[key]
+    except KeyError:
+        raise Account.DoesNotExist(
+            f'Account {key} (ID {configured_ids().get(key)}) not found'
+        )
+
+
+def get_id(key):
+    """Return the configured account ID for a well-known key without touching the database."""
+    return configured_ids()[key]
+
+
+def by_id(account_id):
+    """
+    Return an active Account by ID, served from the registry when it is a well-known account.
+    Falls back to a database lookup for any other account.
+    """
+    account_id = int(account_id)
+    for account in _registry().values():
+        if account.id == account_id:
+            return account
+    return Account.objects.get(id=account_id, isDeleted=False)
+
+
+def cash_bank_ids():
+    """IDs of the cash and bank accounts used by receipt/payment vouchers."""
+    mapping = configured_ids()
+    return [mapping[key] for key in CASH_BANK_KEYS]
+
+
+def missing_accounts():
+    """Return {key: account_id} for configured accounts that do not exist in the database."""
+    mapping = configured_ids()
+    existing = set(
+        Account.objects.filter(id__in=set(mapping.values()), isDeleted=False).values_list('id', flat=True)
+    )
+    return {key: account_id for key, account_id in mapping.items() if account_id not in existing}
+
+
+@checks.register(checks.Tags.database)
+def check_well_known_accounts(app_configs=None, databases=None, **kwargs):
+    """System check (run by migrate and `check --database`) that every configured account exists."""
+    if not databases or 'default' not in databases:
+        return []
+    if Account._meta.db_table not in connection.introspection.table_names():
+        return []  # Not migrated yet
+    try:
+        missing = missing_accounts()
+    except Exception as e:
+        return [checks.Warning(f'Could not verify well-known accounts: {e}', id='core.W001')]
+    return [
+        checks.Warning(
+            f'Well-known account {key} points to account ID {account_id}, which does not exist',
+            hint='Create the account or set WELL_KNOWN_ACCOUNTS in settings',
+            id='core.W002',
+        )
+        for key, account_id in missing.items()
+    ]
@@ -3,8 +3,10 @@ Django admin configuration for core models.
 Provides comprehensive admin interface for all models with proper filtering, search, and inline editing.
 """
 
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from .models import *
+from . import periods, report_runner
 from .inlines import InvoiceDetailInline, PriceListDetailInline
 
 
@@ -195,6 +197,105 @@ class AccountAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(AccountDailyBalance)
+class AccountDailyBalanceAdmin(admin.ModelAdmin):
+    """Read-only admin interface for the per-day account aggregates maintained from transactions."""
+    list_display = ['accountID', 'day', 'debit', 'credit', 'transactionCount', 'updatedAt']
+    list_filter = ['accountID', 'day']
+    date_hierarchy = 'day'
+    ordering = ['-day', 'accountID']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class ClosedPeriodForm(forms.ModelForm):
+    """Add form for closing the next month; validates the month before it is closed."""
+
+    class Meta:
+        model = ClosedPeriod
+        fields = ['periodEnd', 'notes']
+
+    def clean_periodEnd(self):
+        period_end = self.cleaned_data['periodEnd']
+        periods.validate_period_end(period_end)
+        return period_end
+
+
+class BalanceSnapshotInline(admin.TabularInline):
+    """Read-only list of the balances stored when a period was closed."""
+    model = BalanceSnapshot
+    fields = ['kind', 'accountID', 'customerVendorID', 'agentID', 'debit', 'credit', 'transactionCount', 'lastTransactionAt']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ClosedPeriod)
+class ClosedPeriodAdmin(admin.ModelAdmin):
+    """Admin interface for closing months and reopening the latest closed month."""
+    form = ClosedPeriodForm
+    list_display = ['periodEnd', 'notes', 'createdBy', 'createdAt']
+    ordering = ['-periodEnd']
+    inlines = [BalanceSnapshotInline]
+    actions = ['reopen_latest']
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj:
+            return ['periodEnd', 'notes', 'createdBy', 'createdAt']
+        return []
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        """Close the month through core.periods so its balance snapshots are stored."""
+        closed = periods.close_period(obj.periodEnd, user=request.user, notes=obj.notes)
+        obj.pk = closed.pk
+        obj._state.adding = False
+
+    def get_inlines(self, request, obj):
+        return self.inlines if obj else []
+
+    @admin.action(description='Reopen the latest closed period')
+    def reopen_latest(self, request, queryset):
+        latest = periods.latest_period()
+        if latest is None or not queryset.filter(pk=latest.pk).exists():
+            self.message_user(request, 'Only the latest closed period can be reopened', level=messages.ERROR)
+            return
+        periods.reopen_latest_period()
+        self.message_user(request, f'Reopened the period ending {latest.periodEnd}')
+
+
+@admin.register(ReportRun)
+class ReportRunAdmin(admin.ModelAdmin):
+    """Admin interface for background report runs; runs are submitted from the reports pages."""
+    list_display = ['id', 'reportName', 'status', 'outputFormat', 'rowCount', 'durationSeconds', 'createdBy', 'createdAt']
+    list_filter = ['status', 'reportName', 'outputFormat']
+    readonly_fields = ['reportName', 'parameters', 'outputFormat', 'status', 'resultFile', 'rowCount', 'startedAt',
+                       'finishedAt', 'durationSeconds', 'errorMessage', 'cancelRequested', 'workerPid',
+                       'createdBy', 'createdAt']
+    ordering = ['-createdAt']
+    actions = ['cancel_runs']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Cancel selected queued or running reports')
+    def cancel_runs(self, request, queryset):
+        cancelled = sum(report_runner.cancel(run) for run in queryset)
+        self.message_user(request, f'Cancellation requested for {cancelled} report(s)')
+
+
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     """Admin interface for Transaction model with comprehensive filtering and management."""
@@ -0,0 +1,139 @@
+"""
+Agent authentication for the mobile API.
+Login issues an HMAC-signed, expiring access token and a longer-lived refresh token
+(django.core.signing, keyed on SECRET_KEY). Requests send `Authorization: Bearer <access token>`;
+verifying it costs one signature check and one agent lookup instead of a password hash.
+Tokens carry a fingerprint of the agent's password hash, so changing the password revokes them,
+and they stop working as soon as the agent is deactivated or deleted.
+HTTP Basic Auth with the agent's username and password is still accepted.
+"""
+
+import base64
+from functools import wraps
+
+from django.conf import settings
+from django.core import signing
+from django.utils.crypto import constant_time_compare, salted_hmac
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Agent
+
+ACCESS_SALT = 'core.agent_auth.access'
+REFRESH_SALT = 'core.agent_auth.refresh'
+
+
+class AgentAuthenticationError(Exception):
+    """Authentication failed; carries the API error code, message and HTTP status."""
+
+    def __init__(self, code, message, http_status=status.HTTP_401_UNAUTHORIZED):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.http_status = http_status
+
+
+def _fingerprint(agent):
+    """Short HMAC of the stored password hash; changes whenever the password does."""
+    return salted_hmac('core.agent_auth.fingerprint', agent.agentPassword).hexdigest()[:20]
+
+
+def _sign(agent, salt):
+    return signing.dumps({'a': agent.pk, 'f': _fingerprint(agent)}, salt=salt, compress=True)
+
+
+def issue_tokens(agent):
+    """Access and refresh tokens for a freshly authenticated agent."""
+    return {
+        'access_token': _sign(agent, ACCESS_SALT),
+        'refresh_token': _sign(agent, REFRESH_SALT),
+        'token_type': 'Bearer',
+        'expires_in': settings.AGENT_ACCESS_TOKEN_SECONDS,
+    }
+
+
+def _verify(token, salt, max_age):
+    try:
+        payload = signing.loads(token, salt=salt, max_age=max_age)
+    except signing.SignatureExpired:
+        raise AgentAuthenticationError('TOKEN_EXPIRED', 'Token has expired')
+    except signing.BadSignature:
+        raise AgentAuthenticationError('INVALID_TOKEN', 'Invalid token')
+
+    agent = Agent.objects.filter(pk=payload.get('a'), isDeleted=False).select_related('storeID').first()
+    if agent is None or not constant_time_compare(payload.get('f', ''), _fingerprint(agent)):
+        raise AgentAuthenticationError('INVALID_TOKEN', 'Invalid token')
+    if not agent.isActive:
+        raise AgentAuthenticationError('AGENT_INACTIVE', 'Agent account is inactive', status.HTTP_403_FORBIDDEN)
+    return agent
+
+
+def verify_access_token(token):
+    """Agent an access token belongs to; raises AgentAuthenticationError."""
+    return _verify(token, ACCESS_SALT, settings.AGENT_ACCESS_TOKEN_SECONDS)
+
+
+def verify_refresh_token(token):
+    """Agent a refresh token belongs to; raises AgentAuthenticationError."""
+    return _verify(token, REFRESH_SALT, settings.AGENT_REFRESH_TOKEN_SECONDS)
+
+
+def check_credentials(username, password):
+    """Agent for a username and password (hashes the password); raises AgentAuthenticationError."""
+    agent = Agent.objects.filter(agentUsername=username, isDeleted=False).select_related('storeID').first()
+    if not agent or not agent.check_password(password):
+        raise AgentAuthenticationError('INVALID_CREDENTIALS', 'Invalid agent credentials')
+    if not agent.isActive:
+        raise AgentAuthenticationError('AGENT_INACTIVE', 'Agent account is inactive', status.HTTP_403_FORBIDDEN)
+    return agent
+
+
+def authenticate(request):
+    """
+    Agent for a request's Authorization header (Bearer token or Basic credentials).
+    Raises AgentAuthenticationError.
+    """
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    scheme, _, credentials = auth_header.partition(' ')
+    scheme = scheme.lower()
+    if scheme == 'bearer' and credentials:
+        return verify_access_token(credentials.strip())
+    if scheme == 'basic' and credentials:
+        try:
+            decoded = base64.b64decode(credentials.strip()).decode('utf-8')
+            username, password = decoded.split(':', 1)
+        except (ValueError, UnicodeDecodeError):
+            raise AgentAuthenticationError('INVALID_CREDENTIALS', 'Invalid authentication credentials')
+        return check_credentials(username, password)
+    raise AgentAuthenticationError(
+        'AUTHENTICATION_REQUIRED',
+        'Agent authentication required. Use a Bearer token from agent login or Basic Auth with agent credentials.',
+    )
+
+
+def error_response(error):
+    """DRF response for an AgentAuthenticationError."""
+    response = Response({
+        'success': False,
+        'error': error.code,
+        'message': error.message,
+    }, status=error.http_status)
+    if error.http_status == status.HTTP_401_UNAUTHORIZED:
+        response['WWW-Authenticate'] = 'Bearer realm="Agent API"'
+    return response
+
+
+def agent_authentication_required(view_func):
+    """
+    Decorator for agent API views: authenticates the request (Bearer token or Basic Auth)
+    and sets request.agent, or answers 401/403.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        try:
+            request.agent = authenticate(request)
+        except AgentAuthenticationError as error:
+            return error_response(error)
+        return view_func(request, *args, **kwargs)
+
+    return _wrapped_view
@@ -0,0 +1,171 @@
+"""
+Receivables aging.
+Buckets the outstanding amount of open sales invoices per customer by invoice age
+(0-30, 31-60, 61-90 and 90+ days) in a single grouped query, and caches the result per day
+in the shared report cache.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import accounts, report_cache
+from .constants import INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_SALES, STATUS_UNPAID, STATUS_PARTIALLY_PAID
+from .ledger import day_bounds
+
+ZERO = Decimal('0')
+BUCKETS = ('current', 'days_31_60', 'days_61_90', 'over_90')
+CACHE_PREFIX = 'receivables_aging'
+
+# Open sales invoices are reduced by customer credits that are not tied to an invoice
+# (voucher receipts and unrefunded sales returns), allocated oldest invoice first.
+AGING_SQL = '''
+    WITH open_invoices AS (
+        SELECT im.id,
+               im."customerOrVendorID_id" AS customer_id,
+               im."agentID" AS agent_id,
+               im."createdAt" AS created_at,
+               GREATEST(COALESCE(im."netTotal", 0) - COALESCE(im."totalPaid", 0), 0) AS due
+        FROM "invoiceMaster" im
+        WHERE im."invoiceType" = %(sales)s
+          AND im.status IN (%(unpaid)s, %(partially_paid)s)
+          AND im."isDeleted" = FALSE
+          AND im."customerOrVendorID_id" IS NOT NULL
+          {customer_filter}
+    ),
+    credits AS (
+        SELECT customer_id, SUM(amount) AS unapplied
+        FROM (
+            SELECT t."customerVendorID_id" AS customer_id, t.amount
+            FROM transactions t
+            WHERE t.type = 1
+              AND t."invoiceID_id" IS NULL
+              AND t."accountID_id" = ANY(%(cash_bank)s)
+              AND t.amount > 0
+              AND t."isDeleted" = FALSE
+              AND t."customerVendorID_id" IN (SELECT customer_id FROM open_invoices)
+            UNION ALL
+            SELECT r."customerOrVendorID_id", COALESCE(r."netTotal", 0) - COALESCE(r."totalPaid", 0)
+            FROM "invoiceMaster" r
+            WHERE r."invoiceType" = %(return_sales)s
+              AND r.status IN (%(unpaid)s, %(partially_paid)s)
+              AND r."isDeleted" = FALSE
+              AND r."customerOrVendorID_id" IN (SELECT customer_id FROM open_invoices)
+        ) c
+        GROUP BY customer_id
+    ),
+    allocated AS (
+        SELECT o.customer_id,
+               o.agent_id,
+               o.created_at,
+               LEAST(
+                   o.due,
+                   GREATEST(
+                       SUM(o.due) OVER (PARTITION BY o.customer_id ORDER BY o.created_at, o.id)
+                       - COALESCE(c.unapplied, 0),
+                       0
+                   )
+               ) AS remaining
+        FROM open_invoices o
+        LEFT JOIN credits c ON c.customer_id = o.customer_id
+    )
+    SELECT a.customer_id,
+           cv."customerVendorName",
+           COALESCE(SUM(a.remaining) FILTER (WHERE a.created_at >= %(day_30)s), 0),
+           COALESCE(SUM(a.remaining) FILTER (WHERE a.created_at < %(day_30)s AND a.created_at >= %(day_60)s), 0),
+           COALESCE(SUM(a.remaining) FILTER (WHERE a.created_at < %(day_60)s AND a.created_at >= %(day_90)s), 0),
+           COALESCE(SUM(a.remaining) FILTER (WHERE a.created_at < %(day_90)s), 0),
+           SUM(a.remaining),
+           COUNT(*),
+           MIN(a.created_at)
+    FROM allocated a
+    JOIN "customerVendor" cv ON cv.id = a.customer_id
+    WHERE a.remaining > 0
+      {agent_filter}
+    GROUP BY a.customer_id, cv."customerVendorName"
+    ORDER BY SUM(a.remaining) DESC
+'''
+
+
+def receivables_aging(as_of=None, agent_id=None, customer_ids=None):
+    """
+    Outstanding receivables per customer bucketed by invoice age on `as_of` (default today).
+
+    agent_id limits the result to invoices created by that agent; customer_ids (e.g. the
+    customers of a visit plan) limits the customers considered. Customer credits are always
+    allocated across all of the customer's open invoices before the agent filter applies.
+    Returns a list of row dicts sorted by total outstanding, largest first.
+    """
+    as_of = as_of or timezone.localdate()
+    params = {
+        'sales': INVOICE_TYPE_SALES,
+        'return_sales': INVOICE_TYPE_RETURN_SALES,
+        'unpaid': STATUS_UNPAID,
+        'partially_paid': STATUS_PARTIALLY_PAID,
+        'cash_bank': accounts.cash_bank_ids(),
+        # Age is counted in whole local days: invoices from the last 30 days are current
+        'day_30': day_bounds(as_of - timedelta(days=30))[0],
+        'day_60': day_bounds(as_of - timedelta(days=60))[0],
+        'day_90': day_bounds(as_of - timedelta(days=90))[0],
+    }
+
+    customer_filter = ''
+    if customer_ids is not None:
+        customer_filter = 'AND im."customerOrVendorID_id" = ANY(%(customer_ids)s)'
+        params['customer_ids'] = [int(customer_id) for customer_id in customer_ids]
+
+    agent_filter = ''
+    if agent_id:
+        agent_filter = 'AND a.agent_id = %(agent_id)s'
+        params['agent_id'] = int(agent_id)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            AGING_SQL.format(customer_filter=customer_filter, agent_filter=agent_filter),
+            params
+        )
+        result = cursor.fetchall()
+
+    rows = []
+    for row in result:
+        rows.append({
+            'customer_id': row[0],
+            'customer_name': row[1],
+            'current': row[2],
+            'days_31_60': row[3],
+            'days_61_90': row[4],
+            'over_90': row[5],
+            'total': row[6],
+            'open_invoices': row[7],
+            'oldest_invoice': row[8],
+        })
+    return rows
+
+
+def aging_totals(rows):
+    """Column totals of an aging result."""
+    totals = {bucket: ZERO for bucket in BUCKETS + ('total',)}
+    for row in rows:
+        for bucket in totals:
+            totals[bucket] += row[bucket]
+    return totals
+
+
+def cached_receivables_aging(agent_id=None, customer_ids=None, refresh=False):
+    """
+    receivables_aging for today from the shared report cache.
+    Cached results expire at the end of the day or as soon as invoices/transactions change.
+    Pass refresh=True to recompute and replace the cached result.
+    """
+    today = timezone.localdate()
+    seconds_left = int((day_bounds(today)[1] - timezone.now()).total_seconds())
+    return report_cache.get_or_compute(
+        CACHE_PREFIX,
+        {'as_of': today, 'agent': agent_id, 'customers': customer_ids},
+        lambda: receivables_aging(today, agent_id=agent_id, customer_ids=customer_ids),
+        timeout=max(min(seconds_left, settings.REPORT_CACHE_TIMEOUT), 60),
+        refresh=refresh,
+    )
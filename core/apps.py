@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Register model signal handlers
+        from . import signals  # noqa: F401
+
+        # Fail fast on a malformed account mapping; existence is verified by the database check
+        from . import accounts
+        accounts.configured_ids()
@@ -0,0 +1,413 @@
+"""
+Report and API benchmark harness.
+Requests every report page, stock endpoint and mobile/batch API through the Django test
+client against the current database (normally a dataset from generate_synthetic_data) and
+records wall time, query count and peak Python memory per endpoint. Results are plain JSON
+so runs from different commits can be compared with compare().
+run_encodings() measures the payload size and encode time of the large mobile lists in each
+response encoding (see core/encoding.py).
+"""
+
+import base64
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import connection, transaction as db_transaction
+from django.db.models import Count
+from django.middleware.gzip import compress_string
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.throttling import SimpleRateThrottle
+
+from . import accounts, encoding, report_cache
+from .constants import INVOICE_TYPE_SALES, PAYMENT_TYPE_CASH, STATUS_PAID, VISIT_TRANSACTION_TYPE_NEGATIVE_VISIT
+from .models import Agent, CustomerVendor, InvoiceDetail, InvoiceMaster, Item, Store, Transaction, Visit
+from .synthetic import BENCHMARK_PASSWORD, BENCHMARK_USERNAME, benchmark_user
+
+
+@dataclass
+class Benchmark:
+    name: str
+    url: object  # callable(context) -> path with query string
+    # 'session': logged-in benchmark user, 'user': its Basic credentials,
+    # 'agent': Basic credentials of the busiest generated agent
+    auth: str = 'session'
+    payload: object = None  # callable(context) -> JSON body; the request is a POST that is rolled back
+
+
+def _month(context):
+    return f"date_from={context['month_start']}&date_to={context['today']}"
+
+
+def _year(context):
+    return f"date_from={context['year_ago']}&date_to={context['today']}"
+
+
+def _batch_invoices(context, count=20):
+    return {'invoices': [
+        {
+            'invoiceMaster': {
+                'invoiceType': INVOICE_TYPE_SALES,
+                'customerOrVendorID': context['customer'],
+                'storeId': context['store'],
+                'agentID': context['agent'],
+                'status': STATUS_PAID,
+                'paymentType': PAYMENT_TYPE_CASH,
+                'notes': f'Benchmark invoice {n}',
+                'netTotal': 100.0,
+                'totalPaid': 100.0,
+            },
+            'invoiceDetails': [{'item': item, 'quantity': 1.0, 'price': 25.0} for item in context['items'][:4]],
+        }
+        for n in range(count)
+    ]}
+
+
+def _batch_vouchers(context, count=20):
+    return {'vouchers': [
+        {'type': 1, 'customerVendorId': context['customer'], 'amount': 50.0, 'storeId': context['store'],
+         'notes': f'Benchmark voucher {n}'}
+        for n in range(count)
+    ]}
+
+
+def _batch_visits(context, count=50):
+    return {'visits': [
+        {'transType': VISIT_TRANSACTION_TYPE_NEGATIVE_VISIT, 'customerVendor': context['customer'],
+         'date': context['now'], 'latitude': 30.05, 'longitude': 31.23, 'notes': f'Benchmark visit {n}'}
+        for n in range(count)
+    ]}
+
+
+BENCHMARKS = [
+    # Report pages
+    Benchmark('reports.index', lambda c: reverse('core:reports_index')),
+    Benchmark('reports.customer_purchase_history',
+              lambda c: reverse('core:customer_purchase_history') + f"?customer={c['customer']}&{_year(c)}"),
+    Benchmark('reports.top_customers', lambda c: reverse('core:top_customers') + f'?{_year(c)}'),
+    Benchmark('reports.product_sales_ranking', lambda c: reverse('core:product_sales_ranking') + f'?{_year(c)}'),
+    Benchmark('reports.product_sales_ranking_csv',
+              lambda c: reverse('core:product_sales_ranking') + f'?{_year(c)}&export=csv'),
+    Benchmark('reports.customer_balance', lambda c: reverse('core:customer_balance')),
+    Benchmark('reports.product_sales_by_customer',
+              lambda c: reverse('core:product_sales_by_customer') + f"?customer={c['customer']}&{_year(c)}"),
+    Benchmark('reports.invoice_transaction_summary',
+              lambda c: reverse('core:invoice_transaction_summary') + f'?{_year(c)}'),
+    Benchmark('reports.trial_balance', lambda c: reverse('core:trial_balance') + f'?{_year(c)}'),
+    Benchmark('reports.account_movement',
+              lambda c: reverse('core:account_movement', args=[c['cash_account']]) + f'?{_year(c)}'),
+    Benchmark('reports.customer_statement',
+              lambda c: reverse('core:customer_statement', args=[c['customer']]) + f'?{_year(c)}'),
+    Benchmark('reports.customer_statement_csv',
+              lambda c: reverse('core:customer_statement', args=[c['customer']]) + f'?{_year(c)}&export=csv'),
+    Benchmark('reports.receivables_aging', lambda c: reverse('core:receivables_aging')),
+    Benchmark('dashboard', lambda c: reverse('authentication:dashboard')),
+    Benchmark('dashboard.timeseries_daily', lambda c: reverse('core:sales_timeseries_api') + f'?{_year(c)}'),
+    Benchmark('dashboard.timeseries_monthly',
+              lambda c: reverse('core:sales_timeseries_api') + f'?bucket=month&{_year(c)}'),
+    # Stock
+    Benchmark('stock.items', lambda c: reverse('core:item_stock') + f"?store_id={c['store']}"),
+    Benchmark('stock.agent', lambda c: reverse('core:agent_stock') + f"?storeID={c['store']}", auth='agent'),
+    Benchmark('stock.store', lambda c: reverse('core:store_stock') + f"?storeID={c['store']}", auth='user'),
+    # Catalog
+    Benchmark('catalog.items', lambda c: reverse('core:item_list')),
+    Benchmark('catalog.price_list_details', lambda c: reverse('core:pricelistdetail_list')),
+    Benchmark('catalog.sync', lambda c: reverse('core:sync_catalog'), auth='agent'),
+    # Mobile endpoints
+    Benchmark('mobile.current_visitplan', lambda c: reverse('core:agent_current_visitplan'), auth='agent'),
+    Benchmark('mobile.active_plan_with_customers',
+              lambda c: reverse('core:agent_active_plan_with_customers'), auth='agent'),
+    Benchmark('mobile.customers', lambda c: reverse('core:customers_api_list'), auth='agent'),
+    Benchmark('mobile.nearby_customers',
+              lambda c: reverse('core:nearby_customers') + '?latitude=30.6&longitude=31.25&scope=territory',
+              auth='agent'),
+    Benchmark('mobile.visits', lambda c: reverse('core:agent_visits_list') + f'?{_month(c)}', auth='agent'),
+    Benchmark('mobile.negative_visits',
+              lambda c: reverse('core:get_negative_visits') + f"?agent_id={c['agent']}&{_month(c)}", auth='agent'),
+    Benchmark('mobile.vouchers',
+              lambda c: reverse('core:get_vouchers') + f"?agent_id={c['agent']}&{_month(c)}", auth='agent'),
+    Benchmark('mobile.invoices',
+              lambda c: reverse('authentication:agent_invoices_filtered_api') + f"?agent_id={c['agent']}&{_month(c)}",
+              auth='agent'),
+    Benchmark('mobile.transactions',
+              lambda c: reverse('authentication:agent_transactions_filtered_api') + f"?agent_id={c['agent']}&{_month(c)}",
+              auth='agent'),
+    Benchmark('mobile.cash_balance',
+              lambda c: reverse('core:agent_cash_balance') + f"?agent_id={c['agent']}", auth='agent'),
+    Benchmark('mobile.customer_statement',
+              lambda c: reverse('core:customer_statement_api', args=[c['customer']]) + f'?{_year(c)}', auth='agent'),
+    # Batch APIs (rolled back after each request)
+    Benchmark('batch.invoices', lambda c: reverse('core:batch_create_invoices_api'), auth='agent',
+              payload=_batch_invoices),
+    Benchmark('batch.vouchers', lambda c: reverse('core:batch_create_vouchers'), auth='agent',
+              payload=_batch_vouchers),
+    Benchmark('batch.visits', lambda c: reverse('core:batch_create_visits'), auth='agent',
+              payload=_batch_visits),
+]
+
+
+def _basic(username, password):
+    return 'Basic ' + base64.b64encode(f'{username}:{password}'.encode()).decode()
+
+
+def _busiest(queryset, field):
+    return queryset.values(field).annotate(n=Count('id')).order_by('-n').values_list(field, flat=True).first()
+
+
+def _context():
+    """Ids the benchmark URLs point at: the busiest agent, customer and store of the dataset."""
+    today = timezone.localdate()
+    agent_id = _busiest(InvoiceMaster.objects.filter(isDeleted=False, agentID__isnull=False), 'agentID')
+    agent = Agent.objects.filter(id=agent_id).first() or Agent.objects.filter(isDeleted=False).first()
+    customer_id = _busiest(
+        Transaction.objects.filter(isDeleted=False, customerVendorID__type__in=[1, 3]), 'customerVendorID'
+    ) or CustomerVendor.objects.filter(isDeleted=False).values_list('id', flat=True).first()
+    store_id = (agent.storeID_id if agent else None) or Store.objects.values_list('id', flat=True).first()
+    return {
+        'today': today,
+        'month_start': today.replace(day=1),
+        'year_ago': today - timedelta(days=365),
+        'now': timezone.localtime().isoformat(),
+        'agent': agent.id if agent else None,
+        'agent_username': agent.agentUsername if agent else None,
+        'customer': customer_id,
+        'store': store_id,
+        'items': list(Item.objects.filter(isDeleted=False).values_list('id', flat=True)[:4]),
+        'cash_account': accounts.get_id(accounts.CASH),
+    }
+
+
+def dataset_counts():
+    return {
+        'customers': CustomerVendor.objects.count(),
+        'items': Item.objects.count(),
+        'stores': Store.objects.count(),
+        'agents': Agent.objects.count(),
+        'invoices': InvoiceMaster.objects.count(),
+        'lines': InvoiceDetail.objects.count(),
+        'transactions': Transaction.objects.count(),
+        'visits': Visit.objects.count(),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _reset_throttles(user):
+    # The API throttles (100/hour anonymous) would otherwise start refusing repeated runs
+    cache = SimpleRateThrottle.cache
+    cache.delete_many([
+        SimpleRateThrottle.cache_format % {'scope': scope, 'ident': ident}
+        for scope in ('anon', 'user') for ident in ('127.0.0.1', user.pk)
+    ])
+
+
+def _request(client, benchmark, context, headers):
+    path = benchmark.url(context)
+    if benchmark.payload is None:
+        response = client.get(path, headers=headers)
+    else:
+        with db_transaction.atomic():
+            response = client.post(path, data=json.dumps(benchmark.payload(context)),
+                                   content_type='application/json', headers=headers)
+            db_transaction.set_rollback(True)
+    # Streaming responses do their work while being consumed
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def measure(client, benchmark, context, headers, user):
+    """One timed request: status, wall time (ms) and query count."""
+    _reset_throttles(user)
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = _request(client, benchmark, context, headers)
+        wall = time.perf_counter() - started
+    return {'status': response.status_code, 'wall_ms': round(wall * 1000, 2), 'queries': len(queries)}
+
+
+def peak_memory(client, benchmark, context, headers, user):
+    """
+    Peak Python memory (KiB) allocated while serving one request. Measured in a separate
+    request because tracing allocations slows the code down too much to time it.
+    """
+    _reset_throttles(user)
+    tracemalloc.start()
+    try:
+        _request(client, benchmark, context, headers)
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def _selected(names):
+    return [
+        benchmark for benchmark in BENCHMARKS
+        if not names or any(benchmark.name.startswith(name) for name in names)
+    ]
+
+
+def _client(user, context):
+    """Test client logged in as the benchmark user, and the request headers of each auth mode."""
+    host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h and h != '*'), 'localhost')
+    client = Client(HTTP_HOST=host)
+    client.force_login(user)
+    auth_headers = {
+        'session': {},
+        'user': {'authorization': _basic(BENCHMARK_USERNAME, BENCHMARK_PASSWORD)},
+        'agent': {'authorization': _basic(context['agent_username'], BENCHMARK_PASSWORD)},
+    }
+    return client, auth_headers
+
+
+def _meta(repeat):
+    return {
+        'started_at': timezone.now().isoformat(),
+        'commit': _git_commit(),
+        'database': connection.vendor,
+        'django': django.get_version(),
+        'python': platform.python_version(),
+        'repeat': repeat,
+        'dataset': dataset_counts(),
+    }
+
+
+def run(names=None, repeat=3, log=print):
+    """
+    Run the benchmarks whose name starts with one of `names` (all when empty) `repeat` times.
+    The first run of each benchmark starts with an invalidated report cache (cold); the
+    rest may be served from it (warm). Peak memory is taken from one more cold run.
+    Returns the results document.
+    """
+    user = benchmark_user()
+    context = _context()
+    client, auth_headers = _client(user, context)
+
+    results = {}
+    for benchmark in _selected(names):
+        headers = auth_headers[benchmark.auth]
+        report_cache.bump_data_version()
+        runs = [measure(client, benchmark, context, headers, user) for _ in range(repeat)]
+        warm = [r['wall_ms'] for r in runs[1:]]
+        report_cache.bump_data_version()
+        results[benchmark.name] = {
+            'status': runs[0]['status'],
+            'cold_ms': runs[0]['wall_ms'],
+            'warm_ms': round(statistics.median(warm), 2) if warm else None,
+            'queries': runs[0]['queries'],
+            'warm_queries': min(r['queries'] for r in runs),
+            'peak_kb': peak_memory(client, benchmark, context, headers, user),
+            'runs': runs,
+        }
+        warm_text = f"{results[benchmark.name]['warm_ms']:>9.1f} ms" if warm else f"{'-':>9}   "
+        log(f"{benchmark.name:<40} {runs[0]['status']} cold {runs[0]['wall_ms']:>9.1f} ms warm {warm_text} "
+            f"{runs[0]['queries']:>5} queries {results[benchmark.name]['peak_kb']:>9.0f} KiB")
+
+    return {'meta': _meta(repeat), 'results': results}
+
+
+# --- Response encodings ---------------------------------------------------------------------
+
+# Large mobile lists whose encodings are compared
+ENCODING_BENCHMARKS = ('stock.', 'catalog.')
+ENCODINGS = ('json', 'json+gzip', 'json+br', 'msgpack', 'msgpack+gzip', 'msgpack+br')
+LAYOUTS = ('rows', encoding.COLUMNAR)
+
+
+def encoding_available(name):
+    media, _, compression = name.partition('+')
+    return (media != 'msgpack' or encoding.msgpack is not None) and (compression != 'br' or encoding.brotli is not None)
+
+
+def encode(data, name):
+    """Response body of `data` in one of ENCODINGS, as the renderers and compression middleware produce it."""
+    media, _, compression = name.partition('+')
+    body = JSONRenderer().render(data) if media == 'json' else encoding.MessagePackRenderer().render(data)
+    if compression == 'gzip':
+        body = compress_string(body)
+    elif compression == 'br':
+        body = encoding.brotli_compress(body)
+    return body
+
+
+def _with_layout(path, layout):
+    if layout == 'rows':
+        return path
+    return f"{path}{'&' if '?' in path else '?'}layout={layout}"
+
+
+def run_encodings(names=None, repeat=3, log=print):
+    """
+    Fetch each selected list (ENCODING_BENCHMARKS, narrowed by `names`) once per layout and encode
+    the response data in every available encoding `repeat` times: body size in bytes and median
+    encode time (render plus compression). Returns the results document.
+    """
+    user = benchmark_user()
+    context = _context()
+    client, auth_headers = _client(user, context)
+
+    results = {}
+    for benchmark in _selected(ENCODING_BENCHMARKS):
+        if names and not any(benchmark.name.startswith(name) for name in names):
+            continue
+        results[benchmark.name] = {}
+        for layout in LAYOUTS:
+            _reset_throttles(user)
+            response = client.get(_with_layout(benchmark.url(context), layout), headers=auth_headers[benchmark.auth])
+            if response.status_code != 200:
+                log(f'{benchmark.name:<28} {layout:<9} status {response.status_code}, skipped')
+                continue
+            formats = {}
+            for name in ENCODINGS:
+                if not encoding_available(name):
+                    continue
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    body = encode(response.data, name)
+                    timings.append(time.perf_counter() - started)
+                formats[name] = {'bytes': len(body), 'encode_ms': round(statistics.median(timings) * 1000, 3)}
+                log(f'{benchmark.name:<28} {layout:<9} {name:<13} {len(body):>10} bytes '
+                    f'{formats[name]["encode_ms"]:>9.2f} ms')
+            results[benchmark.name][layout] = formats
+
+    return {'meta': _meta(repeat), 'results': results}
+
+
+def compare(baseline, current):
+    """
+    Per-benchmark changes between two results documents: rows of (name, metric, before,
+    after, percent change) for cold/warm time, queries and peak memory.
+    """
+    rows = []
+    for name, after in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        for metric in ('cold_ms', 'warm_ms', 'queries', 'peak_kb'):
+            old, new = before.get(metric), after.get(metric)
+            if old is None or new is None:
+                continue
+            change = round((new - old) / old * 100, 1) if old else None
+            rows.append((name, metric, old, new, change))
+    return rows
@@ -95,4 +95,38 @@ VISIT_TRANSACTION_TYPE_SALES = 1
 VISIT_TRANSACTION_TYPE_RETURN_SALES = 2
 VISIT_TRANSACTION_TYPE_RECEIVE_VOUCHER = 3
 VISIT_TRANSACTION_TYPE_PAY_VOUCHER = 4
-VISIT_TRANSACTION_TYPE_NEGATIVE_VISIT = 5
\ No newline at end of file
+VISIT_TRANSACTION_TYPE_NEGATIVE_VISIT = 5
+
+# Balance Snapshot Kind Choices
+BALANCE_SNAPSHOT_KIND_CHOICES = [
+    (1, 'Account'),
+    (2, 'Customer/Vendor'),
+    (3, 'Agent Cash'),
+]
+
+# Constants for Balance Snapshot Kinds
+SNAPSHOT_KIND_ACCOUNT = 1
+SNAPSHOT_KIND_CUSTOMER = 2
+SNAPSHOT_KIND_AGENT_CASH = 3
+
+# Report Run Status Choices
+REPORT_RUN_STATUS_CHOICES = [
+    (0, 'Queued'),
+    (1, 'Running'),
+    (2, 'Done'),
+    (3, 'Failed'),
+    (4, 'Cancelled'),
+]
+
+# Constants for Report Run Statuses
+REPORT_RUN_QUEUED = 0
+REPORT_RUN_RUNNING = 1
+REPORT_RUN_DONE = 2
+REPORT_RUN_FAILED = 3
+REPORT_RUN_CANCELLED = 4
+
+# Report Run Output Format Choices
+REPORT_FORMAT_CHOICES = [
+    ('csv', 'CSV'),
+    ('xlsx', 'Excel (XLSX)'),
+]
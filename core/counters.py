@@ -0,0 +1,164 @@
+"""
+Dashboard counters.
+Keeps the row counts shown on the dashboard (items, stores, customers, invoices by type, ...)
+in the DashboardCounter table so the page reads them in one query. A save or delete of a
+counted model moves its row in or out of every counter whose conditions it meets; the changes
+of a database transaction are applied together once it commits. reconcile() recounts every
+counter from its table and repairs drift from writes that bypass model signals.
+"""
+
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction as db_transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .constants import (
+    INVOICE_TYPE_PURCHASES, INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_PURCHASES, INVOICE_TYPE_RETURN_SALES,
+)
+from .models import (
+    CustomerVendor, DashboardCounter, InvoiceMaster, Item, ItemsGroup, PriceList, Store, StoreGroup,
+)
+
+# Counter name -> (model, lookups a counted row matches). Only exact and __in lookups on
+# concrete fields, so a row can be matched in memory as well as in SQL.
+COUNTERS = {
+    'items_groups': (ItemsGroup, {'isDeleted': False}),
+    'items': (Item, {'isDeleted': False}),
+    'price_lists': (PriceList, {'isDeleted': False}),
+    'store_groups': (StoreGroup, {'isDeleted': False}),
+    'stores': (Store, {'isDeleted': False}),
+    'customers': (CustomerVendor, {'isDeleted': False, 'type__in': [1, 3]}),
+    'vendors': (CustomerVendor, {'isDeleted': False, 'type__in': [2, 3]}),
+    'purchase_invoices': (InvoiceMaster, {'isDeleted': False, 'invoiceType': INVOICE_TYPE_PURCHASES}),
+    'sales_invoices': (InvoiceMaster, {'isDeleted': False, 'invoiceType': INVOICE_TYPE_SALES}),
+    'return_purchase_invoices': (InvoiceMaster, {'isDeleted': False, 'invoiceType': INVOICE_TYPE_RETURN_PURCHASES}),
+    'return_sales_invoices': (InvoiceMaster, {'isDeleted': False, 'invoiceType': INVOICE_TYPE_RETURN_SALES}),
+    'total_invoices': (InvoiceMaster, {'isDeleted': False}),
+}
+
+# Counted model -> fields its counters look at
+MODEL_FIELDS = defaultdict(set)
+for _model, _lookups in COUNTERS.values():
+    MODEL_FIELDS[_model].update(lookup.split('__')[0] for lookup in _lookups)
+MODEL_FIELDS = {model: sorted(fields) for model, fields in MODEL_FIELDS.items()}
+
+COUNTED_MODELS = tuple(MODEL_FIELDS)
+
+
+def _matches(values, lookups):
+    for lookup, expected in lookups.items():
+        field, _, operator = lookup.partition('__')
+        if operator == 'in':
+            if values[field] not in expected:
+                return False
+        elif values[field] != expected:
+            return False
+    return True
+
+
+def counted_in(model, values):
+    """Names of the counters a row of `model` with `values` ({field: value}) belongs to."""
+    if values is None:
+        return set()
+    return {
+        name for name, (counter_model, lookups) in COUNTERS.items()
+        if counter_model is model and _matches(values, lookups)
+    }
+
+
+def instance_values(instance):
+    """Counted field values of an in-memory instance."""
+    return {field: getattr(instance, field) for field in MODEL_FIELDS[type(instance)]}
+
+
+def stored_values(model, pk):
+    """
+    Counted field values of a row as currently stored (None if it does not exist).
+    Inside a transaction the row is locked until it commits, so concurrent writers of the same
+    row see each other's values and do not count the same change twice.
+    """
+    queryset = model.objects.filter(pk=pk)
+    if connection.in_atomic_block:
+        queryset = queryset.select_for_update()
+    return queryset.values(*MODEL_FIELDS[model]).first()
+
+
+def apply(deltas):
+    """Add {counter name: delta} to the stored counters. Missing counters are left to reconcile()."""
+    now = timezone.now()
+    for name, delta in deltas.items():
+        if delta:
+            DashboardCounter.objects.filter(name=name).update(value=F('value') + delta, updatedAt=now)
+
+
+class _PendingDeltas(Counter):
+    """Counter changes to apply when the current transaction commits; registered once per transaction."""
+
+    def __call__(self):
+        connection._pending_counter_deltas = None
+        apply(self)
+
+
+def record_change(model, previous, current):
+    """
+    Move a row from the counters its previous values matched to those its current values match.
+    Pass previous=None for a new row and current=None for a deleted one.
+    """
+    before = counted_in(model, previous)
+    after = counted_in(model, current)
+    if before == after:
+        return
+    deltas = Counter({name: 1 for name in after - before})
+    deltas.subtract({name: 1 for name in before - after})
+
+    if not connection.in_atomic_block:
+        apply(deltas)
+        return
+    pending = getattr(connection, '_pending_counter_deltas', None)
+    if pending is None or not any(entry[1] is pending for entry in connection.run_on_commit):
+        pending = _PendingDeltas()
+        connection._pending_counter_deltas = pending
+        db_transaction.on_commit(pending)
+    pending.update(deltas)
+
+
+def compute_counts():
+    """Every counter recounted from its table: one conditional aggregate per model."""
+    names_by_model = defaultdict(list)
+    for name, (model, _lookups) in COUNTERS.items():
+        names_by_model[model].append(name)
+    counts = {}
+    for model, names in names_by_model.items():
+        counts.update(model.objects.aggregate(**{
+            name: Count('pk', filter=Q(**COUNTERS[name][1])) for name in names
+        }))
+    return counts
+
+
+def reconcile():
+    """
+    Recount every counter and store the result. Returns {name: (stored before, counted)}.
+    Writes committed while this runs are corrected by the next reconcile.
+    """
+    counts = compute_counts()
+    now = timezone.now()
+    stored = dict(DashboardCounter.objects.values_list('name', 'value'))
+    DashboardCounter.objects.bulk_create(
+        [DashboardCounter(name=name, value=value, reconciledAt=now, updatedAt=now) for name, value in counts.items()],
+        update_conflicts=True,
+        unique_fields=['name'],
+        update_fields=['value', 'reconciledAt', 'updatedAt'],
+    )
+    return {name: (stored.get(name), value) for name, value in counts.items()}
+
+
+def dashboard_counts():
+    """
+    All counters in one query. When the table is cold (a counter is missing) every count is
+    computed from the source tables and stored.
+    """
+    counts = dict(DashboardCounter.objects.values_list('name', 'value'))
+    if not set(COUNTERS) <= set(counts):
+        counts = {name: value for name, (_before, value) in reconcile().items()}
+    return counts
@@ -0,0 +1,131 @@
+"""
+Verified-credential cache for HTTP Basic Auth on the store integration API.
+A successful username/password check is remembered per worker process for
+BASIC_AUTH_CACHE_SECONDS, keyed on an HMAC (SECRET_KEY) of the Authorization header, so repeat
+calls skip both the user lookup and the password hash. Failed checks are never cached.
+Saving a user with a new password or is_active flag (or deleting it) drops its entries in the
+worker that made the change and, once the change commits, bumps a generation in the shared
+'versions' cache (see core/versions.py): every worker drops entries cached under an older
+generation on their next use.
+Each hit returns its own copy of the cached User, so requests in other threads never share it.
+"""
+
+import base64
+import copy
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils.crypto import salted_hmac
+from rest_framework import exceptions
+from rest_framework.authentication import BasicAuthentication
+
+from . import versions
+
+GENERATION_KEY = 'credential_cache:generation'
+# Most credentials kept per worker; the oldest entry is dropped beyond this
+MAX_ENTRIES = 1000
+
+_entries = {}
+_lock = threading.Lock()
+_metrics = {'hits': 0, 'misses': 0, 'failures': 0, 'expired': 0, 'invalidations': 0}
+
+
+def _count(name):
+    with _lock:
+        _metrics[name] += 1
+
+
+def _digest(auth_header):
+    return salted_hmac('core.credential_cache', auth_header).hexdigest()
+
+
+def _generation():
+    return versions.get(GENERATION_KEY)
+
+
+def _check_password(auth_header):
+    """User for Basic credentials after a full lookup and password check, or None."""
+    try:
+        decoded = base64.b64decode(auth_header[6:]).decode('utf-8')
+        username, password = decoded.split(':', 1)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    user = User.objects.filter(username=username).first()
+    if user is None or not user.is_active or not user.check_password(password):
+        return None
+    return user
+
+
+def authenticate(auth_header):
+    """User for an 'Authorization: Basic ...' header value, or None if the credentials are invalid."""
+    if not auth_header.startswith('Basic '):
+        return None
+    key = _digest(auth_header)
+    generation = _generation()
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            user, expires_at, entry_generation = entry
+            if expires_at > now and entry_generation == generation:
+                _metrics['hits'] += 1
+                return copy.copy(user)
+            del _entries[key]
+            _metrics['expired'] += 1
+        _metrics['misses'] += 1
+
+    user = _check_password(auth_header)
+    if user is None:
+        _count('failures')
+        return None
+    with _lock:
+        if len(_entries) >= MAX_ENTRIES:
+            del _entries[next(iter(_entries))]
+        _entries[key] = (copy.copy(user), now + settings.BASIC_AUTH_CACHE_SECONDS, generation)
+    return user
+
+
+def invalidate_user(user_id):
+    """
+    Forget every cached credential of a user: here now, and in every worker once the current
+    transaction commits (entries cached before the commit carry the old generation).
+    """
+    with _lock:
+        for key in [key for key, entry in _entries.items() if entry[0].pk == user_id]:
+            del _entries[key]
+        _metrics['invalidations'] += 1
+    versions.bump_on_commit(GENERATION_KEY)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def metrics():
+    """Counters of this worker process since it started."""
+    with _lock:
+        lookups = _metrics['hits'] + _metrics['misses']
+        return dict(
+            _metrics,
+            pid=os.getpid(),
+            entries=len(_entries),
+            ttl_seconds=settings.BASIC_AUTH_CACHE_SECONDS,
+            hit_rate=_metrics['hits'] / lookups if lookups else 0.0,
+        )
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    """DRF Basic authentication backed by the verified-credential cache."""
+
+    def authenticate(self, request):
+        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+        if not auth_header.startswith('Basic '):
+            return None
+        user = authenticate(auth_header)
+        if user is None:
+            raise exceptions.AuthenticationFailed('Invalid username/password.')
+        return user, None
@@ -0,0 +1,121 @@
+"""
+Compact response encodings for the mobile API.
+- Compression: APICompressionMiddleware compresses /api/ responses with brotli when the
+  optional `brotli` package is installed and the client sends `Accept-Encoding: br`, otherwise
+  with gzip when it accepts gzip.
+- MessagePack: MessagePackRenderer answers `Accept: application/msgpack`; it is enabled in
+  REST_FRAMEWORK only when the optional `msgpack` package is installed.
+- Columnar layout: the stock, item and price list endpoints take `?layout=columnar` and return
+  {'columns': [...], 'rows': [[...], ...]} instead of repeating the keys in every row.
+"""
+
+import re
+
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+API_PATH_PREFIX = '/api/'
+# Bodies shorter than this are sent as they are (same threshold as GZipMiddleware)
+MIN_COMPRESS_LENGTH = 200
+# Brotli quality for dynamic responses: close to gzip's speed, noticeably smaller output
+BROTLI_QUALITY = 5
+
+COLUMNAR = 'columnar'
+LAYOUT_PARAMETER = OpenApiParameter(
+    name='layout', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, enum=['rows', COLUMNAR],
+    description='columnar: return {"columns": [...], "rows": [[...], ...]} instead of one object per row',
+)
+
+_accepts_br = re.compile(r'\bbr\b')
+
+
+# --- Compression ----------------------------------------------------------------------------
+
+def brotli_compress(body):
+    return brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+class APICompressionMiddleware(GZipMiddleware):
+    """
+    Compresses API responses per Accept-Encoding: brotli when available and accepted, else gzip.
+    Pages, static files and the live dashboard stream are left alone.
+    """
+
+    def process_response(self, request, response):
+        if not request.path.startswith(API_PATH_PREFIX):
+            return response
+        if brotli is None or response.streaming or response.has_header('Content-Encoding'):
+            return super().process_response(request, response)
+        if len(response.content) < MIN_COMPRESS_LENGTH:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not _accepts_br.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return super().process_response(request, response)
+
+        compressed = brotli_compress(response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        # The body now differs from the uncompressed one, so a strong ETag becomes weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+# --- MessagePack ----------------------------------------------------------------------------
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack bodies for `Accept: application/msgpack`; values are converted as for JSON."""
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
+
+
+# --- Columnar layout ------------------------------------------------------------------------
+
+def wants_columnar(request):
+    return request.GET.get('layout') == COLUMNAR
+
+
+def _columns(rows):
+    # Serializer output knows its fields even when there are no rows
+    serializer = getattr(rows, 'serializer', None)
+    if serializer is not None and hasattr(serializer, 'child'):
+        return [name for name, field in serializer.child.fields.items() if not field.write_only]
+    return list(rows[0]) if rows else []
+
+
+def columnar(rows, columns=None):
+    """{'columns': [...], 'rows': [[...], ...]} for a list of dicts (columns default to their keys)."""
+    columns = _columns(rows) if columns is None else columns
+    return {'columns': columns, 'rows': [[row.get(column) for column in columns] for row in rows]}
+
+
+def layout(request, rows, columns=None):
+    """`rows` as they are, or in the columnar layout when the request asks for it."""
+    return columnar(rows, columns) if wants_columnar(request) else rows
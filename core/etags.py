@@ -0,0 +1,122 @@
+"""
+ETags and conditional GET for the catalog, stock and visit plan API endpoints.
+An endpoint's ETag is a hash of a cheap data version (latest updatedAt and live row count of
+the tables its body is built from, or a maintained version: the report cache data version for
+stock, the plans version for visit plans) together with the path, query string and negotiated
+media type. Maintained versions never repeat (see core/versions.py), so an old ETag cannot
+match them again. When the client's If-None-Match matches, the view answers 304 Not Modified
+without running its main query or serializer.
+ETags are weak: the compressed and uncompressed bodies are equivalent representations.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max, Q
+from django.http import HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+
+from . import plans, report_cache
+from .models import CustomerVendor, InvoiceDetail, Item, ItemsGroup, PriceList, PriceListDetail, Store
+
+
+def table_version(queryset):
+    """
+    (latest updatedAt, live row count) of `queryset`. Saves (soft deletes included) move the
+    latest updatedAt; hard deletes change the count.
+    """
+    row = queryset.order_by().aggregate(last=Max('updatedAt'), count=Count('id', filter=Q(isDeleted=False)))
+    return row['last'], row['count']
+
+
+def etag_for(request, version):
+    """Weak ETag for the response to `request` built from data at `version`."""
+    key = repr((
+        request.path,
+        sorted(request.GET.lists()),
+        getattr(request, 'accepted_media_type', None),
+        version,
+    ))
+    return 'W/"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+
+def _matches(etag, if_none_match):
+    # If-None-Match uses the weak comparison
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag.removeprefix('W/') in [tag.removeprefix('W/') for tag in etags]
+
+
+def conditional(version, **cache_control):
+    """
+    Decorator for GET API views. version(request, *args, **kwargs) returns the data version of
+    the response (None to skip conditional handling, e.g. when the view will answer an error).
+    200 responses get the ETag and the `cache_control` directives (see patch_cache_control);
+    a matching If-None-Match gets 304 without calling the view.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            data_version = version(request, *args, **kwargs)
+            if data_version is None:
+                return view_func(request, *args, **kwargs)
+
+            etag = etag_for(request, data_version)
+            if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+            if if_none_match and _matches(etag, if_none_match):
+                response = HttpResponseNotModified()
+            else:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+            response['ETag'] = etag
+            patch_cache_control(response, **cache_control)
+            return response
+
+        return _wrapped_view
+
+    return decorator
+
+
+# --- Endpoint versions ----------------------------------------------------------------------
+
+def item_list_version(request):
+    return table_version(Item.objects.all()), table_version(ItemsGroup.objects.all())
+
+
+def pricelist_details_version(request, pricelist_id):
+    return (
+        table_version(PriceListDetail.objects.filter(priceList=pricelist_id)),
+        table_version(PriceList.objects.filter(pk=pricelist_id)),
+        table_version(Item.objects.all()),
+    )
+
+
+def customers_version(request):
+    return table_version(CustomerVendor.objects.filter(type=1))
+
+
+def agent_stock_version(request):
+    """
+    Stock moves with every invoice write, which bumps the report cache data version (a token
+    that never repeats, see core/versions.py). The latest invoice line id also covers lines
+    inserted without model signals (bulk imports).
+    """
+    store_id = request.GET.get('storeID')
+    try:
+        if not store_id or not Store.objects.filter(id=int(store_id), isDeleted=False).exists():
+            return None
+    except ValueError:
+        return None
+    return (
+        report_cache.data_version(),
+        InvoiceDetail.objects.aggregate(last=Max('id'))['last'],
+        table_version(Item.objects.all()),
+    )
+
+
+def active_plan_version(request):
+    """Plans, customers and price lists bump the plans version (see core/plans.py)."""
+    return request.agent.pk, timezone.localdate(), plans.version()
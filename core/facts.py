@@ -0,0 +1,244 @@
+"""
+Daily sales fact table.
+Keeps SalesFact rows (day, store, agent, customer/vendor, item, invoice type) in step with
+invoice lines. An invoice write rebuilds the slice (day, customer/vendor) it belongs to, and the
+one it left when its date or customer changed, once the write commits; writes that bypass model
+signals are picked up by refresh_sales_facts() from a high-water mark on updatedAt.
+Rebuilds of the same day are serialized with a PostgreSQL advisory lock, so two commits cannot
+both insert their aggregate of a slice.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from itertools import groupby
+
+from django.db import connection, transaction as db_transaction
+from django.db.models import Sum, Count, F, Max, Q, Value, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from . import report_cache
+from .ledger import transaction_day
+from .models import FactRefreshState, InvoiceDetail, InvoiceMaster, SalesFact
+from .partitioning import created_in_range
+
+ZERO = Decimal('0')
+FACT_NAME = 'salesFacts'
+# First key of the advisory locks taken per day; the second is the day's ordinal
+LOCK_NAMESPACE = 3401
+
+# Rows updated shortly before the mark may commit after it; re-read them on every catch-up
+SAFETY_LAG = timedelta(minutes=5)
+
+LINE_TOTAL = ExpressionWrapper(
+    Coalesce(F('quantity'), Value(ZERO)) * Coalesce(F('price'), Value(ZERO)),
+    output_field=DecimalField(max_digits=17, decimal_places=2),
+)
+
+
+def _customer_filter(field, customer_ids):
+    """Q matching `field` against customer/vendor ids, None meaning invoices without one."""
+    condition = Q(**{f'{field}__in': [customer_id for customer_id in customer_ids if customer_id is not None]})
+    if None in customer_ids:
+        condition |= Q(**{f'{field}__isnull': True})
+    return condition
+
+
+def _aggregate_lines(date_from, date_to, customer_ids=None):
+    """
+    Fact rows aggregated from the active invoice lines of a range of local days,
+    limited to the invoices of `customer_ids` when given.
+    """
+    lines = InvoiceDetail.objects.filter(
+        created_in_range(date_from, date_to, field='invoiceMasterID__createdAt'),
+        isDeleted=False,
+        invoiceMasterID__isDeleted=False,
+    )
+    if customer_ids is not None:
+        lines = lines.filter(_customer_filter('invoiceMasterID__customerOrVendorID', customer_ids))
+    return lines.annotate(
+        day=TruncDate('invoiceMasterID__createdAt', tzinfo=timezone.get_current_timezone()),
+    ).values(
+        'day',
+        'item_id',
+        store_id=F('invoiceMasterID__storeID_id'),
+        agent_id=F('invoiceMasterID__agentID_id'),
+        customer_id=F('invoiceMasterID__customerOrVendorID_id'),
+        invoice_type=F('invoiceMasterID__invoiceType'),
+    ).annotate(
+        total_quantity=Coalesce(Sum('quantity'), Value(ZERO)),
+        total_amount=Coalesce(Sum(LINE_TOTAL), Value(ZERO)),
+        line_count=Count('id'),
+        invoice_count=Count('invoiceMasterID', distinct=True),
+    ).order_by()
+
+
+def _lock_day(day):
+    """
+    Wait for other rebuilds of `day` to commit; held until the current transaction ends.
+    Without it a rebuild's DELETE cannot see rows another one just inserted and both aggregates
+    are kept. Other databases serialize writers themselves.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [LOCK_NAMESPACE, day.toordinal()])
+
+
+def _rebuild(day, customer_ids=None):
+    """Replace the fact rows of `day` (only those of `customer_ids` when given). Returns rows written."""
+    with db_transaction.atomic():
+        _lock_day(day)
+        stale = SalesFact.objects.filter(day=day)
+        if customer_ids is not None:
+            stale = stale.filter(_customer_filter('customerVendorID', customer_ids))
+        stale.delete()
+        return len(SalesFact.objects.bulk_create(
+            (
+                SalesFact(
+                    day=row['day'],
+                    storeID_id=row['store_id'],
+                    agentID_id=row['agent_id'],
+                    customerVendorID_id=row['customer_id'],
+                    itemID_id=row['item_id'],
+                    invoiceType=row['invoice_type'],
+                    quantity=row['total_quantity'],
+                    amount=row['total_amount'],
+                    lineCount=row['line_count'],
+                    invoiceCount=row['invoice_count'],
+                )
+                for row in _aggregate_lines(day, day, customer_ids).iterator()
+            ),
+            batch_size=1000,
+        ))
+
+
+def _facts_changed(days):
+    if days:
+        report_cache.bump_data_version()
+        report_cache.bump_history_if_past(days)
+
+
+def refresh_days(days):
+    """Rebuild the fact rows of the given local days. Returns the number of rows written."""
+    days = sorted(set(days))
+    written = sum(_rebuild(day) for day in days)
+    _facts_changed(days)
+    return written
+
+
+def refresh_slices(slices):
+    """
+    Rebuild the fact rows of the given (local day, customer/vendor id) slices, one transaction
+    per day. Returns the number of rows written.
+    """
+    slices = sorted(set(slices), key=lambda item: (item[0], item[1] or 0))
+    written = 0
+    days = []
+    for day, day_slices in groupby(slices, key=lambda item: item[0]):
+        written += _rebuild(day, {customer_id for _day, customer_id in day_slices})
+        days.append(day)
+    _facts_changed(days)
+    return written
+
+
+def _refresh_pending():
+    pending = getattr(connection, '_pending_sales_fact_slices', None)
+    if pending:
+        connection._pending_sales_fact_slices = set()
+        refresh_slices(pending)
+
+
+def schedule_refresh(slices):
+    """
+    Rebuild the given (day, customer/vendor id) slices after the current transaction commits.
+    Every call registers a flush, but the first flush after the commit rebuilds all pending
+    slices and the others find none left: an invoice with many lines rebuilds its slice once.
+    Slices of a rolled-back transaction stay pending and are rebuilt, unchanged, on the next commit.
+    """
+    if not connection.in_atomic_block:
+        refresh_slices(slices)
+        return
+    pending = getattr(connection, '_pending_sales_fact_slices', None)
+    if pending is None:
+        pending = connection._pending_sales_fact_slices = set()
+    pending.update(slices)
+    db_transaction.on_commit(_refresh_pending)
+
+
+def _slice(created_at, customer_id):
+    return (transaction_day(created_at), customer_id) if created_at else None
+
+
+def _master_slice(master_id):
+    row = InvoiceMaster.objects.filter(pk=master_id).values_list('createdAt', 'customerOrVendorID_id').first()
+    return _slice(*row) if row else None
+
+
+def invoice_slice(instance):
+    """(local day, customer/vendor id) an InvoiceMaster or InvoiceDetail counts in (None if unknown)."""
+    if isinstance(instance, InvoiceMaster):
+        return _slice(instance.createdAt, instance.customerOrVendorID_id)
+    if InvoiceDetail.invoiceMasterID.is_cached(instance):
+        master = instance.invoiceMasterID
+        return _slice(master.createdAt, master.customerOrVendorID_id)
+    return _master_slice(instance.invoiceMasterID_id)
+
+
+def stored_slice(instance):
+    """
+    Slice the stored row counted in before a save, when it differs from invoice_slice():
+    an invoice whose date or customer changes, or a line moved to another invoice.
+    """
+    if instance._state.adding or instance.pk is None:
+        return None
+    if isinstance(instance, InvoiceMaster):
+        return _master_slice(instance.pk)
+    master_id = InvoiceDetail.objects.filter(pk=instance.pk).values_list('invoiceMasterID_id', flat=True).first()
+    if master_id is None or master_id == instance.invoiceMasterID_id:
+        return None
+    return _master_slice(master_id)
+
+
+def changed_days(since):
+    """Local days of invoices or invoice lines updated after `since` (all days when None)."""
+    tz = timezone.get_current_timezone()
+    invoices = InvoiceMaster.objects.all()
+    lines = InvoiceDetail.objects.all()
+    if since:
+        invoices = invoices.filter(updatedAt__gt=since)
+        lines = lines.filter(updatedAt__gt=since)
+    days = set(
+        invoices.annotate(day=TruncDate('createdAt', tzinfo=tz)).values_list('day', flat=True).distinct()
+    )
+    days.update(
+        lines.annotate(day=TruncDate('invoiceMasterID__createdAt', tzinfo=tz)).values_list('day', flat=True).distinct()
+    )
+    days.discard(None)
+    return days
+
+
+def refresh_sales_facts(full=False):
+    """
+    Catch the fact table up with invoice writes since the stored high-water mark.
+    Rebuilds every day that has an invoice or line updated after the mark (minus SAFETY_LAG);
+    full=True rebuilds the whole table. Returns (days rebuilt, rows written).
+    """
+    state, _ = FactRefreshState.objects.get_or_create(name=FACT_NAME)
+    # Taken before reading so rows written during the refresh are seen by the next one
+    marks = [
+        InvoiceMaster.objects.aggregate(last=Max('updatedAt'))['last'],
+        InvoiceDetail.objects.aggregate(last=Max('updatedAt'))['last'],
+    ]
+    mark = max((m for m in marks if m), default=None) or timezone.now()
+
+    if full:
+        SalesFact.objects.all().delete()
+        days = changed_days(None)
+    else:
+        since = state.highWaterMark - SAFETY_LAG if state.highWaterMark else None
+        days = changed_days(since)
+
+    written = refresh_days(days)
+    state.highWaterMark = mark
+    state.save()
+    return len(days), written
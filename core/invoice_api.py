@@ -13,71 +13,15 @@ from django.views.decorators.csrf import csrf_exempt
 from decimal import Decimal
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
-from functools import wraps
-import base64
 from .models import (
     InvoiceMaster, InvoiceDetail, Transaction, Account, 
-    CustomerVendor, Item, Store, Agent
+    CustomerVendor, Item, Store
 )
 from .constants import *
+from . import accounts
+from .agent_auth import agent_authentication_required
 import json
 
-# Account IDs as specified in the documentation
-CASH_ACCOUNT_ID = 35
-VISA_ACCOUNT_ID = 10
-VENDORS_DEFERRED_ACCOUNT_ID = 38
-CUSTOMERS_DEFERRED_ACCOUNT_ID = 36
-
-
-def agent_authentication_required(view_func):
-    """
-    Decorator for agent authentication using HTTP Basic Auth.
-    Expects Authorization header with base64 encoded agentUsername:agentPassword
-    """
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
-        # Get Authorization header
-        auth_header = request.META.get('HTTP_AUTHORIZATION')
-        if not auth_header or not auth_header.startswith('Basic '):
-            return Response({
-                'success': False,
-                'error': 'AUTHENTICATION_REQUIRED',
-                'message': 'Agent authentication required. Use Basic Auth with agent credentials.'
-            }, status=status.HTTP_401_UNAUTHORIZED)
-        
-        try:
-            # Decode credentials
-            encoded_credentials = auth_header.split(' ')[1]
-            decoded_credentials = base64.b64decode(encoded_credentials).decode('utf-8')
-            username, password = decoded_credentials.split(':')
-            
-            # Find and authenticate agent
-            agent = Agent.objects.filter(
-                agentUsername=username, 
-                isDeleted=False,
-                isActive=True
-            ).first()
-            
-            if not agent or not agent.check_password(password):
-                return Response({
-                    'success': False,
-                    'error': 'INVALID_CREDENTIALS',
-                    'message': 'Invalid agent credentials'
-                }, status=status.HTTP_401_UNAUTHORIZED)
-            
-            # Add agent to request
-            request.agent = agent
-            return view_func(request, *args, **kwargs)
-            
-        except Exception as e:
-            return Response({
-                'success': False,
-                'error': 'AUTHENTICATION_ERROR',
-                'message': f'Authentication failed: {str(e)}'
-            }, status=status.HTTP_401_UNAUTHORIZED)
-    
-    return _wrapped_view
-
 
 @extend_schema(
     summary="Create Invoice",
@@ -531,22 +475,22 @@ def create_invoice_transactions(invoice_master, user):
     payment_type = invoice_master.paymentType
     net_total = invoice_master.netTotal
     
-    # Determine account ID based on payment type
+    # Determine account based on payment type
     if payment_type == PAYMENT_TYPE_CASH:
-        account_id = CASH_ACCOUNT_ID
+        account_key = accounts.CASH
     elif payment_type == PAYMENT_TYPE_VISA:
-        account_id = VISA_ACCOUNT_ID
+        account_key = accounts.VISA
     elif payment_type == PAYMENT_TYPE_PARTIAL_DEFERRED:
         if invoice_type in [INVOICE_TYPE_PURCHASES, INVOICE_TYPE_RETURN_PURCHASES]:
-            account_id = VENDORS_DEFERRED_ACCOUNT_ID
+            account_key = accounts.VENDORS_DEFERRED
         else:  # Sales or Return Sales
-            account_id = CUSTOMERS_DEFERRED_ACCOUNT_ID
+            account_key = accounts.CUSTOMERS_DEFERRED
     
-    # Get account object
+    # Get account object from the cached registry
     try:
-        account = Account.objects.get(id=account_id)
-    except Account.DoesNotExist:
-        raise Exception(f'Account with ID {account_id} not found')
+        account = accounts.get(account_key)
+    except Account.DoesNotExist as e:
+        raise Exception(str(e))
     
     # Create transactions based on invoice type
     if invoice_type == INVOICE_TYPE_PURCHASES:
@@ -565,7 +509,7 @@ def create_purchase_transactions(invoice_master, account, user):
     # Always create the deferred/liability transaction
     Transaction.objects.create(
         invoiceID=invoice_master,
-        accountID_id=38,  # Vendors Deferred Account
+        accountID=accounts.get(accounts.VENDORS_DEFERRED),
         customerVendorID=invoice_master.customerOrVendorID,
         amount=invoice_master.netTotal,  # Positive for debit (we owe vendor)
         type=TRANSACTION_TYPE_PURCHASE,
@@ -609,7 +553,7 @@ def create_sales_transactions(invoice_master, account, user):
     # Always create the deferred/receivable transaction
     Transaction.objects.create(
         invoiceID=invoice_master,
-        accountID_id=36,  # Customers Deferred Account
+        accountID=accounts.get(accounts.CUSTOMERS_DEFERRED),
         customerVendorID=invoice_master.customerOrVendorID,
         amount=-invoice_master.netTotal,  # Negative for credit (customer owes us)
         type=TRANSACTION_TYPE_SALES,
@@ -653,7 +597,7 @@ def create_return_purchase_transactions(invoice_master, account, user):
     # Always create the deferred/liability reversal transaction
     Transaction.objects.create(
         invoiceID=invoice_master,
-        accountID_id=38,  # Vendors Deferred Account
+        accountID=accounts.get(accounts.VENDORS_DEFERRED),
         customerVendorID=invoice_master.customerOrVendorID,
         amount=-invoice_master.netTotal,  # Negative for credit (we owe vendor less)
         type=TRANSACTION_TYPE_RETURN_PURCHASE,
@@ -697,7 +641,7 @@ def create_return_sales_transactions(invoice_master, account, user):
     # Always create the deferred/receivable reversal transaction
     Transaction.objects.create(
         invoiceID=invoice_master,
-        accountID_id=36,  # Customers Deferred Account
+        accountID=accounts.get(accounts.CUSTOMERS_DEFERRED),
         customerVendorID=invoice_master.customerOrVendorID,
         amount=invoice_master.netTotal,  # Positive for debit (customer owes us less)
         type=TRANSACTION_TYPE_RETURN_SALES,
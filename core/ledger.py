@@ -0,0 +1,226 @@
+"""
+Account ledger aggregates.
+Maintains the per-(account, day) AccountDailyBalance table from Transaction writes
+and answers account-level balance questions without rescanning transactions.
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Sum, Count, Case, When, F, Q, DecimalField, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from . import report_cache
+from .constants import SNAPSHOT_KIND_ACCOUNT
+from .models import Account, AccountDailyBalance, BalanceSnapshot, ClosedPeriod, Transaction
+
+ZERO = Decimal('0')
+AMOUNT_FIELD = DecimalField(max_digits=17, decimal_places=2)
+
+
+def transaction_day(created_at):
+    """Return the local calendar day a transaction belongs to."""
+    if created_at is None:
+        return timezone.localdate()
+    if timezone.is_naive(created_at):
+        return created_at.date()
+    return timezone.localdate(created_at)
+
+
+def day_bounds(day):
+    """Return the aware [start, end) datetimes of a local calendar day."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def ledger_entry(account_id, amount, created_at, is_deleted):
+    """
+    Describe how a transaction row contributes to the daily aggregates.
+    Returns None for rows that do not count (soft deleted or without amount).
+    """
+    if is_deleted or account_id is None or not amount:
+        return None
+    return (account_id, transaction_day(created_at), Decimal(amount))
+
+
+def entry_for_instance(instance):
+    """Ledger entry of an in-memory Transaction instance."""
+    return ledger_entry(instance.accountID_id, instance.amount, instance.createdAt, instance.isDeleted)
+
+
+def stored_entry(pk):
+    """Ledger entry of a Transaction as currently stored in the database."""
+    row = Transaction.objects.filter(pk=pk).values_list(
+        'accountID_id', 'amount', 'createdAt', 'isDeleted'
+    ).first()
+    return ledger_entry(*row) if row else None
+
+
+def _apply(entry, direction):
+    """Add (direction=1) or remove (direction=-1) an entry from its daily bucket."""
+    account_id, day, amount = entry
+    debit = amount if amount > 0 else ZERO
+    credit = -amount if amount < 0 else ZERO
+
+    AccountDailyBalance.objects.get_or_create(accountID_id=account_id, day=day)
+    AccountDailyBalance.objects.filter(accountID_id=account_id, day=day).update(
+        debit=F('debit') + debit * direction,
+        credit=F('credit') + credit * direction,
+        transactionCount=F('transactionCount') + direction,
+        updatedAt=timezone.now(),
+    )
+
+
+def record_transaction_change(previous, current):
+    """
+    Move a transaction's contribution from its previous ledger entry to its current one.
+    Uses relative F() updates so concurrent postings to the same bucket do not overwrite each other.
+    """
+    if previous == current:
+        return
+    with db_transaction.atomic():
+        if previous is not None:
+            _apply(previous, -1)
+        if current is not None:
+            _apply(current, 1)
+    report_cache.bump_history_if_past(entry[1] for entry in (previous, current) if entry is not None)
+
+
+def rebuild_account_daily_balances(date_from=None, date_to=None, account_ids=None):
+    """
+    Recompute daily aggregates from the transactions table.
+    Used for the initial backfill and to reconcile after bulk writes that bypass model signals.
+    Returns the number of aggregate rows written.
+    """
+    transactions = Transaction.objects.filter(isDeleted=False).exclude(amount__isnull=True)
+    buckets = AccountDailyBalance.objects.all()
+
+    if date_from:
+        transactions = transactions.filter(createdAt__gte=day_bounds(date_from)[0])
+        buckets = buckets.filter(day__gte=date_from)
+    if date_to:
+        transactions = transactions.filter(createdAt__lt=day_bounds(date_to)[1])
+        buckets = buckets.filter(day__lte=date_to)
+    if account_ids:
+        transactions = transactions.filter(accountID_id__in=account_ids)
+        buckets = buckets.filter(accountID_id__in=account_ids)
+
+    rows = transactions.annotate(
+        day=TruncDate('createdAt', tzinfo=timezone.get_current_timezone())
+    ).values('accountID_id', 'day').annotate(
+        debit=Coalesce(Sum(Case(When(amount__gt=0, then=F('amount')), default=Value(ZERO),
+                                output_field=AMOUNT_FIELD)), Value(ZERO), output_field=AMOUNT_FIELD),
+        credit=Coalesce(Sum(Case(When(amount__lt=0, then=-F('amount')), default=Value(ZERO),
+                                 output_field=AMOUNT_FIELD)), Value(ZERO), output_field=AMOUNT_FIELD),
+        transaction_count=Count('id'),
+    ).order_by()
+
+    with db_transaction.atomic():
+        buckets.delete()
+        created = AccountDailyBalance.objects.bulk_create(
+            (
+                AccountDailyBalance(
+                    accountID_id=row['accountID_id'],
+                    day=row['day'],
+                    debit=row['debit'],
+                    credit=row['credit'],
+                    transactionCount=row['transaction_count'],
+                )
+                for row in rows.iterator()
+            ),
+            batch_size=1000,
+        )
+    report_cache.bump_history_version()
+    return len(created)
+
+
+def opening_snapshot(date_from, account_ids=None):
+    """
+    Account balances stored by the latest period closed before date_from.
+    Returns (periodEnd, {account_id: balance}), or (None, {}) if no period was closed yet.
+    """
+    period = ClosedPeriod.objects.filter(
+        isDeleted=False, periodEnd__lt=date_from
+    ).order_by('-periodEnd').first()
+    if period is None:
+        return None, {}
+    snapshots = BalanceSnapshot.objects.filter(periodID=period, kind=SNAPSHOT_KIND_ACCOUNT)
+    if account_ids:
+        snapshots = snapshots.filter(accountID_id__in=account_ids)
+    return period.periodEnd, {
+        account_id: debit - credit
+        for account_id, debit, credit in snapshots.values_list('accountID_id', 'debit', 'credit')
+    }
+
+
+def trial_balance(date_from, date_to, account_ids=None):
+    """
+    Opening balance, period debits/credits and closing balance for every account.
+    Computed in a single grouped query over the daily aggregates, starting from the
+    latest closed-period snapshot so only open days are summed for the opening balance.
+    """
+    snapshot_end, snapshot = opening_snapshot(date_from, account_ids)
+    before_period = Q(accountdailybalance__day__lt=date_from)
+    if snapshot_end:
+        before_period &= Q(accountdailybalance__day__gt=snapshot_end)
+    in_period = Q(accountdailybalance__day__gte=date_from, accountdailybalance__day__lte=date_to)
+    net = F('accountdailybalance__debit') - F('accountdailybalance__credit')
+
+    accounts = Account.objects.filter(isDeleted=False)
+    if account_ids:
+        accounts = accounts.filter(id__in=account_ids)
+
+    accounts = accounts.annotate(
+        opening=Coalesce(Sum(net, filter=before_period, output_field=AMOUNT_FIELD), Value(ZERO),
+                         output_field=AMOUNT_FIELD),
+        period_debit=Coalesce(Sum('accountdailybalance__debit', filter=in_period), Value(ZERO),
+                              output_field=AMOUNT_FIELD),
+        period_credit=Coalesce(Sum('accountdailybalance__credit', filter=in_period), Value(ZERO),
+                               output_field=AMOUNT_FIELD),
+        period_count=Coalesce(Sum('accountdailybalance__transactionCount', filter=in_period), Value(0)),
+    ).order_by('accountName')
+
+    rows = []
+    for account in accounts:
+        opening = account.opening + snapshot.get(account.id, ZERO)
+        rows.append({
+            'account': account,
+            'opening': opening,
+            'debit': account.period_debit,
+            'credit': account.period_credit,
+            'transaction_count': account.period_count,
+            'closing': opening + account.period_debit - account.period_credit,
+        })
+    return rows
+
+
+def account_movements(account_id, date_from, date_to):
+    """
+    Opening balance and day-by-day movements of one account with a running balance.
+    Returns (opening, rows) where rows only cover days that had activity.
+    """
+    snapshot_end, snapshot = opening_snapshot(date_from, [account_id])
+    buckets = AccountDailyBalance.objects.filter(accountID_id=account_id, day__lt=date_from)
+    if snapshot_end:
+        buckets = buckets.filter(day__gt=snapshot_end)
+    opening = snapshot.get(account_id, ZERO) + buckets.aggregate(
+        total=Coalesce(Sum(F('debit') - F('credit'), output_field=AMOUNT_FIELD), Value(ZERO),
+                       output_field=AMOUNT_FIELD)
+    )['total']
+
+    running = opening
+    rows = []
+    for bucket in AccountDailyBalance.objects.filter(
+        accountID_id=account_id, day__gte=date_from, day__lte=date_to
+    ).order_by('day'):
+        running += bucket.debit - bucket.credit
+        rows.append({
+            'day': bucket.day,
+            'debit': bucket.debit,
+            'credit': bucket.credit,
+            'transaction_count': bucket.transactionCount,
+            'balance': running,
+        })
+    return opening, rows
@@ -0,0 +1,333 @@
+"""
+Live "today" KPIs for the dashboard.
+Sales and sales-return invoices, receipt and payment vouchers and visits per agent for the
+current local day, pushed to open dashboards as server-sent events.
+A commit that posts something dated today appends one PostingChange row per agent it touched;
+on PostgreSQL it also sends a NOTIFY on CHANNEL so streams wake at once, elsewhere streams poll
+the log. A stream then recomputes the KPIs of the agents named in the new rows only.
+An open stream holds a worker thread and its database connection, so each worker serves at most
+LIVE_MAX_STREAMS_PER_WORKER of them; other dashboards get a snapshot and reconnect later.
+"""
+
+import json
+import select
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction as db_transaction
+from django.db.models import Count, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import accounts
+from .constants import INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_SALES
+from .ledger import transaction_day
+from .models import Agent, InvoiceDetail, InvoiceMaster, PostingChange, Transaction, Visit
+from .partitioning import created_in_range
+
+ZERO = Decimal('0')
+CHANNEL = 'tantawy_postings'
+KPIS = (
+    'sales_count', 'sales_total', 'returns_count', 'returns_total',
+    'receipts_count', 'receipts_total', 'payments_count', 'payments_total', 'visits',
+)
+
+# Seconds between change log reads when LISTEN/NOTIFY is not available
+POLL_SECONDS = 2
+# Seconds between keep-alive comments (and change log reads while listening)
+HEARTBEAT_SECONDS = 15
+# Milliseconds the browser waits before reconnecting a closed stream
+RETRY_MS = 2000
+# Milliseconds before reconnecting when the worker had no stream slot left (snapshot polling)
+BUSY_RETRY_MS = 30000
+# Change log rows older than this are deleted
+CHANGE_RETENTION = timedelta(days=1)
+
+_last_prune = None
+
+# Streams open in this worker process
+_open_streams = 0
+_streams_lock = threading.Lock()
+
+
+def _agent_filter(agent_ids, field='agentID'):
+    query = Q(**{f'{field}_id__in': [agent_id for agent_id in agent_ids if agent_id is not None]})
+    if None in agent_ids:
+        query |= Q(**{f'{field}__isnull': True})
+    return query
+
+
+def _empty_kpis():
+    return {name: 0 if name.endswith(('_count', 'visits')) else ZERO for name in KPIS}
+
+
+def kpis(day, agent_ids=None):
+    """
+    {agent id (None for postings without an agent): KPIs} for one local day in three grouped
+    queries. With agent_ids only those agents are computed, and each is returned even when
+    it has no activity left (so a deleted posting brings its numbers back down).
+    """
+    invoices = InvoiceMaster.objects.filter(
+        created_in_range(day, day),
+        isDeleted=False,
+        invoiceType__in=[INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_SALES],
+    )
+    # Vouchers are the cash/bank legs not tied to an invoice
+    vouchers = Transaction.objects.filter(
+        created_in_range(day, day),
+        isDeleted=False,
+        invoiceID__isnull=True,
+        accountID_id__in=accounts.cash_bank_ids(),
+    )
+    visits = Visit.objects.filter(created_in_range(day, day, field='date'), isDeleted=False)
+    if agent_ids is not None:
+        invoices = invoices.filter(_agent_filter(agent_ids))
+        vouchers = vouchers.filter(_agent_filter(agent_ids))
+        visits = visits.filter(_agent_filter(agent_ids))
+
+    result = {agent_id: _empty_kpis() for agent_id in agent_ids or ()}
+
+    sales = Q(invoiceType=INVOICE_TYPE_SALES)
+    returns = Q(invoiceType=INVOICE_TYPE_RETURN_SALES)
+    for row in invoices.values('agentID_id').annotate(
+        sales_count=Count('id', filter=sales),
+        sales_total=Coalesce(Sum('netTotal', filter=sales), Value(ZERO)),
+        returns_count=Count('id', filter=returns),
+        returns_total=Coalesce(Sum('netTotal', filter=returns), Value(ZERO)),
+    ).order_by():
+        result.setdefault(row.pop('agentID_id'), _empty_kpis()).update(row)
+
+    receipts = Q(amount__gt=0)
+    payments = Q(amount__lt=0)
+    for row in vouchers.values('agentID_id').annotate(
+        receipts_count=Count('id', filter=receipts),
+        receipts_total=Coalesce(Sum('amount', filter=receipts), Value(ZERO)),
+        payments_count=Count('id', filter=payments),
+        payments_total=Coalesce(Sum('amount', filter=payments), Value(ZERO)),
+    ).order_by():
+        row['payments_total'] = -row['payments_total']
+        result.setdefault(row.pop('agentID_id'), _empty_kpis()).update(row)
+
+    for row in visits.values('agentID_id').annotate(visits=Count('id')).order_by():
+        result.setdefault(row.pop('agentID_id'), _empty_kpis()).update(row)
+
+    return result
+
+
+def payload(day, change_id, agent_kpis, full):
+    """Event body: {'day', 'change_id', 'full', 'agents': [{agent_id, agent_name, KPIs...}]}."""
+    names = dict(
+        Agent.objects.filter(id__in=[agent_id for agent_id in agent_kpis if agent_id is not None])
+        .values_list('id', 'agentName')
+    )
+    agents = [
+        dict(values, agent_id=agent_id, agent_name=names.get(agent_id))
+        for agent_id, values in sorted(agent_kpis.items(), key=lambda entry: (entry[0] is None, entry[0] or 0))
+    ]
+    return {'day': day, 'change_id': change_id, 'full': full, 'agents': agents}
+
+
+# --- Change log -----------------------------------------------------------------------------
+
+def publish(agent_ids):
+    """Log a committed change for `agent_ids` and wake the listening streams."""
+    global _last_prune
+    PostingChange.objects.bulk_create([PostingChange(agentID_id=agent_id) for agent_id in agent_ids])
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, ''])
+    now = timezone.now()
+    if _last_prune is None or now - _last_prune > timedelta(hours=1):
+        _last_prune = now
+        PostingChange.objects.filter(createdAt__lt=now - CHANGE_RETENTION).delete()
+
+
+class _PendingAgents(set):
+    """Agents touched by the current transaction; published once when it commits."""
+
+    def __call__(self):
+        connection._pending_live_agents = None
+        publish(self)
+
+
+def record_posting(agent_id, day):
+    """Note a write for `agent_id` dated `day`; only today's postings reach the live KPIs."""
+    if day != timezone.localdate():
+        return
+    if not connection.in_atomic_block:
+        publish({agent_id})
+        return
+    pending = getattr(connection, '_pending_live_agents', None)
+    if pending is None or not any(entry[1] is pending for entry in connection.run_on_commit):
+        pending = _PendingAgents()
+        connection._pending_live_agents = pending
+        db_transaction.on_commit(pending)
+    pending.add(agent_id)
+
+
+def record_instance(instance):
+    """record_posting() for a saved or deleted invoice, invoice line, voucher leg or visit."""
+    if isinstance(instance, InvoiceDetail):
+        if InvoiceDetail.invoiceMasterID.is_cached(instance):
+            master = instance.invoiceMasterID
+            posting = (master.agentID_id, master.createdAt)
+        else:
+            posting = InvoiceMaster.objects.filter(pk=instance.invoiceMasterID_id).values_list(
+                'agentID_id', 'createdAt'
+            ).first()
+            if posting is None:
+                return
+        agent_id, created_at = posting
+    elif isinstance(instance, Visit):
+        # Saved as given: batch_create_visits passes the ISO string of the request
+        agent_id, created_at = instance.agentID_id, Visit._meta.get_field('date').to_python(instance.date)
+    elif isinstance(instance, Transaction) and instance.invoiceID_id is not None:
+        # Invoice payments are reported with their invoice
+        return
+    else:
+        agent_id, created_at = instance.agentID_id, instance.createdAt
+    record_posting(agent_id, transaction_day(created_at))
+
+
+def last_change_id():
+    return PostingChange.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def changes_since(change_id):
+    """(latest change id, agents touched) for the log rows after `change_id`."""
+    latest = change_id
+    agent_ids = set()
+    for row_id, agent_id in PostingChange.objects.filter(id__gt=change_id).values_list('id', 'agentID_id'):
+        latest = max(latest, row_id)
+        agent_ids.add(agent_id)
+    return latest, agent_ids
+
+
+# --- Server-sent events ---------------------------------------------------------------------
+
+def _listen():
+    """LISTEN on CHANNEL with the request's connection; None when notifications are unavailable."""
+    if connection.vendor != 'postgresql' or connection.in_atomic_block:
+        return None
+    connection.ensure_connection()
+    raw = connection.connection
+    if not hasattr(raw, 'poll'):
+        # psycopg 3 delivers notifications through a generator; poll the change log instead
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(f'LISTEN {CHANNEL}')
+    return raw
+
+
+def _unlisten(listener):
+    if listener is not None and connection.connection is listener:
+        with connection.cursor() as cursor:
+            cursor.execute(f'UNLISTEN {CHANNEL}')
+
+
+def _wait(listener, timeout):
+    """Sleep until a notification arrives (when listening) or `timeout` seconds pass."""
+    if listener is None:
+        time.sleep(timeout)
+        return
+    if not listener.notifies and select.select([listener], [], [], timeout)[0]:
+        listener.poll()
+    listener.notifies.clear()
+
+
+def _event_id(day, change_id):
+    return f'{day.isoformat()}:{change_id}'
+
+
+def _parse_event_id(value):
+    """(day, change id) from a Last-Event-ID header, or None."""
+    try:
+        day, change_id = (value or '').split(':')
+        return date.fromisoformat(day), int(change_id)
+    except ValueError:
+        return None
+
+
+def _event(day, change_id, agent_kpis, full):
+    data = json.dumps(payload(day, change_id, agent_kpis, full), cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f'event: kpis\nid: {_event_id(day, change_id)}\ndata: {data}\n\n'
+
+
+def _claim_stream():
+    """Take one of this worker's LIVE_MAX_STREAMS_PER_WORKER stream slots; False when none is left."""
+    global _open_streams
+    with _streams_lock:
+        if _open_streams >= settings.LIVE_MAX_STREAMS_PER_WORKER:
+            return False
+        _open_streams += 1
+        return True
+
+
+def _release_stream():
+    global _open_streams
+    with _streams_lock:
+        _open_streams -= 1
+
+
+def stream(last_event_id=None, duration=None):
+    """
+    Server-sent events for the live KPIs. Starts with a full snapshot of today (or, when
+    resuming from a Last-Event-ID of today, with the changes after it), then sends one event per
+    batch of committed changes with the KPIs of the agents involved, and a new snapshot when the
+    day rolls over. Ends after `duration` seconds (LIVE_STREAM_SECONDS); the browser reconnects
+    and resumes from the last event id.
+    When the worker already serves LIVE_MAX_STREAMS_PER_WORKER streams, sends a snapshot and
+    ends at once, asking the browser to reconnect after BUSY_RETRY_MS.
+    """
+    if not _claim_stream():
+        day = timezone.localdate()
+        yield f'retry: {BUSY_RETRY_MS}\n\n'
+        yield _event(day, last_change_id(), kpis(day), full=True)
+        return
+    try:
+        yield from _stream(last_event_id, duration)
+    finally:
+        _release_stream()
+
+
+def _stream(last_event_id, duration):
+    duration = settings.LIVE_STREAM_SECONDS if duration is None else duration
+    deadline = time.monotonic() + duration
+    listener = _listen()
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        day = timezone.localdate()
+        resume = _parse_event_id(last_event_id)
+        if resume and resume[0] == day:
+            change_id = resume[1]
+        else:
+            change_id = last_change_id()
+            yield _event(day, change_id, kpis(day), full=True)
+
+        timeout = POLL_SECONDS if listener is None else HEARTBEAT_SECONDS
+        last_sent = time.monotonic()
+        while True:
+            if timezone.localdate() != day:
+                day = timezone.localdate()
+                change_id = last_change_id()
+                yield _event(day, change_id, kpis(day), full=True)
+                last_sent = time.monotonic()
+            else:
+                latest, agent_ids = changes_since(change_id)
+                if agent_ids:
+                    change_id = latest
+                    yield _event(day, change_id, kpis(day, agent_ids), full=False)
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+                    yield ': keep-alive\n\n'
+                    last_sent = time.monotonic()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _wait(listener, min(timeout, remaining))
+    finally:
+        _unlisten(listener)
@@ -0,0 +1,228 @@
+"""
+Customer locations and proximity search.
+A customer's location is the median latitude and longitude of its latest visits, kept in
+CustomerLocation with the geohash of the point. Nearby customers are found without PostGIS:
+the few geohash cells covering the search circle are looked up by prefix (an indexed LIKE),
+then the candidates are ranked by great-circle distance.
+Locations are rebuilt by refresh_customer_locations() (refresh_customer_locations command)
+for customers whose visits changed since a high-water mark on Visit.updatedAt.
+"""
+
+import math
+from datetime import timedelta
+from decimal import Decimal
+from functools import reduce
+from itertools import groupby
+from operator import or_
+from statistics import median
+
+from django.db import transaction as db_transaction
+from django.db.models import F, Max, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import CustomerLocation, FactRefreshState, Visit
+
+STATE_NAME = 'customerLocations'
+
+# Latest visits a location is the median of
+RECENT_VISITS = 10
+# Stored geohash length (cells of about 150 m x 150 m)
+GEOHASH_PRECISION = 7
+# Customers refreshed per transaction
+CHUNK_SIZE = 500
+
+# nearby_customers API limits
+DEFAULT_RADIUS_KM = 5
+MAX_RADIUS_KM = 50
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+SCOPE_PLAN = 'plan'
+SCOPE_TERRITORY = 'territory'
+
+# Visits updated shortly before the mark may commit after it; re-read them on every catch-up
+SAFETY_LAG = timedelta(minutes=5)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Same precision as Visit coordinates
+COORDINATE = Decimal('0.0000001')
+
+
+# --- Geohash --------------------------------------------------------------------------------
+
+def geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Geohash of a point: bits alternate longitude/latitude halvings, 5 bits per character."""
+    latitude, longitude = float(latitude), float(longitude)
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    value = bits = 0
+    even = True
+    while len(chars) < precision:
+        bounds, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            value = bits = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell of `precision` characters."""
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """
+    Geohash prefixes whose cells together cover the circle of `radius_km` around a point.
+    Uses the longest prefix whose cells are at least as large as the radius, so the circle's
+    bounding box spans at most 3 x 3 cells.
+    """
+    latitude, longitude = float(latitude), float(longitude)
+    lat_delta = radius_km / KM_PER_DEGREE
+    lon_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(candidate)
+        if height >= lat_delta and width >= lon_delta:
+            precision = candidate
+            break
+    height, width = cell_size(precision)
+
+    south, north = max(latitude - lat_delta, -90.0), min(latitude + lat_delta, 90.0)
+    west, east = longitude - lon_delta, longitude + lon_delta
+    cells = set()
+    lat = south
+    while True:
+        lon = west
+        while True:
+            cells.add(geohash(min(lat, 89.999999), (lon + 180) % 360 - 180, precision))
+            if lon >= east:
+                break
+            lon = min(lon + width, east)
+        if lat >= north:
+            break
+        lat = min(lat + height, north)
+    return sorted(cells)
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance between two points."""
+    lat1, lon1, lat2, lon2 = map(math.radians, map(float, (lat1, lon1, lat2, lon2)))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+# --- Nearby search --------------------------------------------------------------------------
+
+def nearby(latitude, longitude, radius_km, limit, customer_ids=None, agent=None):
+    """
+    The `limit` nearest live customers within `radius_km` of a point, nearest first:
+    [(location, distance_km), ...]. Restricted to `customer_ids` when given (an agent's plan)
+    and to customers last visited by `agent` when given (the agent's territory).
+    """
+    queryset = CustomerLocation.objects.filter(
+        reduce(or_, (Q(geohash__startswith=cell) for cell in covering_cells(latitude, longitude, radius_km))),
+        customerVendorID__type=1,
+        customerVendorID__isDeleted=False,
+    ).select_related('customerVendorID')
+    if customer_ids is not None:
+        queryset = queryset.filter(customerVendorID__in=customer_ids)
+    if agent is not None:
+        queryset = queryset.filter(agentID=agent)
+
+    found = []
+    for location in queryset:
+        distance = distance_km(latitude, longitude, location.latitude, location.longitude)
+        if distance <= radius_km:
+            found.append((location, distance))
+    found.sort(key=lambda pair: (pair[1], pair[0].customerVendorID_id))
+    return found[:limit]
+
+
+# --- Refresh --------------------------------------------------------------------------------
+
+def _recent_visits(customer_ids):
+    """(customer, agent, date, latitude, longitude) of each customer's latest live visits."""
+    return Visit.objects.filter(
+        customerVendor__in=customer_ids,
+        isDeleted=False,
+    ).exclude(
+        # Visits saved without a GPS fix
+        latitude=0, longitude=0,
+    ).annotate(
+        recent=Window(RowNumber(), partition_by=F('customerVendor'), order_by=[F('date').desc(), F('id').desc()]),
+    ).filter(
+        recent__lte=RECENT_VISITS,
+    ).order_by('customerVendor', '-date', '-id').values_list(
+        'customerVendor', 'agentID', 'date', 'latitude', 'longitude'
+    )
+
+
+def refresh_customers(customer_ids):
+    """Recompute the locations of the given customers. Returns the number of rows written."""
+    customer_ids = sorted(set(customer_ids))
+    written = 0
+    for start in range(0, len(customer_ids), CHUNK_SIZE):
+        chunk = customer_ids[start:start + CHUNK_SIZE]
+        locations = []
+        for customer_id, rows in groupby(_recent_visits(chunk), key=lambda row: row[0]):
+            rows = list(rows)
+            latitude = median(row[3] for row in rows).quantize(COORDINATE)
+            longitude = median(row[4] for row in rows).quantize(COORDINATE)
+            locations.append(CustomerLocation(
+                customerVendorID_id=customer_id,
+                latitude=latitude,
+                longitude=longitude,
+                geohash=geohash(latitude, longitude),
+                agentID_id=rows[0][1],
+                visitCount=len(rows),
+                lastVisitAt=rows[0][2],
+            ))
+        with db_transaction.atomic():
+            # Customers without usable visits lose their location
+            CustomerLocation.objects.filter(customerVendorID__in=chunk).delete()
+            written += len(CustomerLocation.objects.bulk_create(locations, batch_size=1000))
+    return written
+
+
+def changed_customers(since):
+    """Customers with a visit updated after `since` (every visited customer when None)."""
+    visits = Visit.objects.filter(customerVendor__isnull=False)
+    if since:
+        visits = visits.filter(updatedAt__gt=since)
+    return set(visits.order_by().values_list('customerVendor', flat=True).distinct())
+
+
+def refresh_customer_locations(full=False):
+    """
+    Catch the locations up with visit writes since the stored high-water mark (minus
+    SAFETY_LAG); full=True rebuilds every location. Returns (customers refreshed, rows written).
+    """
+    state, _ = FactRefreshState.objects.get_or_create(name=STATE_NAME)
+    # Taken before reading so visits written during the refresh are seen by the next one
+    mark = Visit.objects.aggregate(last=Max('updatedAt'))['last'] or timezone.now()
+
+    if full:
+        CustomerLocation.objects.all().delete()
+        customers = changed_customers(None)
+    else:
+        since = state.highWaterMark - SAFETY_LAG if state.highWaterMark else None
+        customers = changed_customers(since)
+
+    written = refresh_customers(customers)
+    state.highWaterMark = mark
+    state.save()
+    return len(customers), written
@@ -0,0 +1,86 @@
+"""
+Management command to benchmark the report pages, stock endpoints and mobile APIs
+"""
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from core import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Time every report and API endpoint (wall time, queries, peak memory) and write the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='benchmark_results.json',
+            help='Results file to write (default: benchmark_results.json)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Requests per endpoint; the first runs with a cold report cache (default: 3)'
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            metavar='PREFIX',
+            help='Only run benchmarks whose name starts with one of these prefixes (e.g. reports. mobile.)'
+        )
+        parser.add_argument(
+            '--compare',
+            metavar='BASELINE',
+            help='Results file of an earlier run to compare against'
+        )
+        parser.add_argument(
+            '--encodings',
+            action='store_true',
+            help='Compare payload size and encode time of the response encodings (JSON, MessagePack, '
+                 'gzip, brotli, columnar layout) for the large mobile lists instead'
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List the benchmark names and exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for benchmark in benchmarks.BENCHMARKS:
+                self.stdout.write(f'{benchmark.name:<40} {benchmark.auth}')
+            return
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        if options['encodings']:
+            results = benchmarks.run_encodings(options['only'], repeat=options['repeat'], log=self.stdout.write)
+            if not results['results']:
+                raise CommandError('No benchmark matched --only')
+            Path(options['output']).write_text(json.dumps(results, indent=2, default=str))
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+            return
+
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read {options["compare"]}: {exc}')
+
+        results = benchmarks.run(options['only'], repeat=options['repeat'], log=self.stdout.write)
+        if not results['results']:
+            raise CommandError('No benchmark matched --only')
+        Path(options['output']).write_text(json.dumps(results, indent=2, default=str))
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+        failed = [name for name, result in results['results'].items() if result['status'] >= 400]
+        if failed:
+            self.stdout.write(self.style.WARNING(f'Error responses: {", ".join(failed)}'))
+
+        if baseline:
+            self.stdout.write(f'\nCompared with {options["compare"]} (commit {baseline["meta"].get("commit")}):')
+            for name, metric, before, after, change in benchmarks.compare(baseline, results):
+                change = f'{change:+.1f}%' if change is not None else 'n/a'
+                self.stdout.write(f'{name:<40} {metric:<8} {before:>10} -> {after:>10} {change:>8}')
@@ -0,0 +1,83 @@
+"""
+Management command to close (or reopen) accounting months
+"""
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core import periods
+
+
+class Command(BaseCommand):
+    help = 'Close a month: store balance snapshots and block back-dated writes into it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            help='Month to close (YYYY-MM). Defaults to the month after the latest closed period, '
+                 'or the previous calendar month if nothing was closed yet'
+        )
+        parser.add_argument(
+            '--through',
+            help='Close every month up to and including this one (YYYY-MM), in order'
+        )
+        parser.add_argument(
+            '--notes',
+            help='Notes stored with the closed period'
+        )
+        parser.add_argument(
+            '--reopen',
+            action='store_true',
+            help='Reopen the latest closed period instead of closing one'
+        )
+
+    def handle(self, *args, **options):
+        if options['reopen']:
+            period_end = periods.reopen_latest_period()
+            if period_end is None:
+                raise CommandError('No closed period to reopen')
+            self.stdout.write(self.style.SUCCESS(f'Reopened the period ending {period_end}'))
+            return
+
+        if options['month'] and options['through']:
+            raise CommandError('Use either --month or --through')
+
+        if options['through']:
+            through = self._parse_month(options['through'], '--through')
+            latest = periods.latest_period()
+            if latest is None:
+                raise CommandError('--through needs an already closed period to continue from; close the first month with --month')
+            month_ends = []
+            period_end = periods.month_end(latest.periodEnd + timedelta(days=1))
+            while period_end <= through:
+                month_ends.append(period_end)
+                period_end = periods.month_end(period_end + timedelta(days=1))
+        elif options['month']:
+            month_ends = [self._parse_month(options['month'], '--month')]
+        else:
+            latest = periods.latest_period()
+            if latest:
+                month_ends = [periods.month_end(latest.periodEnd + timedelta(days=1))]
+            else:
+                month_ends = [timezone.localdate().replace(day=1) - timedelta(days=1)]
+
+        if not month_ends:
+            raise CommandError('Nothing to close')
+
+        for period_end in month_ends:
+            try:
+                period = periods.close_period(period_end, notes=options['notes'])
+            except ValidationError as e:
+                raise CommandError('; '.join(e.messages))
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Closed {period_end:%Y-%m} with {period.balancesnapshot_set.count()} balance snapshots'
+                )
+            )
+
+    def _parse_month(self, value, option):
+        try:
+            return periods.month_end(datetime.strptime(value, '%Y-%m').date())
+        except ValueError:
+            raise CommandError(f'{option} must be in YYYY-MM format')
@@ -0,0 +1,68 @@
+"""
+Management command to fill a benchmark database with a reproducible synthetic dataset
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core.models import InvoiceMaster
+from core.synthetic import SCALES, generate
+
+SIZE_HELP = {
+    'customers': 'Number of customers',
+    'vendors': 'Number of vendors',
+    'items': 'Number of items',
+    'stores': 'Number of stores',
+    'agents': 'Number of agents (each gets an active visit plan)',
+    'invoices': 'Number of invoices of all types',
+    'lines': 'Average lines per invoice',
+    'vouchers': 'Number of standalone receipt vouchers (two transactions each)',
+    'visits': 'Number of visits',
+    'days': 'Days of history the rows are spread over',
+}
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic customers, items, invoices, transactions and visits for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            choices=sorted(SCALES),
+            default='small',
+            help='Preset dataset size (default: small); the options below override single sizes'
+        )
+        for name, help_text in SIZE_HELP.items():
+            parser.add_argument(f'--{name}', type=int, help=help_text)
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed; the same sizes and seed generate the same data (default: 1)'
+        )
+        parser.add_argument(
+            '--allow-existing',
+            action='store_true',
+            help='Add to a database that already has invoices (refused by default)'
+        )
+
+    def handle(self, *args, **options):
+        sizes = dict(SCALES[options['scale']])
+        for name in sizes:
+            if options[name] is not None:
+                if options[name] < 1:
+                    raise CommandError(f'--{name} must be at least 1')
+                sizes[name] = options[name]
+
+        if not options['allow_existing'] and InvoiceMaster.objects.exists():
+            raise CommandError(
+                'The database already has invoices. Generate benchmark data into a separate database '
+                'or pass --allow-existing.'
+            )
+
+        self.stdout.write('Generating: ' + ', '.join(f'{name}={value}' for name, value in sizes.items()))
+        started = time.monotonic()
+        counts = generate(sizes, seed=options['seed'], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {counts['invoices']} invoices, {counts['lines']} lines, {counts['transactions']} "
+            f"transactions and {counts['visits']} visits in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,90 @@
+"""
+Management command for the optional monthly partitioning of transactions and invoices.
+
+Usage:
+    python manage.py partition_tables status
+    python manage.py partition_tables convert            # One-time migration of existing data
+    python manage.py partition_tables create --months-ahead 3
+    python manage.py partition_tables detach --before 2024-01-01
+
+Run `create` periodically (e.g. a monthly cron job) so inserts never land in the default partition.
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from core import partitioning
+
+
+class Command(BaseCommand):
+    help = 'Convert, extend and archive the monthly partitions of transactions, invoiceMaster and invoiceDetail (PostgreSQL only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action',
+            choices=['status', 'convert', 'create', 'detach'],
+            help='status: list partitions, convert: partition existing tables, '
+                 'create: add future partitions, detach: detach old partitions for archiving'
+        )
+        parser.add_argument(
+            '--table',
+            action='append',
+            dest='tables',
+            choices=partitioning.PARTITIONED_TABLES,
+            help='Limit the action to a table (can be repeated). Defaults to all partitioned tables'
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=3,
+            help='Number of future months to create partitions for (default: 3)'
+        )
+        parser.add_argument(
+            '--before',
+            help='Detach partitions that end on or before this date (YYYY-MM-DD)'
+        )
+
+    def handle(self, *args, **options):
+        tables = options['tables'] or partitioning.PARTITIONED_TABLES
+        # Keep the documented conversion order regardless of how tables were passed
+        tables = [table for table in partitioning.PARTITIONED_TABLES if table in tables]
+
+        try:
+            getattr(self, f'_{options["action"]}')(tables, options)
+        except partitioning.PartitioningError as e:
+            raise CommandError(str(e))
+
+    def _status(self, tables, options):
+        for table in tables:
+            if not partitioning.is_partitioned(table):
+                self.stdout.write(f'{table}: not partitioned')
+                continue
+            partitions = partitioning.list_partitions(table)
+            self.stdout.write(f'{table}: {len(partitions)} partitions')
+            for name in partitions:
+                self.stdout.write(f'  {name}')
+
+    def _convert(self, tables, options):
+        for table in tables:
+            if partitioning.convert_table(table, months_ahead=options['months_ahead']):
+                self.stdout.write(self.style.SUCCESS(f'Converted {table} to monthly partitions'))
+            else:
+                self.stdout.write(f'{table} is already partitioned')
+
+    def _create(self, tables, options):
+        created = partitioning.ensure_partitions(months_ahead=options['months_ahead'], tables=tables)
+        for name in created:
+            self.stdout.write(f'Created {name}')
+        self.stdout.write(self.style.SUCCESS(f'Created {len(created)} partitions'))
+
+    def _detach(self, tables, options):
+        if not options['before']:
+            raise CommandError('--before is required for detach')
+        try:
+            before = datetime.strptime(options['before'], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('--before must be in YYYY-MM-DD format')
+
+        detached = partitioning.detach_partitions(before, tables=tables)
+        for name in detached:
+            self.stdout.write(f'Detached {name} (archive with pg_dump -t \'"{name}"\', then drop it)')
+        self.stdout.write(self.style.SUCCESS(f'Detached {len(detached)} partitions'))
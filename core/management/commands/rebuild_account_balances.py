@@ -0,0 +1,53 @@
+"""
+Management command to rebuild the daily account aggregates from transactions
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from core.ledger import rebuild_account_daily_balances
+
+
+class Command(BaseCommand):
+    help = 'Rebuild accountDailyBalances from the transactions table (full or for a date range)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date-from',
+            help='First day to rebuild (YYYY-MM-DD). Defaults to the beginning of history'
+        )
+        parser.add_argument(
+            '--date-to',
+            help='Last day to rebuild (YYYY-MM-DD). Defaults to today'
+        )
+        parser.add_argument(
+            '--account',
+            type=int,
+            action='append',
+            dest='accounts',
+            help='Limit the rebuild to an account ID (can be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        date_from = self._parse_date(options['date_from'], '--date-from')
+        date_to = self._parse_date(options['date_to'], '--date-to')
+
+        if date_from and date_to and date_from > date_to:
+            raise CommandError('--date-from must be before --date-to')
+
+        written = rebuild_account_daily_balances(
+            date_from=date_from,
+            date_to=date_to,
+            account_ids=options['accounts'],
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {written} account/day aggregate rows')
+        )
+
+    def _parse_date(self, value, option):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'{option} must be in YYYY-MM-DD format')
@@ -0,0 +1,19 @@
+"""
+Management command to recount the dashboard counters from their tables
+"""
+from django.core.management.base import BaseCommand
+from core.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount dashboardCounters from the source tables (run periodically to repair drift)'
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for name, (stored, counted) in sorted(reconcile().items()):
+            if stored != counted:
+                drifted += 1
+                self.stdout.write(f'{name}: {stored} -> {counted}')
+        self.stdout.write(
+            self.style.SUCCESS(f'Dashboard counters reconciled, {drifted} corrected')
+        )
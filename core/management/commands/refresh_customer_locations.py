@@ -0,0 +1,22 @@
+"""
+Management command to recompute customer locations from their latest visits
+"""
+from django.core.management.base import BaseCommand
+from core.locations import refresh_customer_locations
+
+
+class Command(BaseCommand):
+    help = 'Refresh customerLocations for customers visited since the last run (or rebuild it with --full)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild every location instead of catching up from the high-water mark'
+        )
+
+    def handle(self, *args, **options):
+        customers, written = refresh_customer_locations(full=options['full'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Refreshed {customers} customer(s), {written} location rows written')
+        )
@@ -0,0 +1,22 @@
+"""
+Management command to catch the daily sales fact table up with invoice writes
+"""
+from django.core.management.base import BaseCommand
+from core.facts import refresh_sales_facts
+
+
+class Command(BaseCommand):
+    help = 'Refresh salesFacts for invoices changed since the last run (or rebuild it with --full)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild the whole fact table instead of catching up from the high-water mark'
+        )
+
+    def handle(self, *args, **options):
+        days, written = refresh_sales_facts(full=options['full'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {days} day(s), {written} sales fact rows written')
+        )
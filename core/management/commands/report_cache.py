@@ -0,0 +1,45 @@
+"""
+Management command to inspect and invalidate the shared report cache
+"""
+from django.core.management.base import BaseCommand
+from core import report_cache
+
+
+class Command(BaseCommand):
+    help = 'Show report cache hit/miss statistics, or invalidate cached report results'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action',
+            nargs='?',
+            default='stats',
+            choices=['stats', 'clear', 'reset-stats'],
+            help='stats (default): hit/miss counters per report; clear: invalidate every cached '
+                 'result; reset-stats: zero the counters'
+        )
+
+    def handle(self, *args, **options):
+        action = options['action']
+
+        if action == 'clear':
+            report_cache.bump_data_version()
+            self.stdout.write(self.style.SUCCESS(
+                f'Report cache invalidated (data version {report_cache.data_version()})'
+            ))
+            return
+
+        if action == 'reset-stats':
+            report_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Report cache statistics reset'))
+            return
+
+        stats = report_cache.stats()
+        self.stdout.write(f'Data version: {report_cache.data_version()}')
+        if not stats:
+            self.stdout.write('No report has been served from the cache yet')
+            return
+        for name, counters in sorted(stats.items()):
+            self.stdout.write(
+                f'{name:<24} hits={counters["hits"]:<8} misses={counters["misses"]:<8} '
+                f'hit rate={counters["hit_rate"]:.1%}'
+            )
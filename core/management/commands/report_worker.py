@@ -0,0 +1,100 @@
+"""
+Management command that builds queued background reports in a process pool
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from core import report_runner
+from core.constants import REPORT_RUN_STATUS_CHOICES
+
+
+class Command(BaseCommand):
+    help = (
+        'Build queued report runs in background processes (runs until interrupted, or use --once). '
+        'Run a single worker per database: it requeues runs left running when it starts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=2,
+            help='Number of reports built at the same time (default: 2)'
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=5,
+            help='Seconds to wait between checks for queued runs (default: 5)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit as soon as no queued or running reports are left'
+        )
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        if processes < 1:
+            raise CommandError('--processes must be at least 1')
+
+        # Runs still marked running belong to a previous worker that stopped mid-way
+        reset = report_runner.requeue_interrupted_runs()
+        if reset:
+            self.stdout.write(f'Reset {reset} run(s) left running by a stopped worker')
+
+        pool = None
+        pending = {}
+        try:
+            while True:
+                if pool is None:
+                    # Spawned children start from a fresh interpreter with their own connections.
+                    # The initializer must not import models: it is unpickled before apps are ready.
+                    pool = ProcessPoolExecutor(
+                        max_workers=processes,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=django.setup,
+                    )
+
+                for future in [f for f in pending if f.done()]:
+                    run_id = pending.pop(future)
+                    try:
+                        status = future.result()
+                    except BrokenProcessPool as exc:
+                        # A child died (e.g. killed for memory); the pool cannot be reused
+                        report_runner.mark_failed(run_id, f'Worker process crashed: {exc}')
+                        self.stderr.write(f'Run {run_id} crashed: {exc}')
+                        if pool is not None:
+                            pool.shutdown(wait=False)
+                            pool = None
+                        continue
+                    except Exception as exc:
+                        report_runner.mark_failed(run_id, f'{type(exc).__name__}: {exc}')
+                        self.stderr.write(f'Run {run_id} failed: {exc}')
+                        continue
+                    self.stdout.write(f'Run {run_id}: {dict(REPORT_RUN_STATUS_CHOICES)[status]}')
+                if pool is None:
+                    continue
+
+                free = processes - len(pending)
+                claimed = report_runner.claim_runs(free) if free else []
+                for run_id in claimed:
+                    self.stdout.write(f'Run {run_id} started')
+                    pending[pool.submit(report_runner.execute_run, run_id)] = run_id
+
+                if options['once'] and not claimed and not pending:
+                    break
+                if not claimed:
+                    time.sleep(options['poll'] if not options['once'] else 0.5)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping: waiting for running reports to finish')
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+
+        self.stdout.write(self.style.SUCCESS('Report worker stopped'))
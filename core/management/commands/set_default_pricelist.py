@@ -2,8 +2,10 @@
 Management command to set default price list for all customer/vendor records
 """
 from django.core.management.base import BaseCommand
+from core import plans
 from core.models import CustomerVendor, PriceList, CustomerVendorPriceList
 from django.db import transaction
+from django.utils import timezone
 
 
 class Command(BaseCommand):
@@ -92,9 +94,10 @@ class Command(BaseCommand):
         # Apply updates
         with transaction.atomic():
             # First, update existing mappings to the target price list
+            # (updatedAt set explicitly: queryset updates skip auto_now)
             updated_existing = CustomerVendorPriceList.objects.filter(
                 isDeleted=False
-            ).update(priceListID_id=pricelist_id)
+            ).update(priceListID_id=pricelist_id, updatedAt=timezone.now())
             
             # Then, create new mappings for customers without any mapping
             new_mappings = []
@@ -107,6 +110,8 @@ class Command(BaseCommand):
                 )
             
             created_count = len(CustomerVendorPriceList.objects.bulk_create(new_mappings))
+            # Queryset updates and bulk inserts skip the signals that invalidate cached visit plans
+            plans.bump_on_commit()
             
             total_updated = updated_existing + created_count
 
@@ -0,0 +1,71 @@
+# Generated manually to add daily account aggregates for account-level reports
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum, Count, Case, When, F, Value, DecimalField
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+
+def backfill_account_daily_balances(apps, schema_editor):
+    """Aggregate existing transactions into (account, day) rows"""
+    Transaction = apps.get_model('core', 'Transaction')
+    AccountDailyBalance = apps.get_model('core', 'AccountDailyBalance')
+    amount_field = DecimalField(max_digits=17, decimal_places=2)
+    zero = Decimal('0')
+
+    rows = Transaction.objects.filter(isDeleted=False).exclude(amount__isnull=True).annotate(
+        day=TruncDate('createdAt', tzinfo=timezone.get_current_timezone())
+    ).values('accountID_id', 'day').annotate(
+        debit=Coalesce(Sum(Case(When(amount__gt=0, then=F('amount')), default=Value(zero),
+                                output_field=amount_field)), Value(zero), output_field=amount_field),
+        credit=Coalesce(Sum(Case(When(amount__lt=0, then=-F('amount')), default=Value(zero),
+                                 output_field=amount_field)), Value(zero), output_field=amount_field),
+        transaction_count=Count('id'),
+    ).order_by()
+
+    AccountDailyBalance.objects.bulk_create(
+        (
+            AccountDailyBalance(
+                accountID_id=row['accountID_id'],
+                day=row['day'],
+                debit=row['debit'],
+                credit=row['credit'],
+                transactionCount=row['transaction_count'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_create_storeadmins_group'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountDailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Local calendar day (settings.TIME_ZONE) of the transactions')),
+                ('debit', models.DecimalField(decimal_places=2, default=0, help_text='Sum of positive transaction amounts for the day', max_digits=17)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, help_text='Sum of negative transaction amounts for the day (stored positive)', max_digits=17)),
+                ('transactionCount', models.IntegerField(default=0, help_text='Number of transactions posted on the day')),
+                ('updatedAt', models.DateTimeField(auto_now=True, help_text='Timestamp when aggregate was last refreshed')),
+                ('accountID', models.ForeignKey(help_text='Associated account', on_delete=django.db.models.deletion.CASCADE, to='core.account')),
+            ],
+            options={
+                'verbose_name': 'Account Daily Balance',
+                'verbose_name_plural': 'Account Daily Balances',
+                'db_table': 'accountDailyBalances',
+                'ordering': ['accountID', 'day'],
+                'unique_together': {('accountID', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_account_daily_balances, migrations.RunPython.noop),
+    ]
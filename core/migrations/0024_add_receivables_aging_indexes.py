@@ -0,0 +1,30 @@
+# Generated manually to support the receivables aging report
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_add_account_daily_balances'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='''
+            -- Open (unpaid / partially paid) sales and sales-return invoices per customer
+            CREATE INDEX IF NOT EXISTS "invoiceMaster_open_by_customer_idx"
+                ON "invoiceMaster" ("customerOrVendorID_id", "createdAt", id)
+                WHERE "isDeleted" = FALSE AND "invoiceType" IN (2, 4) AND status IN (1, 2);
+            
+            -- Customer transactions (statements, balances, unapplied receipts)
+            CREATE INDEX IF NOT EXISTS "transactions_customer_created_idx"
+                ON transactions ("customerVendorID_id", "createdAt", id)
+                WHERE "isDeleted" = FALSE;
+            ''',
+            reverse_sql='''
+            DROP INDEX IF EXISTS "invoiceMaster_open_by_customer_idx";
+            DROP INDEX IF EXISTS "transactions_customer_created_idx";
+            '''
+        ),
+    ]
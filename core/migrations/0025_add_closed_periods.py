@@ -0,0 +1,59 @@
+# Generated manually to add period close with balance snapshots
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0024_add_receivables_aging_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClosedPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, help_text='Timestamp when record was created')),
+                ('updatedAt', models.DateTimeField(auto_now=True, blank=True, help_text='Timestamp when record was last updated', null=True)),
+                ('deletedAt', models.DateTimeField(blank=True, help_text='Timestamp when record was soft deleted', null=True)),
+                ('isDeleted', models.BooleanField(default=False, help_text='Indicates if record is soft deleted')),
+                ('periodEnd', models.DateField(help_text='Last day (local) of the closed month', unique=True)),
+                ('notes', models.TextField(blank=True, help_text='Closing notes', null=True)),
+                ('createdBy', models.ForeignKey(blank=True, help_text='User who created this record', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_created', to=settings.AUTH_USER_MODEL)),
+                ('deletedBy', models.ForeignKey(blank=True, help_text='User who soft deleted this record', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_deleted', to=settings.AUTH_USER_MODEL)),
+                ('updatedBy', models.ForeignKey(blank=True, help_text='User who last updated this record', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_updated', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Closed Period',
+                'verbose_name_plural': 'Closed Periods',
+                'db_table': 'closedPeriods',
+                'ordering': ['-periodEnd'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.SmallIntegerField(choices=[(1, 'Account'), (2, 'Customer/Vendor'), (3, 'Agent Cash')], help_text='Snapshot kind: 1=Account, 2=Customer/Vendor, 3=Agent Cash')),
+                ('debit', models.DecimalField(decimal_places=2, default=0, help_text='Sum of positive transaction amounts through periodEnd', max_digits=17)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, help_text='Sum of negative transaction amounts through periodEnd (stored positive)', max_digits=17)),
+                ('transactionCount', models.IntegerField(default=0, help_text='Number of transactions through periodEnd')),
+                ('lastTransactionAt', models.DateTimeField(blank=True, help_text='Timestamp of the latest transaction through periodEnd', null=True)),
+                ('periodID', models.ForeignKey(help_text='Closed period the snapshot belongs to', on_delete=django.db.models.deletion.CASCADE, to='core.closedperiod')),
+                ('accountID', models.ForeignKey(blank=True, help_text='Account (account snapshots)', null=True, on_delete=django.db.models.deletion.CASCADE, to='core.account')),
+                ('customerVendorID', models.ForeignKey(blank=True, help_text='Customer or vendor (customer snapshots)', null=True, on_delete=django.db.models.deletion.CASCADE, to='core.customervendor')),
+                ('agentID', models.ForeignKey(blank=True, db_column='agentID', help_text='Agent (agent cash snapshots)', null=True, on_delete=django.db.models.deletion.CASCADE, to='core.agent')),
+            ],
+            options={
+                'verbose_name': 'Balance Snapshot',
+                'verbose_name_plural': 'Balance Snapshots',
+                'db_table': 'balanceSnapshots',
+                'ordering': ['periodID', 'kind'],
+                'indexes': [models.Index(fields=['periodID', 'kind'], name='balanceSnapshots_period_kind')],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated manually to add the daily sales fact table
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_add_closed_periods'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Local calendar day (settings.TIME_ZONE) of the invoices')),
+                ('invoiceType', models.IntegerField(choices=[(1, 'Purchases'), (2, 'Sales'), (3, 'Return Purchases'), (4, 'Return Sales')], help_text='Type: 1=Purchases, 2=Sales, 3=Return Purchases, 4=Return Sales')),
+                ('quantity', models.DecimalField(decimal_places=3, default=0, help_text='Sum of line quantities', max_digits=17)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, help_text='Gross amount (sum of quantity * price)', max_digits=17)),
+                ('lineCount', models.IntegerField(default=0, help_text='Number of invoice lines')),
+                ('invoiceCount', models.IntegerField(default=0, help_text='Number of distinct invoices')),
+                ('storeID', models.ForeignKey(blank=True, help_text='Store of the invoices', null=True, on_delete=django.db.models.deletion.CASCADE, to='core.store')),
+                ('agentID', models.ForeignKey(blank=True, db_column='agentID', help_text='Agent who created the invoices', null=True, on_delete=django.db.models.deletion.CASCADE, to='core.agent')),
+                ('customerVendorID', models.ForeignKey(blank=True, help_text='Customer or vendor of the invoices', null=True, on_delete=django.db.models.deletion.CASCADE, to='core.customervendor')),
+                ('itemID', models.ForeignKey(help_text='Invoiced item', on_delete=django.db.models.deletion.CASCADE, to='core.item')),
+            ],
+            options={
+                'verbose_name': 'Sales Fact',
+                'verbose_name_plural': 'Sales Facts',
+                'db_table': 'salesFacts',
+                'ordering': ['day'],
+                'indexes': [
+                    models.Index(fields=['day', 'invoiceType'], name='salesFacts_day_type'),
+                    models.Index(fields=['customerVendorID', 'day'], name='salesFacts_customer_day'),
+                    models.Index(fields=['itemID', 'day'], name='salesFacts_item_day'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='FactRefreshState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Fact table name', max_length=100, unique=True)),
+                ('highWaterMark', models.DateTimeField(blank=True, help_text='Latest source updatedAt already processed', null=True)),
+                ('refreshedAt', models.DateTimeField(auto_now=True, help_text='Timestamp of the last refresh')),
+            ],
+            options={
+                'verbose_name': 'Fact Refresh State',
+                'verbose_name_plural': 'Fact Refresh States',
+                'db_table': 'factRefreshState',
+            },
+        ),
+        migrations.RunSQL(
+            sql='''
+            -- High-water mark scans for invoices and lines changed since the last refresh
+            CREATE INDEX IF NOT EXISTS "invoiceMaster_updated_idx" ON "invoiceMaster" ("updatedAt");
+            CREATE INDEX IF NOT EXISTS "invoiceDetail_updated_idx" ON "invoiceDetail" ("updatedAt");
+            ''',
+            reverse_sql='''
+            DROP INDEX IF EXISTS "invoiceMaster_updated_idx";
+            DROP INDEX IF EXISTS "invoiceDetail_updated_idx";
+            '''
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated manually to add background report runs
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0026_add_sales_facts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, help_text='Timestamp when record was created')),
+                ('updatedAt', models.DateTimeField(auto_now=True, blank=True, help_text='Timestamp when record was last updated', null=True)),
+                ('deletedAt', models.DateTimeField(blank=True, help_text='Timestamp when record was soft deleted', null=True)),
+                ('isDeleted', models.BooleanField(default=False, help_text='Indicates if record is soft deleted')),
+                ('reportName', models.CharField(help_text='Report key in core.report_runner.REPORTS', max_length=100)),
+                ('parameters', models.JSONField(blank=True, default=dict, help_text='Report filters (JSON object)')),
+                ('outputFormat', models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel (XLSX)')], default='csv', help_text='Output file format', max_length=10)),
+                ('status', models.IntegerField(choices=[(0, 'Queued'), (1, 'Running'), (2, 'Done'), (3, 'Failed'), (4, 'Cancelled')], default=0, help_text='Status: 0=Queued, 1=Running, 2=Done, 3=Failed, 4=Cancelled')),
+                ('resultFile', models.FileField(blank=True, help_text='Generated report file', null=True, upload_to='reports/%Y/%m/')),
+                ('rowCount', models.IntegerField(default=0, help_text='Number of data rows written')),
+                ('startedAt', models.DateTimeField(blank=True, help_text='Timestamp when the worker started the run', null=True)),
+                ('finishedAt', models.DateTimeField(blank=True, help_text='Timestamp when the run finished', null=True)),
+                ('durationSeconds', models.DecimalField(blank=True, decimal_places=3, help_text='Time taken to build the report, in seconds', max_digits=10, null=True)),
+                ('errorMessage', models.TextField(blank=True, help_text='Error of a failed run', null=True)),
+                ('cancelRequested', models.BooleanField(default=False, help_text='Set to stop the run')),
+                ('workerPid', models.IntegerField(blank=True, help_text='Process id of the worker building the report', null=True)),
+                ('createdBy', models.ForeignKey(blank=True, help_text='User who created this record', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_created', to=settings.AUTH_USER_MODEL)),
+                ('deletedBy', models.ForeignKey(blank=True, help_text='User who soft deleted this record', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_deleted', to=settings.AUTH_USER_MODEL)),
+                ('updatedBy', models.ForeignKey(blank=True, help_text='User who last updated this record', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_updated', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Report Run',
+                'verbose_name_plural': 'Report Runs',
+                'db_table': 'reportRuns',
+                'ordering': ['-createdAt'],
+                'indexes': [models.Index(fields=['status', 'createdAt'], name='reportRuns_status_created')],
+            },
+        ),
+    ]
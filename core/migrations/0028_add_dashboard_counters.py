@@ -0,0 +1,28 @@
+# Generated manually to add the dashboard counter table
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_add_report_runs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Counter name', max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0, help_text='Current count')),
+                ('reconciledAt', models.DateTimeField(blank=True, help_text='Last time the count was recomputed from its table', null=True)),
+                ('updatedAt', models.DateTimeField(auto_now=True, help_text='Timestamp of the last change')),
+            ],
+            options={
+                'verbose_name': 'Dashboard Counter',
+                'verbose_name_plural': 'Dashboard Counters',
+                'db_table': 'dashboardCounters',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated manually to add the posting change log read by the live dashboard stream
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_add_dashboard_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostingChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, help_text='Timestamp of the commit')),
+                ('agentID', models.ForeignKey(blank=True, db_column='agentID', help_text='Agent whose postings changed (empty for postings without an agent)', null=True, on_delete=django.db.models.deletion.CASCADE, to='core.agent')),
+            ],
+            options={
+                'verbose_name': 'Posting Change',
+                'verbose_name_plural': 'Posting Changes',
+                'db_table': 'postingChanges',
+                'indexes': [models.Index(fields=['createdAt'], name='postingChanges_createdAt')],
+            },
+        ),
+    ]
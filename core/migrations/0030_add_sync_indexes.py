@@ -0,0 +1,44 @@
+# Generated manually to index the catalog tables for delta sync (core/sync_api.py)
+
+from django.db import migrations, models
+from django.db.models import F
+
+SYNCED_MODELS = ['ItemsGroup', 'Item', 'PriceList', 'PriceListDetail', 'CustomerVendor']
+
+
+def backfill_updated_at(apps, schema_editor):
+    """Give rows that were never updated an updatedAt (their createdAt) so sync cursors reach them"""
+    for model_name in SYNCED_MODELS:
+        model = apps.get_model('core', model_name)
+        model.objects.filter(updatedAt__isnull=True).update(updatedAt=F('createdAt'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_add_posting_changes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='itemsgroup',
+            index=models.Index(fields=['updatedAt', 'id'], name='itemsGroups_updatedAt_id'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['updatedAt', 'id'], name='items_updatedAt_id'),
+        ),
+        migrations.AddIndex(
+            model_name='pricelist',
+            index=models.Index(fields=['updatedAt', 'id'], name='priceLists_updatedAt_id'),
+        ),
+        migrations.AddIndex(
+            model_name='pricelistdetail',
+            index=models.Index(fields=['updatedAt', 'id'], name='priceListsDetails_updatedAt_id'),
+        ),
+        migrations.AddIndex(
+            model_name='customervendor',
+            index=models.Index(fields=['updatedAt', 'id'], name='customerVendor_updatedAt_id'),
+        ),
+    ]
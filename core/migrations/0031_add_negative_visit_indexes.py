@@ -0,0 +1,36 @@
+# Generated manually to support set-based negative visit detection (core/visits.py)
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_add_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='''
+            -- Invoices of an agent for a customer on a day (NOT EXISTS probe per visit)
+            CREATE INDEX IF NOT EXISTS "invoiceMaster_agent_customer_created_idx"
+                ON "invoiceMaster" ("agentID", "customerOrVendorID_id", "createdAt")
+                WHERE "isDeleted" = FALSE;
+            
+            -- Vouchers of an agent for a customer on a day
+            CREATE INDEX IF NOT EXISTS "transactions_agent_customer_created_idx"
+                ON transactions ("agentID", "customerVendorID_id", "createdAt")
+                WHERE "isDeleted" = FALSE;
+            
+            -- Visits of an agent in a date range
+            CREATE INDEX IF NOT EXISTS "visits_agent_date_idx"
+                ON visits ("agentID", date)
+                WHERE "isDeleted" = FALSE;
+            ''',
+            reverse_sql='''
+            DROP INDEX IF EXISTS "invoiceMaster_agent_customer_created_idx";
+            DROP INDEX IF EXISTS "transactions_agent_customer_created_idx";
+            DROP INDEX IF EXISTS "visits_agent_date_idx";
+            '''
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated manually to add the customer location table (core/locations.py)
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_add_negative_visit_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.DecimalField(decimal_places=7, help_text='Median latitude of the latest visits', max_digits=10)),
+                ('longitude', models.DecimalField(decimal_places=7, help_text='Median longitude of the latest visits', max_digits=10)),
+                ('geohash', models.CharField(db_index=True, help_text='Geohash of the location', max_length=12)),
+                ('visitCount', models.IntegerField(default=0, help_text='Number of visits the location is computed from')),
+                ('lastVisitAt', models.DateTimeField(blank=True, help_text='Date of the latest visit', null=True)),
+                ('refreshedAt', models.DateTimeField(auto_now=True, help_text='Timestamp of the last refresh')),
+                ('customerVendorID', models.OneToOneField(help_text='Located customer', on_delete=django.db.models.deletion.CASCADE, related_name='location', to='core.customervendor')),
+                ('agentID', models.ForeignKey(blank=True, db_column='agentID', help_text="Agent of the latest visit (the customer's territory)", null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.agent')),
+            ],
+            options={
+                'verbose_name': 'Customer Location',
+                'verbose_name_plural': 'Customer Locations',
+                'db_table': 'customerLocations',
+            },
+        ),
+    ]
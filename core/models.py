@@ -37,6 +37,10 @@ class ItemsGroup(BaseModel):
     class Meta:
         ordering = ['itemsGroupName']
         db_table = 'itemsGroups'
+        indexes = [
+            # Delta sync (core/sync_api.py)
+            models.Index(fields=['updatedAt', 'id'], name='itemsGroups_updatedAt_id'),
+        ]
 
 class Item(BaseModel):
     itemGroupId = models.ForeignKey(ItemsGroup, on_delete=models.PROTECT, blank=True, null=True)
@@ -94,6 +98,10 @@ class Item(BaseModel):
     class Meta:
         ordering = ['itemName']
         db_table = 'items'
+        indexes = [
+            # Delta sync (core/sync_api.py)
+            models.Index(fields=['updatedAt', 'id'], name='items_updatedAt_id'),
+        ]
 
 class PriceList(BaseModel):
     priceListName = models.CharField(max_length=255)
@@ -104,6 +112,10 @@ class PriceList(BaseModel):
     class Meta:
         ordering = ['priceListName']
         db_table = 'priceLists'
+        indexes = [
+            # Delta sync (core/sync_api.py)
+            models.Index(fields=['updatedAt', 'id'], name='priceLists_updatedAt_id'),
+        ]
 
 class PriceListDetail(BaseModel):
     priceList = models.ForeignKey(PriceList, on_delete=models.PROTECT)
@@ -116,6 +128,10 @@ class PriceListDetail(BaseModel):
     class Meta:
         ordering = ['priceList', 'item']
         db_table = 'priceListsDetails'
+        indexes = [
+            # Delta sync (core/sync_api.py)
+            models.Index(fields=['updatedAt', 'id'], name='priceListsDetails_updatedAt_id'),
+        ]
 
 class StoreGroup(BaseModel):
     storeGroupName = models.CharField(max_length=255)
@@ -157,6 +173,10 @@ class CustomerVendor(BaseModel):
     class Meta:
         ordering = ['customerVendorName']
         db_table = 'customerVendor'
+        indexes = [
+            # Delta sync (core/sync_api.py)
+            models.Index(fields=['updatedAt', 'id'], name='customerVendor_updatedAt_id'),
+        ]
         verbose_name = "Customer/Vendor"
         verbose_name_plural = "Customers/Vendors"
 
@@ -292,6 +312,33 @@ class Transaction(BaseModel):
         verbose_name_plural = "Transactions"
 
 
+class AccountDailyBalance(models.Model):
+    """
+    Daily account movement aggregates used by account-level reports.
+    One row per (account, local day), maintained from Transaction saves by core.ledger.
+    """
+    accountID = models.ForeignKey(Account, on_delete=models.CASCADE,
+                                 help_text="Associated account")
+    day = models.DateField(help_text="Local calendar day (settings.TIME_ZONE) of the transactions")
+    debit = models.DecimalField(max_digits=17, decimal_places=2, default=0,
+                               help_text="Sum of positive transaction amounts for the day")
+    credit = models.DecimalField(max_digits=17, decimal_places=2, default=0,
+                                help_text="Sum of negative transaction amounts for the day (stored positive)")
+    transactionCount = models.IntegerField(default=0,
+                                          help_text="Number of transactions posted on the day")
+    updatedAt = models.DateTimeField(auto_now=True, help_text="Timestamp when aggregate was last refreshed")
+    
+    def __str__(self):
+        return f"{self.accountID_id} @ {self.day}: {self.debit} / {self.credit}"
+    
+    class Meta:
+        ordering = ['accountID', 'day']
+        db_table = 'accountDailyBalances'
+        verbose_name = "Account Daily Balance"
+        verbose_name_plural = "Account Daily Balances"
+        unique_together = ['accountID', 'day']
+
+
 class CustomerVendorPriceList(BaseModel):
     """
     Junction table to assign default price lists to customers or vendors.
@@ -418,3 +465,231 @@ class VisitPlan(BaseModel):
         db_table = 'visitPlans'
         verbose_name = "Visit Plan"
         verbose_name_plural = "Visit Plans"
+
+
+class ClosedPeriod(BaseModel):
+    """
+    A closed accounting month.
+    Closing stores cumulative balance snapshots as of periodEnd (see core.periods) and
+    blocks writes to transactions and invoices created on or before that day.
+    """
+    periodEnd = models.DateField(unique=True, help_text="Last day (local) of the closed month")
+    notes = models.TextField(blank=True, null=True, help_text="Closing notes")
+    
+    def __str__(self):
+        return f"Closed through {self.periodEnd.strftime('%Y-%m-%d')}"
+    
+    class Meta:
+        ordering = ['-periodEnd']
+        db_table = 'closedPeriods'
+        verbose_name = "Closed Period"
+        verbose_name_plural = "Closed Periods"
+
+
+class BalanceSnapshot(models.Model):
+    """
+    Cumulative balance of an account, customer/vendor or agent cash box as of the end
+    of a closed period. Balance queries start from the latest snapshot and only add
+    activity posted after it.
+    """
+    periodID = models.ForeignKey(ClosedPeriod, on_delete=models.CASCADE,
+                                help_text="Closed period the snapshot belongs to")
+    kind = models.SmallIntegerField(choices=BALANCE_SNAPSHOT_KIND_CHOICES,
+                                   help_text="Snapshot kind: 1=Account, 2=Customer/Vendor, 3=Agent Cash")
+    accountID = models.ForeignKey(Account, on_delete=models.CASCADE, null=True, blank=True,
+                                 help_text="Account (account snapshots)")
+    customerVendorID = models.ForeignKey(CustomerVendor, on_delete=models.CASCADE, null=True, blank=True,
+                                        help_text="Customer or vendor (customer snapshots)")
+    agentID = models.ForeignKey(Agent, on_delete=models.CASCADE, null=True, blank=True,
+                               help_text="Agent (agent cash snapshots)", db_column='agentID')
+    debit = models.DecimalField(max_digits=17, decimal_places=2, default=0,
+                               help_text="Sum of positive transaction amounts through periodEnd")
+    credit = models.DecimalField(max_digits=17, decimal_places=2, default=0,
+                                help_text="Sum of negative transaction amounts through periodEnd (stored positive)")
+    transactionCount = models.IntegerField(default=0,
+                                          help_text="Number of transactions through periodEnd")
+    lastTransactionAt = models.DateTimeField(null=True, blank=True,
+                                            help_text="Timestamp of the latest transaction through periodEnd")
+    
+    @property
+    def balance(self):
+        return self.debit - self.credit
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} snapshot @ {self.periodID_id}: {self.debit} / {self.credit}"
+    
+    class Meta:
+        ordering = ['periodID', 'kind']
+        db_table = 'balanceSnapshots'
+        verbose_name = "Balance Snapshot"
+        verbose_name_plural = "Balance Snapshots"
+        indexes = [
+            models.Index(fields=['periodID', 'kind'], name='balanceSnapshots_period_kind'),
+        ]
+
+
+class SalesFact(models.Model):
+    """
+    Daily invoice line aggregates at (day, store, agent, customer/vendor, item, invoice type) grain.
+    Maintained by core.facts from invoice writes and the refresh_sales_facts command;
+    sales reports aggregate these rows instead of joining invoice lines to invoices.
+    """
+    day = models.DateField(help_text="Local calendar day (settings.TIME_ZONE) of the invoices")
+    storeID = models.ForeignKey(Store, on_delete=models.CASCADE, null=True, blank=True,
+                               help_text="Store of the invoices")
+    agentID = models.ForeignKey(Agent, on_delete=models.CASCADE, null=True, blank=True,
+                               help_text="Agent who created the invoices", db_column='agentID')
+    customerVendorID = models.ForeignKey(CustomerVendor, on_delete=models.CASCADE, null=True, blank=True,
+                                        help_text="Customer or vendor of the invoices")
+    itemID = models.ForeignKey(Item, on_delete=models.CASCADE, help_text="Invoiced item")
+    invoiceType = models.IntegerField(choices=INVOICE_TYPE_CHOICES,
+                                     help_text="Type: 1=Purchases, 2=Sales, 3=Return Purchases, 4=Return Sales")
+    quantity = models.DecimalField(max_digits=17, decimal_places=3, default=0,
+                                  help_text="Sum of line quantities")
+    amount = models.DecimalField(max_digits=17, decimal_places=2, default=0,
+                                help_text="Gross amount (sum of quantity * price)")
+    lineCount = models.IntegerField(default=0, help_text="Number of invoice lines")
+    invoiceCount = models.IntegerField(default=0, help_text="Number of distinct invoices")
+    
+    def __str__(self):
+        return f"{self.day} item {self.itemID_id} type {self.invoiceType}: {self.quantity} / {self.amount}"
+    
+    class Meta:
+        ordering = ['day']
+        db_table = 'salesFacts'
+        verbose_name = "Sales Fact"
+        verbose_name_plural = "Sales Facts"
+        indexes = [
+            models.Index(fields=['day', 'invoiceType'], name='salesFacts_day_type'),
+            models.Index(fields=['customerVendorID', 'day'], name='salesFacts_customer_day'),
+            models.Index(fields=['itemID', 'day'], name='salesFacts_item_day'),
+        ]
+
+
+class FactRefreshState(models.Model):
+    """
+    High-water mark of an incrementally refreshed fact table: the latest source row
+    updatedAt that has been folded into it.
+    """
+    name = models.CharField(max_length=100, unique=True, help_text="Fact table name")
+    highWaterMark = models.DateTimeField(null=True, blank=True,
+                                        help_text="Latest source updatedAt already processed")
+    refreshedAt = models.DateTimeField(auto_now=True, help_text="Timestamp of the last refresh")
+    
+    def __str__(self):
+        return f"{self.name} through {self.highWaterMark}"
+    
+    class Meta:
+        db_table = 'factRefreshState'
+        verbose_name = "Fact Refresh State"
+        verbose_name_plural = "Fact Refresh States"
+
+
+class CustomerLocation(models.Model):
+    """
+    Estimated location of a customer: the median coordinates of its latest visits.
+    Rebuilt by core.locations (refresh_customer_locations command); the geohash index finds
+    nearby customers by prefix without PostGIS.
+    """
+    customerVendorID = models.OneToOneField(CustomerVendor, on_delete=models.CASCADE,
+                                           related_name='location', help_text="Located customer")
+    latitude = models.DecimalField(max_digits=10, decimal_places=7,
+                                   help_text="Median latitude of the latest visits")
+    longitude = models.DecimalField(max_digits=10, decimal_places=7,
+                                    help_text="Median longitude of the latest visits")
+    geohash = models.CharField(max_length=12, db_index=True, help_text="Geohash of the location")
+    agentID = models.ForeignKey(Agent, on_delete=models.SET_NULL, null=True, blank=True,
+                               help_text="Agent of the latest visit (the customer's territory)", db_column='agentID')
+    visitCount = models.IntegerField(default=0, help_text="Number of visits the location is computed from")
+    lastVisitAt = models.DateTimeField(null=True, blank=True, help_text="Date of the latest visit")
+    refreshedAt = models.DateTimeField(auto_now=True, help_text="Timestamp of the last refresh")
+    
+    def __str__(self):
+        return f"Customer {self.customerVendorID_id} @ {self.latitude}, {self.longitude}"
+    
+    class Meta:
+        db_table = 'customerLocations'
+        verbose_name = "Customer Location"
+        verbose_name_plural = "Customer Locations"
+
+
+class DashboardCounter(models.Model):
+    """
+    Row count shown on the dashboard, one row per counter (see core.counters).
+    Kept current by model signals and recomputed by the reconcile_dashboard_counters command.
+    """
+    name = models.CharField(max_length=50, unique=True, help_text="Counter name")
+    value = models.BigIntegerField(default=0, help_text="Current count")
+    reconciledAt = models.DateTimeField(null=True, blank=True,
+                                       help_text="Last time the count was recomputed from its table")
+    updatedAt = models.DateTimeField(auto_now=True, help_text="Timestamp of the last change")
+    
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+    
+    class Meta:
+        db_table = 'dashboardCounters'
+        verbose_name = "Dashboard Counter"
+        verbose_name_plural = "Dashboard Counters"
+
+
+class PostingChange(models.Model):
+    """
+    Log of committed postings for the current day, one row per agent touched by a commit
+    (see core.live). Live dashboard streams read the rows after the last id they have seen.
+    """
+    agentID = models.ForeignKey(Agent, on_delete=models.CASCADE, null=True, blank=True,
+                               help_text="Agent whose postings changed (empty for postings without an agent)",
+                               db_column='agentID')
+    createdAt = models.DateTimeField(auto_now_add=True, help_text="Timestamp of the commit")
+    
+    def __str__(self):
+        return f"Change {self.id} agent {self.agentID_id} at {self.createdAt}"
+    
+    class Meta:
+        db_table = 'postingChanges'
+        verbose_name = "Posting Change"
+        verbose_name_plural = "Posting Changes"
+        indexes = [
+            models.Index(fields=['createdAt'], name='postingChanges_createdAt'),
+        ]
+
+
+class ReportRun(BaseModel):
+    """
+    A report generated in the background by the report_worker command.
+    The worker fills in the timing fields and stores the CSV/XLSX output under MEDIA_ROOT;
+    setting cancelRequested stops a queued or running report (see core.report_runner).
+    """
+    reportName = models.CharField(max_length=100, help_text="Report key in core.report_runner.REPORTS")
+    parameters = models.JSONField(default=dict, blank=True, help_text="Report filters (JSON object)")
+    outputFormat = models.CharField(max_length=10, choices=REPORT_FORMAT_CHOICES, default='csv',
+                                   help_text="Output file format")
+    status = models.IntegerField(choices=REPORT_RUN_STATUS_CHOICES, default=REPORT_RUN_QUEUED,
+                                help_text="Status: 0=Queued, 1=Running, 2=Done, 3=Failed, 4=Cancelled")
+    resultFile = models.FileField(upload_to='reports/%Y/%m/', null=True, blank=True,
+                                 help_text="Generated report file")
+    rowCount = models.IntegerField(default=0, help_text="Number of data rows written")
+    startedAt = models.DateTimeField(null=True, blank=True, help_text="Timestamp when the worker started the run")
+    finishedAt = models.DateTimeField(null=True, blank=True, help_text="Timestamp when the run finished")
+    durationSeconds = models.DecimalField(max_digits=10, decimal_places=3, null=True, blank=True,
+                                         help_text="Time taken to build the report, in seconds")
+    errorMessage = models.TextField(blank=True, null=True, help_text="Error of a failed run")
+    cancelRequested = models.BooleanField(default=False, help_text="Set to stop the run")
+    workerPid = models.IntegerField(null=True, blank=True, help_text="Process id of the worker building the report")
+    
+    @property
+    def is_finished(self):
+        return self.status in (REPORT_RUN_DONE, REPORT_RUN_FAILED, REPORT_RUN_CANCELLED)
+    
+    def __str__(self):
+        return f"{self.reportName} #{self.id} ({self.get_status_display()})"
+    
+    class Meta:
+        ordering = ['-createdAt']
+        db_table = 'reportRuns'
+        verbose_name = "Report Run"
+        verbose_name_plural = "Report Runs"
+        indexes = [
+            models.Index(fields=['status', 'createdAt'], name='reportRuns_status_created'),
+        ]
@@ -0,0 +1,331 @@
+"""
+Optional PostgreSQL monthly range partitioning for the high-volume tables.
+Converts transactions, invoiceMaster and invoiceDetail into tables partitioned by
+"createdAt", creates partitions ahead of time and detaches old ones for archiving.
+Also provides the date-range predicate that lets the planner prune partitions.
+"""
+
+import logging
+import re
+from datetime import date
+
+from django.db import connection, transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .ledger import day_bounds
+
+logger = logging.getLogger(__name__)
+
+PARTITION_KEY = 'createdAt'
+
+# Converted in this order: children first so invoiceMaster is swapped last
+PARTITIONED_TABLES = ['invoiceDetail', 'transactions', 'invoiceMaster']
+
+PARTITION_NAME_RE = re.compile(r'_(\d{4})_(\d{2})$')
+
+
+class PartitioningError(Exception):
+    """Raised when partition maintenance cannot be performed on the current database."""
+
+
+def created_in_range(date_from=None, date_to=None, field=PARTITION_KEY):
+    """
+    Q filter for rows created between two local calendar days (inclusive).
+    Compares the raw timestamp against [start, end) bounds instead of using __date,
+    so PostgreSQL can prune partitions and use createdAt indexes.
+    Accepts date objects or 'YYYY-MM-DD' strings.
+    """
+    query = Q()
+    if date_from:
+        if isinstance(date_from, str):
+            date_from = date.fromisoformat(date_from)
+        query &= Q(**{f'{field}__gte': day_bounds(date_from)[0]})
+    if date_to:
+        if isinstance(date_to, str):
+            date_to = date.fromisoformat(date_to)
+        query &= Q(**{f'{field}__lt': day_bounds(date_to)[1]})
+    return query
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_{month.year:04d}_{month.month:02d}'
+
+
+def _require_postgresql():
+    if connection.vendor != 'postgresql':
+        raise PartitioningError('Table partitioning is only supported on PostgreSQL')
+
+
+def is_partitioned(table):
+    """Return True if the table is already a partitioned (parent) table."""
+    _require_postgresql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+            'WHERE c.relname = %s AND pg_table_is_visible(c.oid)',
+            [table]
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(table):
+    """Return the names of the partitions currently attached to a table."""
+    _require_postgresql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits i '
+            'JOIN pg_class parent ON parent.oid = i.inhparent '
+            'JOIN pg_class child ON child.oid = i.inhrelid '
+            'WHERE parent.relname = %s AND pg_table_is_visible(parent.oid) '
+            'ORDER BY child.relname',
+            [table]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def create_partition(table, month):
+    """Create the monthly partition of a table if it does not exist. Returns True if created."""
+    month = month_start(month)
+    name = partition_name(table, month)
+    if name in list_partitions(table):
+        return False
+    qn = connection.ops.quote_name
+    # Bounds are local midnights so they line up with the day ranges used by created_in_range
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {qn(name)} PARTITION OF {qn(table)} '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [day_bounds(month)[0], day_bounds(add_months(month, 1))[0]]
+        )
+    logger.info(f'Created partition {name}')
+    return True
+
+
+def ensure_partitions(months_ahead=3, tables=None, start=None):
+    """
+    Create monthly partitions from `start` (default: current month) through `months_ahead`
+    months in the future for every partitioned table. Returns the created partition names.
+    """
+    first = month_start(start or timezone.localdate())
+    created = []
+    for table in tables or PARTITIONED_TABLES:
+        if not is_partitioned(table):
+            continue
+        for offset in range(months_ahead + 1):
+            month = add_months(first, offset)
+            if create_partition(table, month):
+                created.append(partition_name(table, month))
+    return created
+
+
+def detach_partitions(before, tables=None):
+    """
+    Detach monthly partitions whose range ends on or before the month of `before`.
+    Detached partitions stay in the database as standalone tables ready to be archived.
+    Returns the detached table names.
+    """
+    cutoff = month_start(before)
+    qn = connection.ops.quote_name
+    detached = []
+    for table in tables or PARTITIONED_TABLES:
+        if not is_partitioned(table):
+            continue
+        for name in list_partitions(table):
+            match = PARTITION_NAME_RE.search(name)
+            if not match:
+                continue  # Default partition
+            month = date(int(match.group(1)), int(match.group(2)), 1)
+            if add_months(month, 1) <= cutoff:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}')
+                logger.info(f'Detached partition {name} from {table}')
+                detached.append(name)
+    return detached
+
+
+def _fetch(cursor, sql, params):
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
+# Views reading a table, directly or through other views, with their definition and depth
+DEPENDENT_VIEWS_SQL = '''
+    WITH RECURSIVE dependents(oid, depth) AS (
+        SELECT r.ev_class, 1
+        FROM pg_depend d JOIN pg_rewrite r ON r.oid = d.objid
+        WHERE d.classid = 'pg_rewrite'::regclass AND d.refclassid = 'pg_class'::regclass
+          AND d.refobjid = %s::regclass AND r.ev_class <> d.refobjid
+        UNION
+        SELECT r.ev_class, dependents.depth + 1
+        FROM dependents
+        JOIN pg_depend d ON d.refobjid = dependents.oid
+            AND d.classid = 'pg_rewrite'::regclass AND d.refclassid = 'pg_class'::regclass
+        JOIN pg_rewrite r ON r.oid = d.objid
+        WHERE r.ev_class <> d.refobjid
+    )
+    SELECT c.oid::regclass::text, c.relkind, pg_get_viewdef(c.oid), max(dependents.depth) AS depth
+    FROM dependents JOIN pg_class c ON c.oid = dependents.oid
+    GROUP BY c.oid, c.relkind
+    ORDER BY depth, 1
+'''
+
+
+def dependent_views(cursor, table):
+    """[(name, definition), ...] of the views depending on `table`, dependencies first."""
+    views = _fetch(cursor, DEPENDENT_VIEWS_SQL, [connection.ops.quote_name(table)])
+    materialized = [name for name, kind, _, _ in views if kind != 'v']
+    if materialized:
+        raise PartitioningError(
+            f'{table} has dependent materialized views ({", ".join(materialized)}); drop them before converting'
+        )
+    return [(name, definition) for name, _, definition, _ in views]
+
+
+def _unique_index_sql(table, name, method, columns, included, predicate):
+    """CREATE UNIQUE INDEX statement of a unique index on `table` with the partition key added."""
+    qn = connection.ops.quote_name
+    if qn(PARTITION_KEY) not in columns:
+        columns = [*columns, qn(PARTITION_KEY)]
+    sql = f'CREATE UNIQUE INDEX {qn(name)} ON {qn(table)} USING {method} ({", ".join(columns)})'
+    if included:
+        sql += f' INCLUDE ({", ".join(included)})'
+    if predicate:
+        sql += f' WHERE {predicate}'
+    return sql
+
+
+def convert_table(table, months_ahead=3):
+    """
+    Rebuild an existing table as a monthly range-partitioned table on "createdAt".
+
+    The table is renamed aside, a partitioned copy is created with the same columns,
+    defaults and identity, partitions are created for the whole data range plus a
+    default partition, rows are copied, indexes and outgoing foreign keys are
+    recreated and the old table is dropped. The primary key becomes (id, "createdAt")
+    as PostgreSQL requires the partition key in unique constraints; foreign keys from
+    other tables that point at this table are dropped for the same reason (the ORM
+    still enforces on_delete behaviour). Other unique indexes and constraints are
+    recreated as unique indexes with "createdAt" added to their columns, so they only
+    reject duplicates that also share the same "createdAt".
+    Views reading the table (e.g. "itemStock", agentbalanceview) would follow the rename,
+    so they are dropped first and recreated from their definitions on the new table
+    (grants on them must be reapplied). Any other dependent object makes the conversion fail.
+    """
+    _require_postgresql()
+    if is_partitioned(table):
+        return False
+
+    qn = connection.ops.quote_name
+    legacy = f'{table}_unpartitioned'
+
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE')
+        views = dependent_views(cursor, table)
+        cursor.execute(f'UPDATE {qn(table)} SET {qn(PARTITION_KEY)} = now() WHERE {qn(PARTITION_KEY)} IS NULL')
+
+        index_defs = [row[0] for row in _fetch(
+            cursor,
+            'SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i '
+            'WHERE i.indrelid = %s::regclass AND NOT i.indisunique',
+            [qn(table)]
+        )]
+        # Unique indexes and constraints other than the primary key:
+        # (name, access method, key columns, included columns, predicate)
+        unique_indexes = _fetch(
+            cursor,
+            'SELECT c.relname, am.amname, '
+            'array(SELECT pg_get_indexdef(i.indexrelid, k, true) FROM generate_series(1, i.indnkeyatts) k), '
+            'array(SELECT pg_get_indexdef(i.indexrelid, k, true) FROM generate_series(i.indnkeyatts + 1, i.indnatts) k), '
+            'pg_get_expr(i.indpred, i.indrelid) '
+            'FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid JOIN pg_am am ON am.oid = c.relam '
+            'WHERE i.indrelid = %s::regclass AND i.indisunique AND NOT i.indisprimary',
+            [qn(table)]
+        )
+        # Outgoing foreign keys, except self references and references to tables that are
+        # already partitioned (neither can be referenced by id alone once partitioned)
+        foreign_keys = _fetch(
+            cursor,
+            'SELECT con.conname, pg_get_constraintdef(con.oid) FROM pg_constraint con '
+            'JOIN pg_class target ON target.oid = con.confrelid '
+            'WHERE con.conrelid = %s::regclass AND con.contype = %s '
+            'AND con.confrelid <> con.conrelid AND target.relkind <> %s',
+            [qn(table), 'f', 'p']
+        )
+        incoming = _fetch(
+            cursor,
+            'SELECT conrelid::regclass::text, conname FROM pg_constraint '
+            'WHERE confrelid = %s::regclass AND contype = %s AND conparentid = 0',
+            [qn(table), 'f']
+        )
+        sequence = _fetch(cursor, 'SELECT pg_get_serial_sequence(%s, %s)', [qn(table), 'id'])[0][0]
+        bounds = _fetch(
+            cursor,
+            f'SELECT min({qn(PARTITION_KEY)}), max({qn(PARTITION_KEY)}) FROM {qn(table)}',
+            []
+        )[0]
+
+        for view, _ in reversed(views):
+            cursor.execute(f'DROP VIEW {view}')
+        for referencing_table, name in incoming:
+            cursor.execute(f'ALTER TABLE {qn(referencing_table)} DROP CONSTRAINT {qn(name)}')
+
+        cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}')
+        cursor.execute(
+            f'CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY '
+            f'INCLUDING CONSTRAINTS) PARTITION BY RANGE ({qn(PARTITION_KEY)})'
+        )
+        cursor.execute(f'ALTER TABLE {qn(table)} ALTER COLUMN {qn(PARTITION_KEY)} SET NOT NULL')
+        cursor.execute(f'ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, {qn(PARTITION_KEY)})')
+        cursor.execute(f'CREATE TABLE {qn(table + "_default")} PARTITION OF {qn(table)} DEFAULT')
+
+        first = month_start(timezone.localdate(bounds[0]) if bounds[0] else timezone.localdate())
+        last = add_months(month_start(timezone.localdate()), months_ahead)
+        if bounds[1]:
+            last = max(last, month_start(timezone.localdate(bounds[1])))
+        month = first
+        while month <= last:
+            create_partition(table, month)
+            month = add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO {qn(table)} OVERRIDING SYSTEM VALUE SELECT * FROM {qn(legacy)}')
+
+        # Keep generating IDs from where the old table stopped
+        new_sequence = _fetch(cursor, 'SELECT pg_get_serial_sequence(%s, %s)', [qn(table), 'id'])[0][0]
+        if new_sequence is None and sequence:
+            cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {qn(table)}.id')
+            new_sequence = sequence
+        if new_sequence:
+            cursor.execute(
+                f'SELECT setval(%s, COALESCE((SELECT max(id) FROM {qn(table)}), 0) + 1, false)',
+                [new_sequence]
+            )
+
+        cursor.execute(f'DROP TABLE {qn(legacy)}')
+
+        for index_def in index_defs:
+            cursor.execute(re.sub(r' ON (ONLY )?\S+ ', f' ON {qn(table)} ', index_def, count=1))
+        for name, method, columns, included, predicate in unique_indexes:
+            cursor.execute(_unique_index_sql(table, name, method, columns, included, predicate))
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}')
+        for view, definition in views:
+            cursor.execute(f'CREATE VIEW {view} AS {definition}')
+
+    for view, _ in views:
+        logger.info(f'Recreated view {view} on the partitioned {table}')
+    for referencing_table, name in incoming:
+        logger.warning(f'Dropped foreign key {name} on {referencing_table} referencing {table}')
+    for name, *_ in unique_indexes:
+        logger.warning(f'Recreated unique index {name} on {table} with {PARTITION_KEY} added')
+    logger.info(f'Converted {table} to a partitioned table')
+    return True
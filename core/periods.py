@@ -0,0 +1,267 @@
+"""
+Period close.
+Freezes calendar months: closing a month stores cumulative balance snapshots per account,
+customer/vendor and agent cash box, and back-dated writes into closed months are refused.
+Balance queries start from the latest snapshot and only aggregate activity posted after it,
+so their cost does not grow with the length of the history.
+"""
+
+from calendar import monthrange
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from django.db.models import Sum, Count, Max, Case, When, F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import accounts, versions
+from .constants import SNAPSHOT_KIND_ACCOUNT, SNAPSHOT_KIND_CUSTOMER, SNAPSHOT_KIND_AGENT_CASH
+from .ledger import ZERO, AMOUNT_FIELD, day_bounds, transaction_day
+from .models import BalanceSnapshot, ClosedPeriod, InvoiceMaster, Transaction
+
+# Transaction field each snapshot kind is grouped by
+KIND_KEYS = {
+    SNAPSHOT_KIND_ACCOUNT: 'accountID_id',
+    SNAPSHOT_KIND_CUSTOMER: 'customerVendorID_id',
+    SNAPSHOT_KIND_AGENT_CASH: 'agentID_id',
+}
+
+# Fields that may still change on rows of a closed period. Settling an old invoice with a
+# payment or return posted today updates its settlement status, not the closed amounts.
+SETTLEMENT_FIELDS = {
+    InvoiceMaster: {'status', 'totalPaid', 'returnStatus', 'notes', 'updatedAt', 'updatedBy'},
+}
+
+# Shared version of closed_through(); bumped when a period is closed or reopened
+VERSION_KEY = 'periods:closed_through'
+
+# (version, last closed day) loaded by this process
+_closed_through = None
+
+
+class PeriodClosedError(ValidationError):
+    """Raised when a write would change data inside a closed period."""
+
+
+def month_end(day):
+    """Last day of the month `day` belongs to."""
+    return day.replace(day=monthrange(day.year, day.month)[1])
+
+
+def closed_through():
+    """
+    Last day of the latest closed period, or None if no period was ever closed.
+    Kept per process until a ClosedPeriod is saved or deleted (see invalidate).
+    """
+    global _closed_through
+    version = versions.get(VERSION_KEY)
+    loaded = _closed_through
+    if loaded is None or loaded[0] != version:
+        loaded = (version, ClosedPeriod.objects.filter(isDeleted=False).aggregate(last=Max('periodEnd'))['last'])
+        _closed_through = loaded
+    return loaded[1]
+
+
+def invalidate():
+    """Forget closed_through(): in this worker now, in the others once the current transaction commits."""
+    global _closed_through
+    _closed_through = None
+    versions.bump_on_commit(VERSION_KEY)
+
+
+def latest_period(before=None):
+    """Latest closed period that ends before the local day `before` (default: the latest one)."""
+    periods = ClosedPeriod.objects.filter(isDeleted=False)
+    if before:
+        periods = periods.filter(periodEnd__lt=before)
+    return periods.order_by('-periodEnd').first()
+
+
+def _transactions(kind):
+    key = KIND_KEYS[kind]
+    transactions = Transaction.objects.filter(isDeleted=False).exclude(amount__isnull=True)
+    if kind == SNAPSHOT_KIND_AGENT_CASH:
+        transactions = transactions.filter(accountID_id=accounts.get_id(accounts.CASH))
+    return transactions.exclude(**{f'{key}__isnull': True})
+
+
+def _activity(kind, start=None, end=None, ids=None):
+    """Debit, credit, count and latest timestamp per key of the transactions created in [start, end)."""
+    key = KIND_KEYS[kind]
+    transactions = _transactions(kind)
+    if start:
+        transactions = transactions.filter(createdAt__gte=start)
+    if end:
+        transactions = transactions.filter(createdAt__lt=end)
+    if ids is not None:
+        transactions = transactions.filter(**{f'{key}__in': ids})
+
+    return transactions.values(key).annotate(
+        debit=Coalesce(Sum(Case(When(amount__gt=0, then=F('amount')), default=Value(ZERO),
+                                output_field=AMOUNT_FIELD)), Value(ZERO), output_field=AMOUNT_FIELD),
+        credit=Coalesce(Sum(Case(When(amount__lt=0, then=-F('amount')), default=Value(ZERO),
+                                 output_field=AMOUNT_FIELD)), Value(ZERO), output_field=AMOUNT_FIELD),
+        transaction_count=Count('id'),
+        last_transaction=Max('createdAt'),
+    ).order_by()
+
+
+def _add(totals, debit, credit, transaction_count, last_transaction):
+    totals['debit'] += debit
+    totals['credit'] += credit
+    totals['transaction_count'] += transaction_count
+    if last_transaction and (totals['last_transaction'] is None or last_transaction > totals['last_transaction']):
+        totals['last_transaction'] = last_transaction
+    totals['balance'] = totals['debit'] - totals['credit']
+    return totals
+
+
+def _empty():
+    return {'debit': ZERO, 'credit': ZERO, 'balance': ZERO, 'transaction_count': 0, 'last_transaction': None}
+
+
+def balances(kind, ids=None, before=None):
+    """
+    Cumulative totals per account, customer/vendor or agent (see KIND_KEYS) of every
+    transaction created before the local day `before` (default: all transactions).
+
+    Starts from the snapshot of the latest period closed before that day and adds the
+    transactions posted after it. Returns {id: {'debit', 'credit', 'balance',
+    'transaction_count', 'last_transaction'}} for the ids that have any activity.
+    """
+    key = KIND_KEYS[kind]
+    totals = {}
+    start = None
+
+    period = latest_period(before)
+    if period:
+        snapshots = BalanceSnapshot.objects.filter(periodID=period, kind=kind)
+        if ids is not None:
+            snapshots = snapshots.filter(**{f'{key}__in': ids})
+        for row in snapshots.values_list(key, 'debit', 'credit', 'transactionCount', 'lastTransactionAt'):
+            totals[row[0]] = _add(_empty(), *row[1:])
+        start = day_bounds(period.periodEnd)[1]
+
+    end = day_bounds(before)[0] if before else None
+    for row in _activity(kind, start, end, ids):
+        _add(totals.setdefault(row[key], _empty()),
+             row['debit'], row['credit'], row['transaction_count'], row['last_transaction'])
+    return totals
+
+
+def balance(kind, key_id, before=None):
+    """Cumulative totals of a single account, customer/vendor or agent (see balances)."""
+    return balances(kind, [key_id], before).get(key_id) or _empty()
+
+
+def validate_period_end(period_end, previous=None):
+    """
+    Raise ValidationError unless `period_end` is the next month that can be closed.
+    `previous` is the latest ClosedPeriod (looked up when not given).
+    """
+    if period_end != month_end(period_end):
+        raise ValidationError(f'{period_end} is not the last day of a month')
+    if period_end >= timezone.localdate():
+        raise ValidationError('Only months that have already ended can be closed')
+
+    previous = previous or latest_period()
+    if previous:
+        expected = month_end(previous.periodEnd + timedelta(days=1))
+        if period_end <= previous.periodEnd:
+            raise ValidationError(f'Periods are already closed through {previous.periodEnd}')
+        if period_end != expected:
+            raise ValidationError(f'Close {expected:%Y-%m} before {period_end:%Y-%m}')
+
+
+def close_period(period_end, user=None, notes=None):
+    """
+    Close the month ending on `period_end` and store its balance snapshots.
+
+    Months are closed in order. Each snapshot is the previous month's snapshot plus the
+    month's own activity, so closing only reads one month of transactions.
+    Returns the new ClosedPeriod.
+    """
+    with db_transaction.atomic():
+        # Lock the latest period so two closes cannot run on top of each other
+        previous = ClosedPeriod.objects.select_for_update().filter(isDeleted=False).order_by('-periodEnd').first()
+        validate_period_end(period_end, previous)
+
+        next_day = period_end + timedelta(days=1)
+        cash_id = accounts.get_id(accounts.CASH)
+        totals = {kind: balances(kind, before=next_day) for kind in KIND_KEYS}
+
+        period = ClosedPeriod.objects.create(periodEnd=period_end, notes=notes, createdBy=user)
+        snapshots = []
+        for kind, rows in totals.items():
+            for key_id, row in rows.items():
+                snapshot = BalanceSnapshot(
+                    periodID=period,
+                    kind=kind,
+                    debit=row['debit'],
+                    credit=row['credit'],
+                    transactionCount=row['transaction_count'],
+                    lastTransactionAt=row['last_transaction'],
+                )
+                setattr(snapshot, KIND_KEYS[kind], key_id)
+                if kind == SNAPSHOT_KIND_AGENT_CASH:
+                    snapshot.accountID_id = cash_id
+                snapshots.append(snapshot)
+        BalanceSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    return period
+
+
+def reopen_latest_period():
+    """Reopen the latest closed month, dropping its snapshots. Returns its periodEnd or None."""
+    with db_transaction.atomic():
+        period = ClosedPeriod.objects.select_for_update().filter(isDeleted=False).order_by('-periodEnd').first()
+        if period is None:
+            return None
+        period.delete()
+    return period.periodEnd
+
+
+def _is_closed(created_at, through):
+    return created_at is not None and transaction_day(created_at) <= through
+
+
+def ensure_writable(instance, deleting=False, update_fields=None):
+    """
+    Refuse to create, change or delete a transaction/invoice row that belongs to a closed period.
+    Raises PeriodClosedError. Only SETTLEMENT_FIELDS may still change on closed rows.
+    """
+    through = closed_through()
+    if through is None:
+        return
+
+    model = type(instance)
+    if instance._state.adding or instance.pk is None:
+        if _is_closed(instance.createdAt, through):
+            raise PeriodClosedError(f'Period is closed through {through}', code='period_closed')
+        return
+
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key and (update_fields is None or field.name in update_fields)
+    ]
+    stored = model.objects.filter(pk=instance.pk).values('createdAt', *[field.attname for field in fields]).first()
+    if stored is None:
+        return
+    if not (_is_closed(stored['createdAt'], through) or _is_closed(instance.createdAt, through)):
+        return
+    if deleting:
+        raise PeriodClosedError(
+            f'{model._meta.verbose_name} {instance.pk} belongs to a period closed through {through}',
+            code='period_closed'
+        )
+
+    allowed = SETTLEMENT_FIELDS.get(model, set())
+    for field in fields:
+        if field.name in allowed:
+            continue
+        if field.to_python(getattr(instance, field.attname)) != field.to_python(stored[field.attname]):
+            raise PeriodClosedError(
+                f'{model._meta.verbose_name} {instance.pk} belongs to a period closed through {through}; '
+                f'{field.name} cannot be changed',
+                code='period_closed'
+            )
@@ -0,0 +1,111 @@
+"""
+Agents' active visit plans for the mobile app.
+The payload of an agent's plan of the day (the plan and its customers with their price list)
+is built in three queries and kept in the shared 'reports' cache per agent and day, keyed on a
+plans version (kept in the 'versions' cache, see core/versions.py). Saving or deleting a visit
+plan, customer, customer price list assignment or price list bumps the version once the write
+commits, so every cached plan is rebuilt on its next request.
+"""
+
+from django.core.cache import caches
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from . import versions
+from .models import CustomerVendor, CustomerVendorPriceList, VisitPlan
+
+CACHE_ALIAS = 'reports'
+VERSION_KEY = 'plans:version'
+# Cached plans are keyed on their day, so they only need to outlive it
+TIMEOUT = 24 * 3600
+
+_MISSING = object()
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def version():
+    """Current plans version (see core/versions.py)."""
+    return versions.get(VERSION_KEY)
+
+
+def bump_version():
+    """Make every cached plan stale."""
+    versions.bump(VERSION_KEY)
+
+
+def bump_on_commit():
+    """Bump the plans version once the current database transaction commits."""
+    versions.bump_on_commit(VERSION_KEY)
+
+
+def active_plan(agent, day):
+    """The agent's active visit plan covering `day`, or None."""
+    return VisitPlan.objects.filter(
+        agentID=agent,
+        isActive=True,
+        dateFrom__lte=day,
+        dateTo__gte=day,
+        isDeleted=False
+    ).first()
+
+
+def build_payload(agent, day):
+    """
+    Response data for the agent's active plan of `day` (None without one): the plan and its
+    customers (type 1, not deleted) with their price list.
+    """
+    visitplan = active_plan(agent, day)
+    if visitplan is None:
+        return None
+
+    customer_ids = visitplan.customers if visitplan.customers else []
+    customer_list = []
+    if customer_ids:
+        customers = CustomerVendor.objects.filter(
+            id__in=customer_ids,
+            type=1,
+            isDeleted=False
+        ).prefetch_related(Prefetch(
+            'customervendorpricelist_set',
+            queryset=CustomerVendorPriceList.objects.filter(isDeleted=False).select_related('priceListID').order_by('id'),
+            to_attr='active_price_lists',
+        ))
+        for customer in customers:
+            # unique_together allows one row per price list; the oldest live assignment wins
+            price_list_relation = customer.active_price_lists[0] if customer.active_price_lists else None
+            customer_list.append({
+                'id': customer.id,
+                'customer_name': customer.customerVendorName,
+                'phone_one': customer.phone_one,
+                'phone_two': customer.phone_two,
+                'type': customer.type,
+                'notes': customer.notes,
+                'price_list': {
+                    'id': price_list_relation.priceListID.id,
+                    'name': price_list_relation.priceListID.priceListName,
+                } if price_list_relation else None,
+            })
+
+    return {
+        'plan_id': visitplan.id,
+        'date_from': visitplan.dateFrom,
+        'date_to': visitplan.dateTo,
+        'notes': visitplan.notes,
+        'customers': customer_list,
+        'total_customers': len(customer_list),
+    }
+
+
+def cached_payload(agent, day=None):
+    """build_payload() for the agent's plan of `day` (default today), cached until plans change."""
+    day = day or timezone.localdate()
+    key = f'plans:active:{agent.pk}:{day.isoformat()}:{version()}'
+    cache = _cache()
+    payload = cache.get(key, _MISSING)
+    if payload is _MISSING:
+        payload = build_payload(agent, day)
+        cache.set(key, payload, TIMEOUT)
+    return payload
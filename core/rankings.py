@@ -0,0 +1,266 @@
+"""
+Sales rankings.
+Ranks customers and products by sales with grouped queries over the daily sales fact
+table (see core.facts), so the cost is bounded by small indexed aggregates. Invoices are
+ranked by their line totals in SQL.
+"""
+
+from decimal import Decimal
+
+from django.db.models import Sum, Count, F, Q, Value, DecimalField, ExpressionWrapper, FilteredRelation
+from django.db.models.functions import Coalesce, NullIf
+
+from .constants import (
+    INVOICE_TYPE_PURCHASES, INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_PURCHASES, INVOICE_TYPE_RETURN_SALES,
+)
+from .models import CustomerVendor, InvoiceMaster, Item, SalesFact, Transaction
+from .partitioning import created_in_range
+
+ZERO = Decimal('0')
+AMOUNT_FIELD = DecimalField(max_digits=17, decimal_places=2)
+QUANTITY_FIELD = DecimalField(max_digits=17, decimal_places=3)
+
+# Quantity x price of an invoice's lines, seen from InvoiceMaster
+INVOICE_LINE_TOTAL = ExpressionWrapper(
+    Coalesce(F('invoicedetail__quantity'), Value(ZERO)) * Coalesce(F('invoicedetail__price'), Value(ZERO)),
+    output_field=AMOUNT_FIELD,
+)
+
+# Largest number of customers top_customers() ranks when a limit is given
+MAX_TOP_CUSTOMERS = 1000
+
+IS_SALE = Q(invoiceType=INVOICE_TYPE_SALES)
+IS_RETURN = Q(invoiceType=INVOICE_TYPE_RETURN_SALES)
+
+# Invoice type -> key of invoice_transaction_totals()['invoice_stats']
+INVOICE_TYPE_KEYS = {
+    INVOICE_TYPE_SALES: 'sales',
+    INVOICE_TYPE_RETURN_SALES: 'returns',
+    INVOICE_TYPE_PURCHASES: 'purchases',
+    INVOICE_TYPE_RETURN_PURCHASES: 'return_purchases',
+}
+
+
+def sales_facts(date_from=None, date_to=None, store_id=None, agent_id=None):
+    """Sales and return-sales fact rows filtered by day range, store and agent."""
+    facts = SalesFact.objects.filter(invoiceType__in=[INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_SALES])
+    if date_from:
+        facts = facts.filter(day__gte=date_from)
+    if date_to:
+        facts = facts.filter(day__lte=date_to)
+    if store_id:
+        facts = facts.filter(storeID_id=store_id)
+    if agent_id:
+        facts = facts.filter(agentID_id=agent_id)
+    return facts
+
+
+def _customer_facts(**filters):
+    return sales_facts(**filters).filter(
+        customerVendorID__type__in=[1, 3],  # Customers and customer/vendors
+        customerVendorID__isDeleted=False,
+    )
+
+
+def _sum(field, condition):
+    return Coalesce(Sum(field, filter=condition), Value(ZERO), output_field=AMOUNT_FIELD)
+
+
+def invoice_counts(customer_ids, date_from=None, date_to=None, store_id=None, agent_id=None):
+    """Distinct sales and return-sales invoices per customer: {customer_id: count}."""
+    invoices = InvoiceMaster.objects.filter(
+        created_in_range(date_from, date_to),
+        customerOrVendorID_id__in=customer_ids,
+        invoiceType__in=[INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_SALES],
+        isDeleted=False,
+    )
+    if store_id:
+        invoices = invoices.filter(storeID_id=store_id)
+    if agent_id:
+        invoices = invoices.filter(agentID_id=agent_id)
+    return dict(
+        invoices.values('customerOrVendorID_id').annotate(count=Count('id')).order_by()
+        .values_list('customerOrVendorID_id', 'count')
+    )
+
+
+def top_customers(limit=20, **filters):
+    """
+    Customers ranked by net sales, largest first. `limit=None` returns every customer.
+    Each row has customer, sales_total, returns_total, net_sales, invoice_count and item_count.
+    Filters are passed to sales_facts (date_from, date_to, store_id, agent_id).
+    """
+    rows = _customer_facts(**filters).values(
+        customer_id=F('customerVendorID_id'),
+    ).annotate(
+        sales_total=_sum('amount', IS_SALE),
+        returns_total=_sum('amount', IS_RETURN),
+        item_count=Coalesce(Sum('lineCount'), Value(0)),
+    ).annotate(
+        net_sales=F('sales_total') - F('returns_total'),
+    ).order_by('-net_sales', 'customer_id')
+
+    if limit is not None:
+        rows = rows[:limit]
+    rows = list(rows)
+
+    customer_ids = [row['customer_id'] for row in rows]
+    customers = CustomerVendor.objects.in_bulk(customer_ids)
+    # Fact rows are per item, so distinct invoices are counted on the invoices themselves
+    counts = invoice_counts(customer_ids, **filters)
+    for row in rows:
+        row['customer'] = customers[row['customer_id']]
+        row['invoice_count'] = counts.get(row['customer_id'], 0)
+    return rows
+
+
+def net_sales_total(**filters):
+    """Net sales of all customers for the same filters as top_customers."""
+    totals = _customer_facts(**filters).aggregate(
+        sales=_sum('amount', IS_SALE), returns=_sum('amount', IS_RETURN)
+    )
+    return totals['sales'] - totals['returns']
+
+
+def customer_product_sales(customer_id, **filters):
+    """
+    Sales (not returns) of one customer per product: item, quantity, total_amount and
+    invoice_count. An invoice belongs to a single day, store, agent and customer, so summing
+    the per-row invoice counts gives the distinct invoices per item.
+    """
+    rows = list(
+        sales_facts(**filters).filter(
+            IS_SALE, customerVendorID_id=customer_id,
+        ).values('itemID_id').annotate(
+            quantity=Coalesce(Sum('quantity'), Value(ZERO)),
+            total_amount=_sum('amount', None),
+            invoice_count=Coalesce(Sum('invoiceCount'), Value(0)),
+        ).order_by('itemID_id')
+    )
+    items = Item.objects.in_bulk([row['itemID_id'] for row in rows])
+    for row in rows:
+        row['product'] = items[row['itemID_id']]
+    return rows
+
+
+def customer_net_sales(customer_id, **filters):
+    """Sales minus sales returns of one customer."""
+    totals = sales_facts(**filters).filter(customerVendorID_id=customer_id).aggregate(
+        sales=_sum('amount', IS_SALE), returns=_sum('amount', IS_RETURN)
+    )
+    return totals['sales'] - totals['returns']
+
+
+# Sort keys accepted by product_sales -> annotation they order by
+PRODUCT_SORTS = {
+    'revenue': 'net_revenue',
+    'quantity': 'net_quantity',
+    'customers': 'customer_count',
+    'average_price': 'average_price',
+    'returns': 'returns_revenue',
+    'name': 'itemName',
+}
+
+
+def product_sales(sort='revenue', descending=True, date_from=None, date_to=None, store_id=None, agent_id=None):
+    """
+    Every active item ranked by its sales over the fact table in one grouped query.
+    Items without sales in the period are included with zeros, so an ascending sort lists
+    the worst sellers. Rows have id, itemName, sales/returns/net quantity and revenue,
+    customer_count (distinct buying customers), line_count and average_price (sales revenue
+    per unit sold). Returns an ordered values() queryset, ready for slicing or paging.
+    """
+    condition = Q(salesfact__invoiceType__in=[INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_SALES])
+    if date_from:
+        condition &= Q(salesfact__day__gte=date_from)
+    if date_to:
+        condition &= Q(salesfact__day__lte=date_to)
+    if store_id:
+        condition &= Q(salesfact__storeID_id=store_id)
+    if agent_id:
+        condition &= Q(salesfact__agentID_id=agent_id)
+
+    is_sale = Q(period_facts__invoiceType=INVOICE_TYPE_SALES)
+    is_return = Q(period_facts__invoiceType=INVOICE_TYPE_RETURN_SALES)
+
+    def total(field, condition, output_field):
+        return Coalesce(Sum(f'period_facts__{field}', filter=condition), Value(ZERO), output_field=output_field)
+
+    rows = Item.objects.filter(isDeleted=False).annotate(
+        period_facts=FilteredRelation('salesfact', condition=condition),
+    ).values('id', 'itemName').annotate(
+        sales_quantity=total('quantity', is_sale, QUANTITY_FIELD),
+        returns_quantity=total('quantity', is_return, QUANTITY_FIELD),
+        sales_revenue=total('amount', is_sale, AMOUNT_FIELD),
+        returns_revenue=total('amount', is_return, AMOUNT_FIELD),
+        customer_count=Count('period_facts__customerVendorID', filter=is_sale, distinct=True),
+        line_count=Coalesce(Sum('period_facts__lineCount', filter=is_sale), Value(0)),
+    ).annotate(
+        net_quantity=F('sales_quantity') - F('returns_quantity'),
+        net_revenue=F('sales_revenue') - F('returns_revenue'),
+        average_price=Coalesce(
+            F('sales_revenue') / NullIf(F('sales_quantity'), Value(ZERO)), Value(ZERO), output_field=AMOUNT_FIELD
+        ),
+    )
+
+    order = PRODUCT_SORTS.get(sort, PRODUCT_SORTS['revenue'])
+    return rows.order_by(f'-{order}' if descending else order, 'id')
+
+
+def top_invoices(limit=10, date_from=None, date_to=None):
+    """
+    Invoices of any type ranked by the total of their active lines, largest first, in one
+    grouped query. Each invoice carries lines_total and its customer/vendor preloaded.
+    """
+    return list(
+        InvoiceMaster.objects.filter(
+            created_in_range(date_from, date_to),
+            isDeleted=False,
+        ).select_related('customerOrVendorID').annotate(
+            lines_total=Coalesce(
+                Sum(INVOICE_LINE_TOTAL, filter=Q(invoicedetail__isDeleted=False)), Value(ZERO),
+                output_field=AMOUNT_FIELD,
+            ),
+        ).order_by('-lines_total', '-id')[:limit]
+    )
+
+
+def invoice_transaction_totals(date_from=None, date_to=None):
+    """
+    Figures of the invoice and transaction summary report: invoice counts per type in one
+    conditional aggregate over the invoices, line totals per type in one over the daily sales
+    facts, and transaction debit/credit totals in one pass (positive amount = debit).
+    """
+    date_range = created_in_range(date_from, date_to)
+    counts = InvoiceMaster.objects.filter(date_range, isDeleted=False).aggregate(**{
+        key: Count('id', filter=Q(invoiceType=invoice_type)) for invoice_type, key in INVOICE_TYPE_KEYS.items()
+    })
+
+    facts = SalesFact.objects.all()
+    if date_from:
+        facts = facts.filter(day__gte=date_from)
+    if date_to:
+        facts = facts.filter(day__lte=date_to)
+    totals = facts.aggregate(**{
+        key: Coalesce(Sum('amount', filter=Q(invoiceType=invoice_type)), Value(ZERO))
+        for invoice_type, key in INVOICE_TYPE_KEYS.items()
+    })
+    invoice_stats = {key: {'count': counts[key], 'total': totals[key]} for key in INVOICE_TYPE_KEYS.values()}
+
+    transaction_totals = Transaction.objects.filter(date_range, isDeleted=False).aggregate(
+        count=Count('id'),
+        debit=Coalesce(Sum('amount', filter=Q(amount__gt=0)), Value(ZERO)),
+        credit=Coalesce(Sum('amount', filter=Q(amount__lt=0)), Value(ZERO)),
+    )
+    total_debit = transaction_totals['debit']
+    total_credit = -transaction_totals['credit']
+
+    return {
+        'invoice_stats': invoice_stats,
+        'total_invoices': sum(counts.values()),
+        'net_sales': invoice_stats['sales']['total'] - invoice_stats['returns']['total'],
+        'total_transactions': transaction_totals['count'],
+        'total_debit': total_debit,
+        'total_credit': total_credit,
+        'net_balance': total_debit - total_credit,
+    }
@@ -0,0 +1,153 @@
+"""
+Shared report result cache.
+Report results are stored in the 'reports' cache keyed on the report name, its normalized
+filters and a data version (kept in the 'versions' cache, see core/versions.py). The data
+version is bumped whenever invoices or transactions are written, which makes every cached
+result stale at once without tracking keys.
+Hit and miss counters per report are kept in the same cache.
+Results for past days only (e.g. closed time-series buckets) are keyed on a separate history
+version instead, bumped only by writes dated before today.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from . import versions
+
+CACHE_ALIAS = 'reports'
+PREFIX = 'report_cache'
+VERSION_KEY = f'{PREFIX}:data_version'
+HISTORY_KEY = f'{PREFIX}:history_version'
+NAMES_KEY = f'{PREFIX}:names'
+
+_seen_names = set()
+_lock = threading.Lock()
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def data_version():
+    """Current data version (see core/versions.py)."""
+    return versions.get(VERSION_KEY)
+
+
+def bump_data_version():
+    """Invalidate every cached report result."""
+    versions.bump(VERSION_KEY)
+
+
+def bump_on_commit():
+    """Bump the data version once the current database transaction commits."""
+    db_transaction.on_commit(bump_data_version)
+
+
+def history_version():
+    """Version of the data for days before today (see core/versions.py)."""
+    return versions.get(HISTORY_KEY)
+
+
+def bump_history_version():
+    """Invalidate cached results that only cover past days."""
+    versions.bump(HISTORY_KEY)
+
+
+def bump_history_if_past(days):
+    """Bump the history version (once the transaction commits) if any of `days` is before today."""
+    today = timezone.localdate()
+    if any(day is not None and day < today for day in days):
+        db_transaction.on_commit(bump_history_version)
+
+
+def _normalize(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple, set)):
+        return sorted(_normalize(item) for item in value)
+    if value is None or value == '':
+        return None
+    return str(value)
+
+
+def normalize_filters(filters):
+    """Filters as a stable JSON string: empty values dropped, lists sorted, dates ISO formatted."""
+    normalized = {key: _normalize(value) for key, value in (filters or {}).items()}
+    return json.dumps(
+        {key: value for key, value in normalized.items() if value is not None},
+        sort_keys=True,
+    )
+
+
+def cache_key(name, filters=None, version=None):
+    digest = hashlib.md5(normalize_filters(filters).encode()).hexdigest()
+    return f'{PREFIX}:{name}:{version or data_version()}:{digest}'
+
+
+def _count(name, outcome):
+    cache = _cache()
+    key = f'{PREFIX}:stats:{name}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+    if name not in _seen_names:
+        with _lock:
+            names = set(cache.get(NAMES_KEY) or ())
+            if name not in names:
+                cache.set(NAMES_KEY, sorted(names | {name}), None)
+            _seen_names.add(name)
+
+
+def get_or_compute(name, filters, compute, timeout=None, refresh=False):
+    """
+    Return the cached result of report `name` for `filters`, computing and storing it on a miss.
+    `compute` is called without arguments; its result must be picklable.
+    Pass refresh=True to recompute and replace the cached result.
+    """
+    cache = _cache()
+    key = cache_key(name, filters)
+    result = None if refresh else cache.get(key)
+    if result is not None:
+        _count(name, 'hits')
+        return result
+
+    _count(name, 'misses')
+    result = compute()
+    cache.set(key, result, timeout if timeout is not None else settings.REPORT_CACHE_TIMEOUT)
+    return result
+
+
+def stats():
+    """Hit/miss counters per report name: {name: {'hits', 'misses', 'hit_rate'}}."""
+    cache = _cache()
+    result = {}
+    for name in cache.get(NAMES_KEY) or ():
+        counters = cache.get_many([f'{PREFIX}:stats:{name}:hits', f'{PREFIX}:stats:{name}:misses'])
+        hits = counters.get(f'{PREFIX}:stats:{name}:hits', 0)
+        misses = counters.get(f'{PREFIX}:stats:{name}:misses', 0)
+        total = hits + misses
+        result[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 3) if total else 0,
+        }
+    return result
+
+
+def reset_stats():
+    """Zero every hit/miss counter."""
+    cache = _cache()
+    names = cache.get(NAMES_KEY) or ()
+    cache.delete_many(
+        [f'{PREFIX}:stats:{name}:{outcome}' for name in names for outcome in ('hits', 'misses')]
+    )
@@ -0,0 +1,360 @@
+"""
+Background report runs.
+Reports over long date ranges are queued as ReportRun rows and built by the report_worker
+command in a process pool, so web requests only submit, poll and download. Each builder
+returns a header and an iterator of rows that is written to a CSV or XLSX file under
+MEDIA_ROOT; the run records its row count and duration and stops early when cancelled.
+"""
+
+import csv
+import os
+import tempfile
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.files import File
+from django.db import transaction as db_transaction
+from django.db.models import Sum, F, Q, Value, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import aging, ledger, periods, rankings, statements
+from .constants import (
+    SNAPSHOT_KIND_CUSTOMER, REPORT_RUN_QUEUED, REPORT_RUN_RUNNING, REPORT_RUN_DONE,
+    REPORT_RUN_FAILED, REPORT_RUN_CANCELLED,
+)
+from .models import CustomerVendor, InvoiceMaster, ReportRun, VisitPlan
+from .partitioning import created_in_range
+
+ZERO = Decimal('0')
+NO_ACTIVITY = {'debit': ZERO, 'credit': ZERO, 'balance': ZERO, 'transaction_count': 0, 'last_transaction': None}
+
+# Rows written between two checks of ReportRun.cancelRequested
+CANCEL_CHECK_ROWS = 1000
+
+
+class RunCancelled(Exception):
+    """Raised inside a run when its cancelRequested flag has been set."""
+
+
+def _date(parameters, name, default=None):
+    value = parameters.get(name)
+    if not value:
+        return default
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _int(parameters, name):
+    value = parameters.get(name)
+    return int(value) if value not in (None, '') else None
+
+
+def _month_range(parameters):
+    today = timezone.localdate()
+    return _date(parameters, 'date_from', today.replace(day=1)), _date(parameters, 'date_to', today)
+
+
+def customer_balance_rows(parameters):
+    """Balance of every customer (optionally of one agent's active visit plan)."""
+    customers = CustomerVendor.objects.filter(type__in=[1, 3], isDeleted=False).order_by('customerVendorName')
+    agent_id = _int(parameters, 'agent')
+    if agent_id:
+        plan = VisitPlan.objects.filter(agentID_id=agent_id, isActive=True, isDeleted=False).first()
+        customers = customers.filter(id__in=plan.customers if plan and plan.customers else [])
+    if parameters.get('search'):
+        customers = customers.filter(customerVendorName__icontains=parameters['search'])
+
+    totals = periods.balances(SNAPSHOT_KIND_CUSTOMER)
+    header = ['customer_id', 'customer', 'debit', 'credit', 'balance', 'transactions', 'last_transaction']
+
+    def rows():
+        for customer_id, name in customers.values_list('id', 'customerVendorName').iterator():
+            row = totals.get(customer_id, NO_ACTIVITY)
+            yield [customer_id, name, row['debit'], row['credit'], row['balance'],
+                   row['transaction_count'], row['last_transaction']]
+    return header, rows()
+
+
+def invoice_register_rows(parameters):
+    """Every invoice of the period with its line total, oldest first."""
+    date_from, date_to = _month_range(parameters)
+    invoices = InvoiceMaster.objects.filter(
+        created_in_range(date_from, date_to),
+        isDeleted=False,
+    )
+    if parameters.get('invoice_type'):
+        invoices = invoices.filter(invoiceType=_int(parameters, 'invoice_type'))
+    line_total = ExpressionWrapper(
+        Coalesce(F('invoicedetail__quantity'), Value(ZERO)) * Coalesce(F('invoicedetail__price'), Value(ZERO)),
+        output_field=DecimalField(max_digits=17, decimal_places=2),
+    )
+    invoices = invoices.annotate(
+        lines_total=Coalesce(Sum(line_total, filter=Q(invoicedetail__isDeleted=False)), Value(ZERO),
+                             output_field=DecimalField(max_digits=17, decimal_places=2)),
+    ).values_list(
+        'id', 'createdAt', 'invoiceType', 'customerOrVendorID__customerVendorName', 'storeID__storeName',
+        'agentID__agentName', 'lines_total', 'netTotal', 'totalPaid', 'status',
+    ).order_by('createdAt', 'id')
+    header = ['invoice_id', 'created_at', 'invoice_type', 'customer', 'store', 'agent',
+              'lines_total', 'net_total', 'total_paid', 'status']
+    return header, (list(row) for row in invoices.iterator(chunk_size=2000))
+
+
+def invoice_transaction_summary_rows(parameters):
+    """
+    The figures of the invoice and transaction summary report (all dates unless filtered)
+    as section/name/count/amount rows, followed by its largest invoices.
+    """
+    date_from, date_to = _date(parameters, 'date_from'), _date(parameters, 'date_to')
+    totals = rankings.invoice_transaction_totals(date_from, date_to)
+    header = ['section', 'name', 'count', 'amount']
+
+    def rows():
+        for key, stats in totals['invoice_stats'].items():
+            yield ['invoices', key, stats['count'], stats['total']]
+        yield ['invoices', 'total', totals['total_invoices'], '']
+        yield ['invoices', 'net_sales', '', totals['net_sales']]
+        yield ['transactions', 'total', totals['total_transactions'], '']
+        yield ['transactions', 'debit', '', totals['total_debit']]
+        yield ['transactions', 'credit', '', totals['total_credit']]
+        yield ['transactions', 'net_balance', '', totals['net_balance']]
+        for invoice in rankings.top_invoices(10, date_from, date_to):
+            customer = invoice.customerOrVendorID.customerVendorName if invoice.customerOrVendorID else ''
+            yield ['top_invoices', f'{invoice.id} {customer}'.strip(), '', invoice.lines_total]
+    return header, rows()
+
+
+def trial_balance_rows(parameters):
+    date_from, date_to = _month_range(parameters)
+    header = ['account_id', 'account', 'sign', 'opening', 'debit', 'credit', 'closing']
+    return header, (
+        [r['account'].id, r['account'].accountName, r['account'].sign or '',
+         r['opening'], r['debit'], r['credit'], r['closing']]
+        for r in ledger.trial_balance(date_from, date_to)
+    )
+
+
+def top_customers_rows(parameters):
+    """Every customer ranked by net sales for the filters of the top customers report."""
+    rows = rankings.top_customers(
+        limit=None,
+        date_from=_date(parameters, 'date_from'),
+        date_to=_date(parameters, 'date_to'),
+        store_id=_int(parameters, 'store'),
+        agent_id=_int(parameters, 'agent'),
+    )
+    header = ['rank', 'customer_id', 'customer', 'sales', 'returns', 'net_sales', 'invoices', 'items']
+    return header, (
+        [rank, row['customer_id'], row['customer'].customerVendorName, row['sales_total'],
+         row['returns_total'], row['net_sales'], row['invoice_count'], row['item_count']]
+        for rank, row in enumerate(rows, start=1)
+    )
+
+
+def product_sales_rows(parameters):
+    """Every item ranked for the filters and sort of the product sales ranking report (net sales by default)."""
+    rows = rankings.product_sales(
+        sort=parameters.get('sort') or 'revenue',
+        descending=parameters.get('direction') != 'asc',
+        date_from=_date(parameters, 'date_from'),
+        date_to=_date(parameters, 'date_to'),
+        store_id=_int(parameters, 'store'),
+        agent_id=_int(parameters, 'agent'),
+    )
+    header = ['rank', 'item_id', 'item', 'sales_quantity', 'returns_quantity', 'net_quantity',
+              'sales', 'returns', 'net_sales', 'customers', 'average_price']
+    return header, (
+        [rank, row['id'], row['itemName'], row['sales_quantity'], row['returns_quantity'],
+         row['net_quantity'], row['sales_revenue'], row['returns_revenue'], row['net_revenue'],
+         row['customer_count'], round(row['average_price'], 2)]
+        for rank, row in enumerate(rows.iterator(chunk_size=2000), start=1)
+    )
+
+
+def receivables_aging_rows(parameters):
+    rows = aging.receivables_aging(
+        _date(parameters, 'as_of'),
+        agent_id=_int(parameters, 'agent'),
+    )
+    header = ['customer_id', 'customer', '0-30', '31-60', '61-90', '90+', 'total', 'open_invoices']
+    return header, (
+        [row['customer_id'], row['customer_name'], row['current'], row['days_31_60'],
+         row['days_61_90'], row['over_90'], row['total'], row['open_invoices']]
+        for row in rows
+    )
+
+
+def customer_statement_rows(parameters):
+    customer_id = _int(parameters, 'customer')
+    if not customer_id:
+        raise ValueError('customer is required')
+    date_from, date_to = _month_range(parameters)
+    statement = statements.iter_statement(customer_id, date_from, date_to)
+    opening = next(statement)
+    header = ['date', 'transaction_id', 'invoice_id', 'account', 'notes', 'debit', 'credit', 'balance']
+
+    def rows():
+        yield [date_from, '', '', '', 'Opening balance', '', '', opening]
+        for row in statement:
+            yield [row['created_at'], row['id'], row['invoice_id'] or '', row['account_name'] or '',
+                   row['notes'] or '', row['debit'], row['credit'], row['balance']]
+    return header, rows()
+
+
+# Report key -> (title, builder). A builder takes the run parameters and returns (header, rows).
+REPORTS = {
+    'customer_balance': ('أرصدة العملاء', customer_balance_rows),
+    'invoice_transaction_summary': ('ملخص الفواتير والمعاملات', invoice_transaction_summary_rows),
+    'invoice_register': ('سجل الفواتير', invoice_register_rows),
+    'trial_balance': ('ميزان المراجعة', trial_balance_rows),
+    'top_customers': ('ترتيب العملاء حسب صافي المبيعات', top_customers_rows),
+    'product_sales': ('ترتيب الأصناف حسب المبيعات', product_sales_rows),
+    'receivables_aging': ('أعمار الديون', receivables_aging_rows),
+    'customer_statement': ('كشف حساب عميل', customer_statement_rows),
+}
+
+
+def submit(report_name, parameters=None, output_format='csv', user=None):
+    """Queue a report run for the worker. Returns the new ReportRun."""
+    if report_name not in REPORTS:
+        raise ValueError(f'Unknown report: {report_name}')
+    return ReportRun.objects.create(
+        reportName=report_name,
+        parameters=parameters or {},
+        outputFormat=output_format,
+        createdBy=user,
+    )
+
+
+def cancel(run):
+    """
+    Request cancellation of a run. Queued runs are cancelled at once; running ones stop
+    at the worker's next check. Returns True if the run was not already finished.
+    """
+    now = timezone.now()
+    updated = ReportRun.objects.filter(pk=run.pk, status=REPORT_RUN_QUEUED).update(
+        status=REPORT_RUN_CANCELLED, cancelRequested=True, finishedAt=now, updatedAt=now
+    )
+    if not updated:
+        updated = ReportRun.objects.filter(pk=run.pk, status=REPORT_RUN_RUNNING).update(
+            cancelRequested=True, updatedAt=now
+        )
+    return bool(updated)
+
+
+def claim_runs(limit):
+    """Mark up to `limit` queued runs as running and return their ids, oldest first."""
+    with db_transaction.atomic():
+        run_ids = list(
+            ReportRun.objects.select_for_update(skip_locked=True).filter(
+                status=REPORT_RUN_QUEUED, cancelRequested=False, isDeleted=False,
+            ).order_by('createdAt').values_list('id', flat=True)[:limit]
+        )
+        ReportRun.objects.filter(id__in=run_ids).update(status=REPORT_RUN_RUNNING, updatedAt=timezone.now())
+    return run_ids
+
+
+def requeue_interrupted_runs():
+    """
+    Queue again the runs left RUNNING by a report_worker that stopped without finishing them
+    (killed, host restarted); those whose cancellation was requested are marked cancelled.
+    Called when the worker starts, so only one report_worker may serve a database.
+    Returns the number of runs reset.
+    """
+    now = timezone.now()
+    interrupted = ReportRun.objects.filter(status=REPORT_RUN_RUNNING)
+    cancelled = interrupted.filter(cancelRequested=True).update(
+        status=REPORT_RUN_CANCELLED, finishedAt=now, updatedAt=now
+    )
+    requeued = interrupted.update(status=REPORT_RUN_QUEUED, startedAt=None, workerPid=None, updatedAt=now)
+    return cancelled + requeued
+
+
+def mark_failed(run_id, message):
+    """Record a run whose worker process died before it could finish."""
+    now = timezone.now()
+    ReportRun.objects.filter(pk=run_id, status=REPORT_RUN_RUNNING).update(
+        status=REPORT_RUN_FAILED, errorMessage=message, finishedAt=now, updatedAt=now
+    )
+
+
+def _cell(value):
+    # XLSX cells cannot hold aware datetimes; show them in local time like the report pages
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def _write_csv(path, header, rows, check):
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8-sig') as output:
+        writer = csv.writer(output)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow([_cell(value) for value in row])
+            count += 1
+            check(count)
+    return count
+
+
+def _write_xlsx(path, header, rows, check, sheet_title):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:31])
+    sheet.append(header)
+    count = 0
+    for row in rows:
+        sheet.append([_cell(value) for value in row])
+        count += 1
+        check(count)
+    workbook.save(path)
+    return count
+
+
+def execute_run(run_id):
+    """
+    Build one claimed run and store its output file. Runs inside a worker process.
+    Returns the final status.
+    """
+    run = ReportRun.objects.get(pk=run_id)
+    started = time.monotonic()
+    run.startedAt = timezone.now()
+    run.workerPid = os.getpid()
+    run.save(update_fields=['startedAt', 'workerPid', 'updatedAt'])
+
+    def check(count):
+        if count % CANCEL_CHECK_ROWS == 0 and ReportRun.objects.filter(pk=run_id, cancelRequested=True).exists():
+            raise RunCancelled()
+
+    builder = REPORTS[run.reportName][1]
+    suffix = '.' + run.outputFormat
+    handle, path = tempfile.mkstemp(suffix=suffix)
+    os.close(handle)
+    try:
+        header, rows = builder(run.parameters)
+        if run.outputFormat == 'xlsx':
+            run.rowCount = _write_xlsx(path, header, rows, check, run.reportName)
+        else:
+            run.rowCount = _write_csv(path, header, rows, check)
+        if ReportRun.objects.filter(pk=run_id, cancelRequested=True).exists():
+            raise RunCancelled()
+        with open(path, 'rb') as output:
+            filename = f'{run.reportName}_{run.id}_{timezone.localtime(run.startedAt):%Y%m%d_%H%M%S}{suffix}'
+            run.resultFile.save(filename, File(output), save=False)
+        run.status = REPORT_RUN_DONE
+    except RunCancelled:
+        run.status = REPORT_RUN_CANCELLED
+    except Exception as exc:
+        run.status = REPORT_RUN_FAILED
+        run.errorMessage = f'{type(exc).__name__}: {exc}'
+    finally:
+        os.remove(path)
+
+    run.finishedAt = timezone.now()
+    run.durationSeconds = Decimal(time.monotonic() - started).quantize(Decimal('0.001'))
+    run.save(update_fields=[
+        'status', 'resultFile', 'rowCount', 'finishedAt', 'durationSeconds', 'errorMessage', 'updatedAt'
+    ])
+    return run.status
@@ -5,7 +5,16 @@ urlpatterns = [
     path('', views.index, name='reports_index'),
     path('customer-purchase-history/', views.customer_purchase_history, name='customer_purchase_history'),
     path('top-customers/', views.top_customers, name='top_customers'),
+    path('product-sales-ranking/', views.product_sales_ranking, name='product_sales_ranking'),
     path('customer-balance/', views.customer_balance, name='customer_balance'),
     path('product-sales-by-customer/', views.product_sales_by_customer, name='product_sales_by_customer'),
     path('invoice-transaction-summary/', views.invoice_transaction_summary, name='invoice_transaction_summary'),
+    path('trial-balance/', views.trial_balance, name='trial_balance'),
+    path('trial-balance/account/<int:account_id>/', views.account_movement, name='account_movement'),
+    path('customer-statement/<int:customer_id>/', views.customer_statement, name='customer_statement'),
+    path('receivables-aging/', views.receivables_aging, name='receivables_aging'),
+    path('runs/', views.report_runs, name='report_runs'),
+    path('runs/<int:run_id>/', views.report_run_status, name='report_run_status'),
+    path('runs/<int:run_id>/cancel/', views.report_run_cancel, name='report_run_cancel'),
+    path('runs/<int:run_id>/download/', views.report_run_download, name='report_run_download'),
 ]
@@ -1,9 +1,55 @@
 # Views for customer-focused reports
 
-from django.shortcuts import render
+import csv
+from datetime import datetime
+from decimal import Decimal
+
+from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, Q
-from core.models import CustomerVendor, InvoiceDetail, InvoiceMaster
+from django.core.paginator import Paginator
+from django.db.models import Exists, OuterRef
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from django.utils import timezone
+from core.models import (
+    CustomerVendor, InvoiceDetail, InvoiceMaster, Account, Agent, ReportRun, Store, VisitPlan,
+)
+from core import aging, ledger, periods, rankings, report_cache, report_runner, statements
+from core.constants import (
+    SNAPSHOT_KIND_CUSTOMER, REPORT_FORMAT_CHOICES, REPORT_RUN_QUEUED, REPORT_RUN_RUNNING,
+    INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_SALES,
+)
+from core.partitioning import created_in_range
+
+ZERO = Decimal('0')
+
+
+def _parse_date_param(value, default):
+    """Parse a YYYY-MM-DD query parameter, falling back to default."""
+    if not value:
+        return default
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return default
+
+
+def _csv_response(filename, header, rows):
+    """Build a CSV download (UTF-8 with BOM so Excel renders Arabic names)."""
+    response = HttpResponse(content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.write('\ufeff')
+    writer = csv.writer(response)
+    writer.writerow(header)
+    writer.writerows(rows)
+    return response
+
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output."""
+    def write(self, value):
+        return value
+
 
 @login_required
 def index(request):
@@ -13,47 +59,61 @@ def index(request):
 
 @login_required
 def customer_purchase_history(request):
+    """Sales and return-sales invoices of one customer, newest first, paged by invoice."""
     customers = CustomerVendor.objects.filter(type__in=[1,3], isDeleted=False)
-    selected_customer = request.GET.get('customer')
-    purchases = []
+    selected_customer = request.GET.get('customer', '')
+    if not selected_customer.isdigit():
+        selected_customer = ''
+    date_from = _parse_date_param(request.GET.get('date_from'), None)
+    date_to = _parse_date_param(request.GET.get('date_to'), None)
+    page_obj = None
     net_total = 0
     grouped_invoices = []
     if selected_customer:
-        purchases = InvoiceDetail.objects.filter(
-            invoiceMasterID__customerOrVendorID_id=selected_customer,
-            invoiceMasterID__invoiceType__in=[2, 4],  # Sales and Return Sales
+        # Page through the invoice ids in SQL; only invoices with active lines are listed
+        invoices = InvoiceMaster.objects.filter(
+            created_in_range(date_from, date_to),
+            Exists(InvoiceDetail.objects.filter(invoiceMasterID=OuterRef('pk'), isDeleted=False)),
+            customerOrVendorID_id=selected_customer,
+            invoiceType__in=[INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_SALES],
             isDeleted=False,
-            invoiceMasterID__isDeleted=False
-        ).select_related('item', 'invoiceMasterID')
-        # Group items by invoice
-        invoice_map = {}
-        for p in purchases:
-            invoice_id = p.invoiceMasterID.id
-            if invoice_id not in invoice_map:
-                invoice_map[invoice_id] = {
-                    'invoice': p.invoiceMasterID,
-                    'items': [],
-                    'total': 0,
-                }
+        ).order_by('-createdAt', '-id')
+        page_obj = Paginator(invoices, 20).get_page(request.GET.get('page'))
+        
+        # Lines are fetched for this page's invoices only
+        invoice_map = {
+            invoice.id: {'invoice': invoice, 'items': [], 'total': 0}
+            for invoice in page_obj
+        }
+        lines = InvoiceDetail.objects.filter(
+            invoiceMasterID_id__in=list(invoice_map),
+            isDeleted=False,
+        ).select_related('item').order_by('id')
+        for p in lines:
             total = (p.quantity or 0) * (p.price or 0)
-            invoice_map[invoice_id]['items'].append({
+            invoice_map[p.invoiceMasterID_id]['items'].append({
                 'item': p.item,
                 'quantity': p.quantity,
                 'price': p.price,
                 'total': total,
             })
-            invoice_map[invoice_id]['total'] += total
-            if p.invoiceMasterID.invoiceType == 2:
-                net_total += total
-            elif p.invoiceMasterID.invoiceType == 4:
-                net_total -= total
+            invoice_map[p.invoiceMasterID_id]['total'] += total
         grouped_invoices = list(invoice_map.values())
+        net_total = rankings.customer_net_sales(selected_customer, date_from=date_from, date_to=date_to)
+    
+    # Filters carried by the page links
+    query = request.GET.copy()
+    query.pop('page', None)
     
     return render(request, 'reports/customer_purchase_history.html', {
         'customers': customers,
         'selected_customer': int(selected_customer) if selected_customer else None,
         'grouped_invoices': grouped_invoices,
+        'page_obj': page_obj,
+        'filter_query': query.urlencode(),
         'net_total': net_total,
+        'date_from': date_from.isoformat() if date_from else '',
+        'date_to': date_to.isoformat() if date_to else '',
     })
 
 
@@ -61,60 +121,35 @@ def customer_purchase_history(request):
 def top_customers(request):
     """Top customers ranked by net sales."""
     limit = request.GET.get('limit', '20')
+    date_from = _parse_date_param(request.GET.get('date_from'), None)
+    date_to = _parse_date_param(request.GET.get('date_to'), None)
+    store_filter = request.GET.get('store', '')
+    agent_filter = request.GET.get('agent', '')
     
-    # Get all customers
-    customers = CustomerVendor.objects.filter(type__in=[1, 3], isDeleted=False)
-    
-    customer_stats = []
-    total_revenue = 0
-    
-    for customer in customers:
-        # Get all invoice details for this customer
-        purchases = InvoiceDetail.objects.filter(
-            invoiceMasterID__customerOrVendorID_id=customer.id,
-            invoiceMasterID__invoiceType__in=[2, 4],  # Sales and Return Sales
-            isDeleted=False,
-            invoiceMasterID__isDeleted=False
-        ).select_related('invoiceMasterID')
-        
-        sales_total = 0
-        returns_total = 0
-        invoice_count = set()
-        item_count = 0
-        
-        for p in purchases:
-            total = (p.quantity or 0) * (p.price or 0)
-            invoice_count.add(p.invoiceMasterID.id)
-            item_count += 1
-            
-            if p.invoiceMasterID.invoiceType == 2:  # Sales
-                sales_total += total
-            elif p.invoiceMasterID.invoiceType == 4:  # Return Sales
-                returns_total += total
-        
-        net_sales = sales_total - returns_total
-        
-        if net_sales > 0 or sales_total > 0 or returns_total > 0:  # Only include customers with transactions
-            customer_stats.append({
-                'customer': customer,
-                'sales_total': sales_total,
-                'returns_total': returns_total,
-                'net_sales': net_sales,
-                'invoice_count': len(invoice_count),
-                'item_count': item_count,
-            })
-            total_revenue += net_sales
-    
-    # Sort by net sales descending
-    customer_stats.sort(key=lambda x: x['net_sales'], reverse=True)
+    filters = {
+        'date_from': date_from,
+        'date_to': date_to,
+        'store_id': int(store_filter) if store_filter.isdigit() else None,
+        'agent_id': int(agent_filter) if agent_filter.isdigit() else None,
+    }
     
-    # Apply limit
-    if limit != 'all':
+    if limit == 'all':
+        limit_int = None
+    else:
         try:
             limit_int = int(limit)
-            customer_stats = customer_stats[:limit_int]
         except ValueError:
-            customer_stats = customer_stats[:20]
+            limit_int = 20
+        if limit_int < 1:
+            return HttpResponseBadRequest('limit must be a positive number or "all"')
+        limit_int = min(limit_int, rankings.MAX_TOP_CUSTOMERS)
+    
+    # One grouped query for the ranked page and one aggregate for the overall total
+    customer_stats, total_revenue = report_cache.get_or_compute(
+        'top_customers',
+        dict(filters, limit=limit_int),
+        lambda: (rankings.top_customers(limit=limit_int, **filters), rankings.net_sales_total(**filters)),
+    )
     
     # Calculate max for progress bars
     max_sales = customer_stats[0]['net_sales'] if customer_stats else 0
@@ -131,15 +166,78 @@ def top_customers(request):
         'average_revenue': total_revenue / len(customer_stats) if customer_stats else 0,
         'selected_limit': limit,
         'max_sales': max_sales,
+        'date_from': date_from.isoformat() if date_from else '',
+        'date_to': date_to.isoformat() if date_to else '',
+        'stores': Store.objects.filter(isDeleted=False).order_by('storeName'),
+        'agents': Agent.objects.filter(isDeleted=False).order_by('agentName'),
+        'selected_store': store_filter,
+        'selected_agent': agent_filter,
+    })
+
+
+@login_required
+def product_sales_ranking(request):
+    """Every item ranked by sales across all customers, sortable, paginated and exportable."""
+    date_from = _parse_date_param(request.GET.get('date_from'), None)
+    date_to = _parse_date_param(request.GET.get('date_to'), None)
+    store_filter = request.GET.get('store', '')
+    agent_filter = request.GET.get('agent', '')
+    sort_by = request.GET.get('sort', 'revenue')
+    if sort_by not in rankings.PRODUCT_SORTS:
+        sort_by = 'revenue'
+    sort_direction = 'asc' if request.GET.get('direction') == 'asc' else 'desc'
+
+    store_id = int(store_filter) if store_filter.isdigit() else None
+    agent_id = int(agent_filter) if agent_filter.isdigit() else None
+
+    if request.GET.get('export') == 'csv':
+        # Same rows as the background product_sales report
+        header, csv_rows = report_runner.product_sales_rows({
+            'date_from': date_from.isoformat() if date_from else '',
+            'date_to': date_to.isoformat() if date_to else '',
+            'store': store_id,
+            'agent': agent_id,
+            'sort': sort_by,
+            'direction': sort_direction,
+        })
+        return _csv_response(f'product_sales_ranking_{timezone.localdate()}.csv', header, csv_rows)
+
+    # The ranking is one grouped query; the page only fetches its own slice of it
+    rows = rankings.product_sales(
+        sort=sort_by,
+        descending=sort_direction == 'desc',
+        date_from=date_from,
+        date_to=date_to,
+        store_id=store_id,
+        agent_id=agent_id,
+    )
+
+    page_obj = Paginator(rows, 50).get_page(request.GET.get('page'))
+    for rank, row in enumerate(page_obj, start=page_obj.start_index()):
+        row['rank'] = rank
+
+    # Filters carried by the sort and page links
+    query = request.GET.copy()
+    for name in ('page', 'sort', 'direction', 'export'):
+        query.pop(name, None)
+
+    return render(request, 'reports/product_sales_ranking.html', {
+        'rows': page_obj,
+        'filter_query': query.urlencode(),
+        'date_from': date_from.isoformat() if date_from else '',
+        'date_to': date_to.isoformat() if date_to else '',
+        'stores': Store.objects.filter(isDeleted=False).order_by('storeName'),
+        'agents': Agent.objects.filter(isDeleted=False).order_by('agentName'),
+        'selected_store': store_filter,
+        'selected_agent': agent_filter,
+        'sort_by': sort_by,
+        'sort_direction': sort_direction,
     })
 
 
 @login_required
 def customer_balance(request):
     """Customer balance and outstanding payments report."""
-    from core.models import Transaction, Agent, VisitPlan
-    from django.db import connection
-    
     status_filter = request.GET.get('status', 'all')
     sort_by = request.GET.get('sort', 'balance')
     sort_direction = request.GET.get('direction', 'asc')
@@ -183,57 +281,47 @@ def customer_balance(request):
     credit_count = 0
     paid_count = 0
     
-    # Use raw SQL to calculate balances from all customer transactions
-    with connection.cursor() as cursor:
-        for customer in customers:
-            # Query all transactions for this customer
-            # Positive amount = debit (payment received from customer)
-            # Negative amount = credit (sale/amount owed by customer)
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END), 0) as total_debit,
-                    COALESCE(SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END), 0) as total_credit,
-                    COUNT(*) as transaction_count,
-                    MAX("createdAt") as last_transaction
-                FROM transactions
-                WHERE "customerVendorID_id" = %s 
-                  AND "isDeleted" = FALSE
-            """, [customer.id])
-            
-            row = cursor.fetchone()
-            total_debit = float(row[0]) if row[0] else 0
-            total_credit = float(row[1]) if row[1] else 0
-            transaction_count = row[2] if row[2] else 0
-            last_transaction = row[3]
-            
-            # Calculate balance
-            # Balance = total_debit - total_credit
-            # Negative balance means customer owes us money (outstanding)
-            # Positive balance means we owe customer money (credit balance)
-            balance = total_debit - total_credit
-            
-            # Determine status
-            if balance < -0.01:  # Customer owes us (outstanding)
-                status = 'outstanding'
-                outstanding_count += 1
-                total_outstanding += abs(balance)
-            elif balance > 0.01:  # We owe customer (credit)
-                status = 'credit'
-                credit_count += 1
-                total_credit_balance += balance
-            else:  # Fully paid
-                status = 'paid'
-                paid_count += 1
-            
-            customer_balances.append({
-                'customer': customer,
-                'total_debit': total_debit,
-                'total_credit': total_credit,
-                'balance': balance,
-                'transaction_count': transaction_count,
-                'last_transaction': last_transaction,
-                'status': status,
-            })
+    # Balances start from the latest closed-period snapshot and add only open-period activity.
+    # Positive amount = debit (payment received from customer)
+    # Negative amount = credit (sale/amount owed by customer)
+    totals = report_cache.get_or_compute(
+        'customer_balance', {}, lambda: periods.balances(SNAPSHOT_KIND_CUSTOMER)
+    )
+    for customer in customers:
+        row = totals.get(customer.id)
+        total_debit = float(row['debit']) if row else 0
+        total_credit = float(row['credit']) if row else 0
+        transaction_count = row['transaction_count'] if row else 0
+        last_transaction = row['last_transaction'] if row else None
+        
+        # Calculate balance
+        # Balance = total_debit - total_credit
+        # Negative balance means customer owes us money (outstanding)
+        # Positive balance means we owe customer money (credit balance)
+        balance = total_debit - total_credit
+        
+        # Determine status
+        if balance < -0.01:  # Customer owes us (outstanding)
+            status = 'outstanding'
+            outstanding_count += 1
+            total_outstanding += abs(balance)
+        elif balance > 0.01:  # We owe customer (credit)
+            status = 'credit'
+            credit_count += 1
+            total_credit_balance += balance
+        else:  # Fully paid
+            status = 'paid'
+            paid_count += 1
+        
+        customer_balances.append({
+            'customer': customer,
+            'total_debit': total_debit,
+            'total_credit': total_credit,
+            'balance': balance,
+            'transaction_count': transaction_count,
+            'last_transaction': last_transaction,
+            'status': status,
+        })
     
     # Calculate total customers before applying filter
     total_customers = len(customer_balances)
@@ -281,46 +369,15 @@ def product_sales_by_customer(request):
     top_product = None
     
     if selected_customer:
-        # Get all invoice details for this customer (sales only, not returns)
-        purchases = InvoiceDetail.objects.filter(
-            invoiceMasterID__customerOrVendorID_id=selected_customer,
-            invoiceMasterID__invoiceType=2,  # Sales only
-            isDeleted=False,
-            invoiceMasterID__isDeleted=False
-        ).select_related('item', 'invoiceMasterID')
-        
-        # Group by product
-        product_map = {}
-        for p in purchases:
-            if not p.item:
-                continue
-                
-            item_id = p.item.id
-            if item_id not in product_map:
-                product_map[item_id] = {
-                    'product': p.item,
-                    'quantity': 0,
-                    'total_amount': 0,
-                    'invoice_count': set(),
-                }
-            
-            quantity = p.quantity or 0
-            price = p.price or 0
-            amount = quantity * price
-            
-            product_map[item_id]['quantity'] += quantity
-            product_map[item_id]['total_amount'] += amount
-            product_map[item_id]['invoice_count'].add(p.invoiceMasterID.id)
-        
-        # Convert to list and calculate totals
-        for item_id, data in product_map.items():
-            total_sales += data['total_amount']
+        # Per-product sales of this customer from the daily sales facts (sales only, not returns)
+        for row in rankings.customer_product_sales(int(selected_customer)):
+            total_sales += row['total_amount']
             product_sales.append({
-                'product': data['product'],
-                'quantity': data['quantity'],
-                'total_amount': data['total_amount'],
-                'invoice_count': len(data['invoice_count']),
-                'avg_price': data['total_amount'] / data['quantity'] if data['quantity'] > 0 else 0,
+                'product': row['product'],
+                'quantity': row['quantity'],
+                'total_amount': row['total_amount'],
+                'invoice_count': row['invoice_count'],
+                'avg_price': row['total_amount'] / row['quantity'] if row['quantity'] > 0 else 0,
             })
         
         total_products = len(product_sales)
@@ -356,125 +413,301 @@ def product_sales_by_customer(request):
 def invoice_transaction_summary(request):
     """Comprehensive invoice and transaction summary report."""
     from core.models import Transaction
-    from django.db import connection
-    from datetime import datetime, timedelta
     
     # Get date filters
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
-    
-    # Base query for invoices
-    invoices = InvoiceMaster.objects.filter(isDeleted=False)
-    
-    # Apply date filters
-    if date_from:
-        invoices = invoices.filter(createdAt__gte=date_from)
-    if date_to:
-        invoices = invoices.filter(createdAt__lte=date_to)
-    
-    # Invoice statistics by type
-    invoice_stats = {
-        'sales': {'count': 0, 'total': 0},
-        'returns': {'count': 0, 'total': 0},
-        'purchases': {'count': 0, 'total': 0},
-        'return_purchases': {'count': 0, 'total': 0},
-    }
+    date_from = _parse_date_param(request.GET.get('date_from'), None)
+    date_to = _parse_date_param(request.GET.get('date_to'), None)
+    totals = rankings.invoice_transaction_totals(date_from, date_to)
     
-    total_invoices = 0
+    # Largest invoices of the range by line total, ranked in SQL
+    top_invoices = [
+        {'invoice': invoice, 'total': invoice.lines_total}
+        for invoice in rankings.top_invoices(10, date_from, date_to)
+    ]
     
-    for invoice in invoices:
-        # Get invoice details to calculate total
-        details = InvoiceDetail.objects.filter(
-            invoiceMasterID=invoice,
-            isDeleted=False
-        )
-        
-        invoice_total = sum((d.quantity or 0) * (d.price or 0) for d in details)
-        total_invoices += 1
-        
-        if invoice.invoiceType == 1:  # Purchase
-            invoice_stats['purchases']['count'] += 1
-            invoice_stats['purchases']['total'] += invoice_total
-        elif invoice.invoiceType == 2:  # Sales
-            invoice_stats['sales']['count'] += 1
-            invoice_stats['sales']['total'] += invoice_total
-        elif invoice.invoiceType == 3:  # Return Purchase
-            invoice_stats['return_purchases']['count'] += 1
-            invoice_stats['return_purchases']['total'] += invoice_total
-        elif invoice.invoiceType == 4:  # Return Sales
-            invoice_stats['returns']['count'] += 1
-            invoice_stats['returns']['total'] += invoice_total
-    
-    # Transaction statistics
-    transactions = Transaction.objects.filter(isDeleted=False)
-    
-    if date_from:
-        transactions = transactions.filter(createdAt__gte=date_from)
-    if date_to:
-        transactions = transactions.filter(createdAt__lte=date_to)
-    
-    total_transactions = transactions.count()
-    
-    # Calculate debits and credits using raw SQL
-    with connection.cursor() as cursor:
-        where_clause = "WHERE \"isDeleted\" = FALSE"
-        params = []
-        
-        if date_from:
-            where_clause += " AND \"createdAt\" >= %s"
-            params.append(date_from)
-        if date_to:
-            where_clause += " AND \"createdAt\" <= %s"
-            params.append(date_to)
-        
-        cursor.execute(f"""
-            SELECT 
-                COALESCE(SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END), 0) as total_debit,
-                COALESCE(SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END), 0) as total_credit
-            FROM transactions
-            {where_clause}
-        """, params)
-        
-        row = cursor.fetchone()
-        total_debit = float(row[0]) if row[0] else 0
-        total_credit = float(row[1]) if row[1] else 0
-    
-    net_balance = total_debit - total_credit
-    
-    # Get top invoices by amount
-    top_invoices = []
-    for invoice in invoices.order_by('-createdAt')[:10]:
-        details = InvoiceDetail.objects.filter(
-            invoiceMasterID=invoice,
-            isDeleted=False
-        )
-        invoice_total = sum((d.quantity or 0) * (d.price or 0) for d in details)
-        
-        top_invoices.append({
-            'invoice': invoice,
-            'total': invoice_total,
-        })
+    # Get recent transactions
+    recent_transactions = Transaction.objects.filter(
+        created_in_range(date_from, date_to),
+        isDeleted=False,
+    ).select_related('customerVendorID', 'invoiceID').order_by('-createdAt')[:15]
     
-    # Sort by total descending
-    top_invoices.sort(key=lambda x: x['total'], reverse=True)
-    top_invoices = top_invoices[:10]
+    return render(request, 'reports/invoice_transaction_summary.html', {
+        **totals,
+        'top_invoices': top_invoices,
+        'recent_transactions': recent_transactions,
+        'date_from': date_from.isoformat() if date_from else '',
+        'date_to': date_to.isoformat() if date_to else '',
+    })
+
+
+@login_required
+def trial_balance(request):
+    """Trial balance: opening, period debits/credits and closing balance per account."""
+    today = timezone.localdate()
+    date_from = _parse_date_param(request.GET.get('date_from'), today.replace(day=1))
+    date_to = _parse_date_param(request.GET.get('date_to'), today)
+    
+    rows = report_cache.get_or_compute(
+        'trial_balance',
+        {'date_from': date_from, 'date_to': date_to},
+        lambda: ledger.trial_balance(date_from, date_to),
+    )
+    
+    if not request.GET.get('show_empty'):
+        rows = [r for r in rows if r['opening'] or r['debit'] or r['credit']]
+    
+    totals = {
+        'opening': sum(r['opening'] for r in rows),
+        'debit': sum(r['debit'] for r in rows),
+        'credit': sum(r['credit'] for r in rows),
+        'closing': sum(r['closing'] for r in rows),
+    }
     
-    # Get recent transactions
-    recent_transactions = transactions.select_related('customerVendorID', 'invoiceID').order_by('-createdAt')[:15]
+    if request.GET.get('export') == 'csv':
+        return _csv_response(
+            f'trial_balance_{date_from}_{date_to}.csv',
+            ['account_id', 'account', 'sign', 'opening', 'debit', 'credit', 'closing'],
+            [
+                [r['account'].id, r['account'].accountName, r['account'].sign or '',
+                 r['opening'], r['debit'], r['credit'], r['closing']]
+                for r in rows
+            ],
+        )
     
-    # Calculate net sales (sales - returns)
-    net_sales = invoice_stats['sales']['total'] - invoice_stats['returns']['total']
+    return render(request, 'reports/trial_balance.html', {
+        'rows': rows,
+        'totals': totals,
+        'date_from': date_from.strftime('%Y-%m-%d'),
+        'date_to': date_to.strftime('%Y-%m-%d'),
+        'show_empty': bool(request.GET.get('show_empty')),
+    })
+
+
+@login_required
+def account_movement(request, account_id):
+    """Day-by-day movement of a single account with running balance."""
+    account = get_object_or_404(Account, id=account_id, isDeleted=False)
+    today = timezone.localdate()
+    date_from = _parse_date_param(request.GET.get('date_from'), today.replace(day=1))
+    date_to = _parse_date_param(request.GET.get('date_to'), today)
+    
+    opening, rows = report_cache.get_or_compute(
+        'account_movement',
+        {'account': account.id, 'date_from': date_from, 'date_to': date_to},
+        lambda: ledger.account_movements(account.id, date_from, date_to),
+    )
+    total_debit = sum(r['debit'] for r in rows)
+    total_credit = sum(r['credit'] for r in rows)
+    closing = opening + total_debit - total_credit
+    
+    if request.GET.get('export') == 'csv':
+        return _csv_response(
+            f'account_{account.id}_{date_from}_{date_to}.csv',
+            ['day', 'debit', 'credit', 'transactions', 'balance'],
+            [['opening', '', '', '', opening]]
+            + [[r['day'], r['debit'], r['credit'], r['transaction_count'], r['balance']] for r in rows],
+        )
     
-    return render(request, 'reports/invoice_transaction_summary.html', {
-        'total_invoices': total_invoices,
-        'invoice_stats': invoice_stats,
-        'total_transactions': total_transactions,
+    return render(request, 'reports/account_movement.html', {
+        'account': account,
+        'rows': rows,
+        'opening': opening,
+        'closing': closing,
         'total_debit': total_debit,
         'total_credit': total_credit,
-        'net_balance': net_balance,
-        'net_sales': net_sales,
-        'top_invoices': top_invoices,
-        'recent_transactions': recent_transactions,
-        'date_from': date_from,
-        'date_to': date_to,
+        'date_from': date_from.strftime('%Y-%m-%d'),
+        'date_to': date_to.strftime('%Y-%m-%d'),
+    })
+
+
+@login_required
+def customer_statement(request, customer_id):
+    """Customer account statement with running balance, cursor paging and streamed CSV export."""
+    customer = get_object_or_404(CustomerVendor, id=customer_id, type__in=[1, 3], isDeleted=False)
+
+    today = timezone.localdate()
+    date_from = _parse_date_param(request.GET.get('date_from'), today.replace(day=1))
+    date_to = _parse_date_param(request.GET.get('date_to'), today)
+
+    if request.GET.get('export') == 'csv':
+        return _customer_statement_csv(customer, date_from, date_to)
+
+    try:
+        page = statements.statement_page(
+            customer.id, date_from, date_to,
+            cursor=request.GET.get('cursor'),
+            limit=200
+        )
+    except statements.InvalidCursor:
+        page = statements.statement_page(customer.id, date_from, date_to, limit=200)
+
+    rows = page['rows']
+    closing = rows[-1]['balance'] if rows else page['carried']
+
+    return render(request, 'reports/customer_statement.html', {
+        'customer': customer,
+        'opening': page['opening'],
+        'carried': page['carried'],
+        'is_first_page': not request.GET.get('cursor'),
+        'rows': rows,
+        'closing': closing,
+        'next_cursor': page['next_cursor'],
+        'date_from': date_from.strftime('%Y-%m-%d'),
+        'date_to': date_to.strftime('%Y-%m-%d'),
     })
+
+
+def _customer_statement_csv(customer, date_from, date_to):
+    """Stream the whole statement as CSV without loading the period into memory."""
+    def generate():
+        writer = csv.writer(_Echo())
+        rows = statements.iter_statement(customer.id, date_from, date_to)
+        opening = next(rows)
+        yield '\ufeff'
+        yield writer.writerow(['date', 'transaction_id', 'invoice_id', 'account', 'notes', 'debit', 'credit', 'balance'])
+        yield writer.writerow([date_from, '', '', '', 'Opening balance', '', '', opening])
+        for row in rows:
+            yield writer.writerow([
+                timezone.localtime(row['created_at']).strftime('%Y-%m-%d %H:%M'),
+                row['id'],
+                row['invoice_id'] or '',
+                row['account_name'] or '',
+                row['notes'] or '',
+                row['debit'],
+                row['credit'],
+                row['balance'],
+            ])
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = (
+        f'attachment; filename="statement_{customer.id}_{date_from}_{date_to}.csv"'
+    )
+    return response
+
+
+@login_required
+def receivables_aging(request):
+    """Receivables aging (0-30/31-60/61-90/90+ days) per customer, cached per day."""
+    agent_filter = request.GET.get('agent', '')
+    plan_filter = request.GET.get('plan', '')
+
+    agent_id = None
+    if agent_filter:
+        try:
+            agent_id = int(agent_filter)
+        except ValueError:
+            agent_filter = ''
+
+    agents = Agent.objects.filter(isDeleted=False, isActive=True).order_by('agentName')
+    plans = VisitPlan.objects.filter(isDeleted=False).select_related('agentID').order_by('-dateFrom')
+    if agent_id:
+        plans = plans.filter(agentID_id=agent_id)
+
+    customer_ids = None
+    if plan_filter:
+        plan = plans.filter(id=plan_filter).first() if plan_filter.isdigit() else None
+        customer_ids = plan.customers if plan and isinstance(plan.customers, list) else []
+
+    rows = aging.cached_receivables_aging(
+        agent_id=agent_id,
+        customer_ids=customer_ids,
+        refresh=request.GET.get('refresh') == '1',
+    )
+    totals = aging.aging_totals(rows)
+
+    if request.GET.get('export') == 'csv':
+        return _csv_response(
+            f'receivables_aging_{timezone.localdate()}.csv',
+            ['customer_id', 'customer', '0-30', '31-60', '61-90', '90+', 'total', 'open_invoices'],
+            [
+                [row['customer_id'], row['customer_name'], row['current'], row['days_31_60'],
+                 row['days_61_90'], row['over_90'], row['total'], row['open_invoices']]
+                for row in rows
+            ],
+        )
+
+    return render(request, 'reports/receivables_aging.html', {
+        'rows': rows,
+        'totals': totals,
+        'agents': agents,
+        'plans': plans[:100],
+        'selected_agent': agent_filter,
+        'selected_plan': plan_filter,
+        'as_of': timezone.localdate(),
+    })
+
+
+# Filters a background report run may receive from the submit form
+REPORT_RUN_PARAMETERS = ('date_from', 'date_to', 'as_of', 'agent', 'store', 'customer', 'invoice_type', 'search')
+
+
+def _user_runs(request):
+    runs = ReportRun.objects.filter(isDeleted=False)
+    if not request.user.is_staff:
+        runs = runs.filter(createdBy=request.user)
+    return runs
+
+
+@login_required
+def report_runs(request):
+    """Background report runs: submit a report over any date range and list previous runs."""
+    if request.method == 'POST':
+        report_name = request.POST.get('report', '')
+        output_format = request.POST.get('format', 'csv')
+        if report_name not in report_runner.REPORTS or output_format not in dict(REPORT_FORMAT_CHOICES):
+            messages.error(request, 'التقرير أو صيغة الملف غير صالحة')
+            return redirect('core:report_runs')
+        parameters = {
+            name: request.POST[name].strip()
+            for name in REPORT_RUN_PARAMETERS
+            if request.POST.get(name, '').strip()
+        }
+        run = report_runner.submit(report_name, parameters, output_format, user=request.user)
+        messages.success(request, 'تمت إضافة التقرير إلى قائمة الانتظار')
+        return redirect('core:report_run_status', run_id=run.id)
+
+    runs = _user_runs(request).select_related('createdBy')[:50]
+    return render(request, 'reports/report_runs.html', {
+        'runs': runs,
+        'reports': [(name, title) for name, (title, _) in report_runner.REPORTS.items()],
+        'formats': REPORT_FORMAT_CHOICES,
+        'agents': Agent.objects.filter(isDeleted=False, isActive=True).order_by('agentName'),
+        'stores': Store.objects.filter(isDeleted=False).order_by('storeName'),
+        'today': timezone.localdate().strftime('%Y-%m-%d'),
+    })
+
+
+@login_required
+def report_run_status(request, run_id):
+    """Status of one background run; refreshes itself until the run finishes."""
+    run = get_object_or_404(_user_runs(request), id=run_id)
+    return render(request, 'reports/report_run_status.html', {
+        'run': run,
+        'title': report_runner.REPORTS.get(run.reportName, (run.reportName,))[0],
+        'is_active': run.status in (REPORT_RUN_QUEUED, REPORT_RUN_RUNNING),
+    })
+
+
+@login_required
+@require_POST
+def report_run_cancel(request, run_id):
+    """Cancel a queued or running background report."""
+    run = get_object_or_404(_user_runs(request), id=run_id)
+    if report_runner.cancel(run):
+        messages.success(request, 'تم طلب إلغاء التقرير')
+    else:
+        messages.error(request, 'التقرير انتهى بالفعل')
+    return redirect('core:report_run_status', run_id=run.id)
+
+
+@login_required
+def report_run_download(request, run_id):
+    """Download the file of a finished background report."""
+    run = get_object_or_404(_user_runs(request), id=run_id)
+    if not run.resultFile:
+        raise Http404('Report file is not available')
+    try:
+        output = run.resultFile.open('rb')
+    except FileNotFoundError:
+        raise Http404('Report file is not available')
+    return FileResponse(output, as_attachment=True, filename=run.resultFile.name.rsplit('/', 1)[-1])
@@ -3,6 +3,7 @@ Django REST Framework serializers for core models.
 Provides comprehensive serialization with nested relationships and display fields.
 """
 
+from django.db import models
 from rest_framework import serializers
 from core.models import *
 
@@ -296,6 +297,20 @@ class VisitSerializer(serializers.ModelSerializer):
         return data
 
 
+class VisitPlanListSerializer(serializers.ListSerializer):
+    """Loads the customers of all the plans in one query instead of one query per plan."""
+
+    def to_representation(self, data):
+        plans = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        customer_ids = {
+            customer_id for plan in plans if isinstance(plan.customers, list) for customer_id in plan.customers
+        }
+        customers = CustomerVendor.objects.filter(id__in=customer_ids, isDeleted=False) if customer_ids else []
+        # id -> (position in the customers' default ordering, customer)
+        self.child._customers_by_id = {customer.id: (position, customer) for position, customer in enumerate(customers)}
+        return super().to_representation(plans)
+
+
 class VisitPlanSerializer(serializers.ModelSerializer):
     """Serializer for VisitPlan model with related object information."""
     
@@ -310,6 +325,7 @@ class VisitPlanSerializer(serializers.ModelSerializer):
                  'createdAt', 'updatedAt', 'deletedAt', 'createdBy', 'updatedBy', 
                  'deletedBy', 'isDeleted']
         read_only_fields = ['createdAt', 'updatedAt']
+        list_serializer_class = VisitPlanListSerializer
     
     def get_customer_count(self, obj):
         """Return the number of customers in the plan."""
@@ -324,7 +340,13 @@ class VisitPlanSerializer(serializers.ModelSerializer):
         
         try:
             customer_ids = obj.customers
-            customers = CustomerVendor.objects.filter(id__in=customer_ids, isDeleted=False)
+            customers_by_id = getattr(self, '_customers_by_id', None)
+            if customers_by_id is None:
+                customers = CustomerVendor.objects.filter(id__in=customer_ids, isDeleted=False)
+            else:
+                # Preloaded by VisitPlanListSerializer
+                found = [customers_by_id[customer_id] for customer_id in set(customer_ids) if customer_id in customers_by_id]
+                customers = [customer for _position, customer in sorted(found, key=lambda entry: entry[0])]
             return [
                 {
                     'id': c.id,
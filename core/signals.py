@@ -0,0 +1,192 @@
+"""
+Model signal handlers for the core application.
+Keeps derived tables in sync with writes made through the ORM.
+"""
+
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import (
+    Account, ClosedPeriod, CustomerVendor, CustomerVendorPriceList, InvoiceDetail, InvoiceMaster, PriceList,
+    Transaction, Visit, VisitPlan,
+)
+from . import accounts, counters, credential_cache, facts, ledger, live, periods, plans, report_cache
+
+
+@receiver(pre_save, sender=Transaction)
+@receiver(pre_save, sender=InvoiceMaster)
+@receiver(pre_save, sender=InvoiceDetail)
+def block_closed_period_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Refuse back-dated writes into closed periods."""
+    if raw:
+        return
+    periods.ensure_writable(instance, update_fields=update_fields)
+
+
+@receiver(pre_delete, sender=Transaction)
+@receiver(pre_delete, sender=InvoiceMaster)
+@receiver(pre_delete, sender=InvoiceDetail)
+def block_closed_period_delete(sender, instance, **kwargs):
+    """Refuse deleting rows that belong to closed periods."""
+    periods.ensure_writable(instance, deleting=True)
+
+
+@receiver(post_save, sender=ClosedPeriod)
+@receiver(post_delete, sender=ClosedPeriod)
+def reset_closed_through(sender, **kwargs):
+    """Reload the closed-period boundary after a period is closed or reopened."""
+    periods.invalidate()
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_transaction_ledger_entry(sender, instance, **kwargs):
+    """Capture the stored ledger entry before an update so it can be reversed."""
+    if instance._state.adding or instance.pk is None:
+        instance._previous_ledger_entry = None
+    else:
+        instance._previous_ledger_entry = ledger.stored_entry(instance.pk)
+
+
+@receiver(post_save, sender=Transaction)
+def post_transaction_to_ledger(sender, instance, raw=False, **kwargs):
+    """Apply a saved transaction to the daily account aggregates."""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_ledger_entry', None)
+    ledger.record_transaction_change(previous, ledger.entry_for_instance(instance))
+
+
+@receiver(post_delete, sender=Transaction)
+def remove_transaction_from_ledger(sender, instance, **kwargs):
+    """Reverse a hard-deleted transaction from the daily account aggregates."""
+    ledger.record_transaction_change(ledger.entry_for_instance(instance), None)
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def reset_account_registry(sender, **kwargs):
+    """Reload the well-known accounts after any account change."""
+    accounts.invalidate()
+
+
+@receiver(pre_save, sender=InvoiceMaster)
+@receiver(pre_save, sender=InvoiceDetail)
+def remember_sales_fact_slice(sender, instance, raw=False, **kwargs):
+    """Capture the sales fact slice an update moves the invoice or line out of."""
+    instance._previous_fact_slice = None if raw else facts.stored_slice(instance)
+
+
+@receiver(post_save, sender=InvoiceMaster)
+@receiver(post_save, sender=InvoiceDetail)
+@receiver(post_delete, sender=InvoiceMaster)
+@receiver(post_delete, sender=InvoiceDetail)
+def refresh_sales_facts_for_invoice(sender, instance, raw=False, **kwargs):
+    """Rebuild the sales facts of the invoice's day and customer once the write is committed."""
+    previous = instance.__dict__.pop('_previous_fact_slice', None)
+    if raw:
+        return
+    slices = {facts.invoice_slice(instance), previous} - {None}
+    if slices:
+        facts.schedule_refresh(slices)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=InvoiceMaster)
+@receiver(post_save, sender=InvoiceDetail)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=InvoiceMaster)
+@receiver(post_delete, sender=InvoiceDetail)
+def invalidate_report_cache(sender, raw=False, **kwargs):
+    """Make cached report results stale once the write is committed."""
+    if raw:
+        return
+    report_cache.bump_on_commit()
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=InvoiceMaster)
+@receiver(post_save, sender=InvoiceDetail)
+@receiver(post_save, sender=Visit)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=InvoiceMaster)
+@receiver(post_delete, sender=InvoiceDetail)
+@receiver(post_delete, sender=Visit)
+def notify_live_dashboards(sender, instance, raw=False, **kwargs):
+    """Push today's postings to the live dashboard streams once the write is committed."""
+    if raw:
+        return
+    live.record_instance(instance)
+
+
+@receiver(post_save, sender=VisitPlan)
+@receiver(post_save, sender=CustomerVendor)
+@receiver(post_save, sender=CustomerVendorPriceList)
+@receiver(post_save, sender=PriceList)
+@receiver(post_delete, sender=VisitPlan)
+@receiver(post_delete, sender=CustomerVendor)
+@receiver(post_delete, sender=CustomerVendorPriceList)
+@receiver(post_delete, sender=PriceList)
+def invalidate_visit_plans(sender, raw=False, **kwargs):
+    """Make cached agent visit plans stale once the write is committed."""
+    if raw:
+        return
+    plans.bump_on_commit()
+
+
+@receiver(pre_save, sender=User)
+def remember_user_credentials(sender, instance, update_fields=None, **kwargs):
+    """Capture the stored password and active flag before a user is updated."""
+    if instance._state.adding or instance.pk is None:
+        instance._previous_credentials = None
+    elif update_fields is not None and not {'password', 'is_active'} & set(update_fields):
+        instance._previous_credentials = (instance.password, instance.is_active)
+    else:
+        instance._previous_credentials = User.objects.filter(pk=instance.pk).values_list(
+            'password', 'is_active'
+        ).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_changed_credentials(sender, instance, created=False, raw=False, **kwargs):
+    """Drop cached Basic Auth credentials of a user whose password or active flag changed."""
+    if raw or created:
+        return
+    if getattr(instance, '_previous_credentials', None) != (instance.password, instance.is_active):
+        credential_cache.invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_credentials(sender, instance, **kwargs):
+    """Drop cached Basic Auth credentials of a deleted user."""
+    credential_cache.invalidate_user(instance.pk)
+
+
+def remember_counted_values(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Capture the stored values the dashboard counters look at before an update."""
+    fields = counters.MODEL_FIELDS[sender]
+    if instance._state.adding or instance.pk is None:
+        instance._previous_counted_values = None
+    elif update_fields is not None and not set(update_fields) & set(fields):
+        instance._previous_counted_values = counters.instance_values(instance)
+    else:
+        instance._previous_counted_values = counters.stored_values(sender, instance.pk)
+
+
+def update_counters_on_save(sender, instance, raw=False, **kwargs):
+    """Move a saved row (including soft deletes) between the dashboard counters."""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_counted_values', None)
+    counters.record_change(sender, previous, counters.instance_values(instance))
+
+
+def update_counters_on_delete(sender, instance, **kwargs):
+    """Remove a hard-deleted row from the dashboard counters."""
+    counters.record_change(sender, counters.instance_values(instance), None)
+
+
+for counted_model in counters.COUNTED_MODELS:
+    pre_save.connect(remember_counted_values, sender=counted_model)
+    post_save.connect(update_counters_on_save, sender=counted_model)
+    post_delete.connect(update_counters_on_delete, sender=counted_model)
@@ -0,0 +1,140 @@
+"""
+Customer account statements.
+Opening balance from the latest closed-period snapshot plus later activity, then every transaction in the period with a
+running balance computed by the database (SUM() OVER (ORDER BY createdAt, id)).
+Pages are addressed with signed keyset cursors so each page only reads its own rows.
+"""
+
+from decimal import Decimal
+
+from django.core import signing
+from django.db.models import F, Sum, Window
+from django.utils.dateparse import parse_datetime
+
+from . import periods
+from .constants import SNAPSHOT_KIND_CUSTOMER
+from .models import Transaction
+from .partitioning import created_in_range
+
+ZERO = Decimal('0')
+CURSOR_SALT = 'core.statements.cursor'
+
+STATEMENT_FIELDS = (
+    'id', 'createdAt', 'amount', 'type', 'notes', 'invoiceID_id', 'accountID_id',
+    'accountID__accountName',
+)
+
+
+class InvalidCursor(Exception):
+    """Raised when a statement cursor cannot be decoded or was tampered with."""
+
+
+def opening_balance(customer_id, date_from):
+    """Balance of a customer before the first day of the statement (negative = customer owes us)."""
+    if not date_from:
+        return ZERO
+    return periods.balance(SNAPSHOT_KIND_CUSTOMER, customer_id, before=date_from)['balance']
+
+
+def statement_queryset(customer_id, date_from=None, date_to=None, after=None):
+    """
+    Statement rows in posting order annotated with `running`, the cumulative sum of amounts
+    within the returned rows. Callers add the balance carried in from before the first row.
+    `after` is a (createdAt, id) pair; only rows strictly after it are returned.
+    """
+    queryset = Transaction.objects.filter(
+        created_in_range(date_from, date_to),
+        customerVendorID_id=customer_id,
+        isDeleted=False,
+    )
+    if after:
+        created_at, last_id = after
+        queryset = queryset.filter(createdAt__gte=created_at).exclude(createdAt=created_at, id__lte=last_id)
+
+    return queryset.annotate(
+        running=Window(
+            expression=Sum('amount'),
+            order_by=[F('createdAt').asc(), F('id').asc()],
+        )
+    ).order_by('createdAt', 'id').values(*STATEMENT_FIELDS, 'running')
+
+
+def _statement_row(row, carried):
+    amount = row['amount'] or ZERO
+    return {
+        'id': row['id'],
+        'created_at': row['createdAt'],
+        'type': row['type'],
+        'notes': row['notes'],
+        'invoice_id': row['invoiceID_id'],
+        'account_id': row['accountID_id'],
+        'account_name': row['accountID__accountName'],
+        'debit': amount if amount > 0 else ZERO,
+        'credit': -amount if amount < 0 else ZERO,
+        'amount': amount,
+        'balance': carried + (row['running'] or ZERO),
+    }
+
+
+def _cursor_scope(customer_id, date_from, date_to):
+    """The statement a cursor belongs to: its carried balance is only right for that one."""
+    return [customer_id, date_from.isoformat() if date_from else None, date_to.isoformat() if date_to else None]
+
+
+def encode_cursor(row, customer_id, date_from=None, date_to=None):
+    """Signed cursor pointing just after a statement row, carrying its running balance."""
+    return signing.dumps(
+        [row['created_at'].isoformat(), row['id'], str(row['balance']),
+         *_cursor_scope(customer_id, date_from, date_to)],
+        salt=CURSOR_SALT,
+        compress=True,
+    )
+
+
+def decode_cursor(cursor, customer_id, date_from=None, date_to=None):
+    """
+    Return ((createdAt, id), balance) from a cursor produced by encode_cursor for the same
+    customer and period; raises InvalidCursor for any other.
+    """
+    try:
+        created_at, last_id, balance, *scope = signing.loads(cursor, salt=CURSOR_SALT)
+        position, carried = (parse_datetime(created_at), int(last_id)), Decimal(balance)
+    except (signing.BadSignature, ValueError, TypeError):
+        raise InvalidCursor('Invalid statement cursor')
+    if scope != _cursor_scope(customer_id, date_from, date_to):
+        raise InvalidCursor('Statement cursor belongs to another customer or period')
+    return position, carried
+
+
+def statement_page(customer_id, date_from=None, date_to=None, cursor=None, limit=100):
+    """
+    One page of a customer statement.
+    Returns a dict with opening (balance before date_from), carried (balance before the
+    first row of this page), rows and next_cursor (None on the last page).
+    """
+    opening = opening_balance(customer_id, date_from)
+    after = None
+    carried = opening
+    if cursor:
+        after, carried = decode_cursor(cursor, customer_id, date_from, date_to)
+
+    fetched = list(statement_queryset(customer_id, date_from, date_to, after=after)[:limit + 1])
+    rows = [_statement_row(row, carried) for row in fetched[:limit]]
+
+    return {
+        'opening': opening,
+        'carried': carried,
+        'rows': rows,
+        'next_cursor': encode_cursor(rows[-1], customer_id, date_from, date_to) if len(fetched) > limit else None,
+    }
+
+
+def iter_statement(customer_id, date_from=None, date_to=None, chunk_size=2000):
+    """
+    Yield every statement row of the period in order, streaming from a server-side cursor
+    so long histories are never held in memory. The first value yielded is the opening balance.
+    """
+    opening = opening_balance(customer_id, date_from)
+    yield opening
+    for row in statement_queryset(customer_id, date_from, date_to).iterator(chunk_size=chunk_size):
+        yield _statement_row(row, opening)
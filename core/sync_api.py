@@ -0,0 +1,189 @@
+# API Views for offline-first delta sync of the mobile catalog
+# GET endpoint returning the rows of each entity changed since a per-entity cursor
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework import status
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from . import encoding
+from .agent_auth import agent_authentication_required
+from .models import CustomerVendor, Item, ItemsGroup, PriceList, PriceListDetail
+from .serializers import (
+    CustomerVendorSerializer, ItemSerializer, ItemsGroupSerializer, PriceListDetailSerializer, PriceListSerializer,
+)
+
+# Entity name -> (model, serializer, select_related)
+SYNC_ENTITIES = {
+    'items_groups': (ItemsGroup, ItemsGroupSerializer, ()),
+    'items': (Item, ItemSerializer, ('itemGroupId',)),
+    'price_lists': (PriceList, PriceListSerializer, ()),
+    'price_list_details': (PriceListDetail, PriceListDetailSerializer, ('priceList', 'item')),
+    'customers_vendors': (CustomerVendor, CustomerVendorSerializer, ()),
+}
+
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 5000
+
+# Rows saved shortly before a sync may commit after it; a caught-up cursor never passes
+# now - SYNC_LAG, so such rows are sent again (clients apply rows as idempotent upserts)
+SYNC_LAG = timedelta(minutes=2)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(updated_at, row_id):
+    """Cursor for the position after a row: '<updatedAt in epoch microseconds>.<id>'."""
+    delta = updated_at - EPOCH
+    microseconds = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f'{microseconds}.{row_id}'
+
+
+def decode_cursor(cursor):
+    """(updatedAt, id) from a cursor; raises ValueError for a malformed one."""
+    microseconds, row_id = cursor.split('.')
+    return EPOCH + timedelta(microseconds=int(microseconds)), int(row_id)
+
+
+def changes(model, select_related, since, limit):
+    """
+    Rows of `model` changed after the `since` position ((updatedAt, id) or None for everything),
+    oldest change first: (rows, has_more). Uses the (updatedAt, id) index.
+    """
+    queryset = model.objects.select_related(*select_related).order_by('updatedAt', 'id')
+    if since is not None:
+        updated_at, row_id = since
+        queryset = queryset.filter(Q(updatedAt__gt=updated_at) | Q(updatedAt=updated_at, id__gt=row_id))
+    rows = list(queryset[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def entity_delta(name, since, limit, request, now):
+    """One entity's part of the sync response."""
+    model, serializer_class, select_related = SYNC_ENTITIES[name]
+    rows, has_more = changes(model, select_related, since, limit)
+
+    live_rows = [row for row in rows if not row.isDeleted]
+    deleted = [row.id for row in rows if row.isDeleted]
+
+    last = (rows[-1].updatedAt, rows[-1].id) if rows else since
+    if has_more:
+        cursor = last
+    else:
+        # Caught up: stop short of rows that may still be committing
+        lag_position = (now - SYNC_LAG, 0)
+        cursor = min(last, lag_position) if last else lag_position
+        if since is not None:
+            cursor = max(cursor, since)
+
+    return {
+        'rows': encoding.layout(request, serializer_class(live_rows, many=True, context={'request': request}).data),
+        'deleted': deleted,
+        'cursor': encode_cursor(*cursor),
+        'has_more': has_more,
+    }
+
+
+@extend_schema(
+    summary="Delta sync of the mobile catalog",
+    description="""Return only the catalog rows changed since the app's last sync.
+
+    **Entities**: items_groups, items, price_lists, price_list_details, customers_vendors
+
+    **Parameters**:
+    - `entities`: comma separated entities to sync (default: all)
+    - `since_<entity>`: cursor returned for that entity by the previous sync (omit for a full download)
+    - `limit`: most rows per entity in one response (default 1000, max 5000)
+    - `layout=columnar`: send each entity's rows as {"columns": [...], "rows": [[...], ...]}
+
+    **Per entity response**:
+    - `rows`: changed rows, same fields as the list endpoints
+    - `deleted`: ids of soft-deleted rows (tombstones) to remove locally
+    - `cursor`: pass back as `since_<entity>` on the next sync
+    - `has_more`: call again with the new cursor until false
+
+    Rows may be sent more than once; apply them as upserts by id.""",
+    parameters=[
+        OpenApiParameter(name='entities', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                        description='Comma separated entities (default: all)'),
+        OpenApiParameter(name='since_items', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                        description='Cursor of the previous items sync (same pattern for every entity)'),
+        OpenApiParameter(name='limit', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY,
+                        description='Most rows per entity (default 1000, max 5000)'),
+        encoding.LAYOUT_PARAMETER,
+    ],
+    responses={
+        200: {
+            'type': 'object',
+            'properties': {
+                'success': {'type': 'boolean'},
+                'server_time': {'type': 'string', 'format': 'date-time'},
+                'data': {
+                    'type': 'object',
+                    'additionalProperties': {
+                        'type': 'object',
+                        'properties': {
+                            'rows': {'type': 'array', 'items': {'type': 'object'}},
+                            'deleted': {'type': 'array', 'items': {'type': 'integer'}},
+                            'cursor': {'type': 'string', 'example': '1760869800000000.42'},
+                            'has_more': {'type': 'boolean'},
+                        }
+                    }
+                }
+            }
+        },
+        400: {'description': 'Unknown entity, bad cursor or bad limit'},
+        401: {'description': 'Agent authentication required'}
+    }
+)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@agent_authentication_required
+def sync_catalog(request):
+    """Delta sync of items, price lists and customers for the mobile app."""
+    entities = request.GET.get('entities')
+    names = [name.strip() for name in entities.split(',') if name.strip()] if entities else list(SYNC_ENTITIES)
+    unknown = [name for name in names if name not in SYNC_ENTITIES]
+    if unknown:
+        return Response({
+            'success': False,
+            'error': 'VALIDATION_ERROR',
+            'message': f'Unknown entities: {", ".join(unknown)}. Available: {", ".join(SYNC_ENTITIES)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': 'VALIDATION_ERROR',
+            'message': f'limit must be between 1 and {MAX_LIMIT}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    cursors = {}
+    for name in names:
+        value = request.GET.get(f'since_{name}')
+        try:
+            cursors[name] = decode_cursor(value) if value else None
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'INVALID_CURSOR',
+                'message': f'Invalid cursor for {name}; sync it again without since_{name}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    now = timezone.now()
+    return Response({
+        'success': True,
+        'server_time': now,
+        'data': {name: entity_delta(name, cursors[name], limit, request, now) for name in names},
+    }, status=status.HTTP_200_OK)
@@ -0,0 +1,328 @@
+"""
+Synthetic datasets for benchmarking.
+Generates reproducible customers, items, stores, agents, invoices with lines and posting
+transactions, vouchers and visits at a configurable size. Rows are bulk inserted and
+back-dated over a range of days, then the derived tables (daily account balances and
+sales facts) are rebuilt once, so the data looks like years of normal use.
+"""
+
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction as db_transaction
+from django.utils import timezone
+
+from . import accounts, counters, facts, ledger, locations, plans, report_cache
+from .constants import (
+    INVOICE_TYPE_PURCHASES, INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_PURCHASES, INVOICE_TYPE_RETURN_SALES,
+    PAYMENT_TYPE_CASH, PAYMENT_TYPE_VISA, PAYMENT_TYPE_PARTIAL_DEFERRED,
+    STATUS_PAID, STATUS_UNPAID, STATUS_PARTIALLY_PAID,
+    TRANSACTION_TYPE_PURCHASE, TRANSACTION_TYPE_SALES, TRANSACTION_TYPE_RETURN_PURCHASE,
+    TRANSACTION_TYPE_RETURN_SALES, VISIT_TRANSACTION_TYPE_SALES, VISIT_TRANSACTION_TYPE_RETURN_SALES,
+    VISIT_TRANSACTION_TYPE_RECEIVE_VOUCHER, VISIT_TRANSACTION_TYPE_NEGATIVE_VISIT,
+)
+from .models import (
+    Account, Agent, CustomerVendor, InvoiceDetail, InvoiceMaster, Item, ItemsGroup, Store, StoreGroup,
+    Transaction, Visit, VisitPlan,
+)
+
+# Credentials of the generated user and agents, used by the benchmark harness
+BENCHMARK_USERNAME = 'benchmark'
+BENCHMARK_PASSWORD = 'benchmark'
+AGENT_USERNAME_PREFIX = 'bench_agent_'
+
+SCALES = {
+    'small': {
+        'customers': 200, 'vendors': 20, 'items': 100, 'stores': 3, 'agents': 5,
+        'invoices': 5000, 'lines': 4, 'vouchers': 1000, 'visits': 5000, 'days': 180,
+    },
+    'medium': {
+        'customers': 2000, 'vendors': 100, 'items': 1000, 'stores': 10, 'agents': 30,
+        'invoices': 100000, 'lines': 5, 'vouchers': 20000, 'visits': 100000, 'days': 730,
+    },
+    'large': {
+        'customers': 10000, 'vendors': 300, 'items': 5000, 'stores': 30, 'agents': 100,
+        'invoices': 1000000, 'lines': 6, 'vouchers': 200000, 'visits': 1000000, 'days': 1095,
+    },
+}
+
+# Share of each invoice type among generated invoices
+INVOICE_TYPE_WEIGHTS = (
+    (INVOICE_TYPE_SALES, 70),
+    (INVOICE_TYPE_RETURN_SALES, 8),
+    (INVOICE_TYPE_PURCHASES, 18),
+    (INVOICE_TYPE_RETURN_PURCHASES, 4),
+)
+DEFERRED_TRANSACTION_TYPES = {
+    INVOICE_TYPE_PURCHASES: TRANSACTION_TYPE_PURCHASE,
+    INVOICE_TYPE_SALES: TRANSACTION_TYPE_SALES,
+    INVOICE_TYPE_RETURN_PURCHASES: TRANSACTION_TYPE_RETURN_PURCHASE,
+    INVOICE_TYPE_RETURN_SALES: TRANSACTION_TYPE_RETURN_SALES,
+}
+# Sign of the deferred entry per invoice type, matching core.invoice_api
+DEFERRED_SIGNS = {
+    INVOICE_TYPE_PURCHASES: 1,
+    INVOICE_TYPE_SALES: -1,
+    INVOICE_TYPE_RETURN_PURCHASES: -1,
+    INVOICE_TYPE_RETURN_SALES: 1,
+}
+VISIT_TYPES = (
+    VISIT_TRANSACTION_TYPE_SALES, VISIT_TRANSACTION_TYPE_SALES, VISIT_TRANSACTION_TYPE_SALES,
+    VISIT_TRANSACTION_TYPE_RETURN_SALES, VISIT_TRANSACTION_TYPE_RECEIVE_VOUCHER,
+    VISIT_TRANSACTION_TYPE_NEGATIVE_VISIT,
+)
+
+BATCH_SIZE = 2000
+CENT = Decimal('0.01')
+
+
+def _spread(total, days, rng):
+    """Split `total` rows over `days` days with some day-to-day variation."""
+    weights = [rng.uniform(0.5, 1.5) for _ in range(days)]
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    for index in rng.sample(range(days), total - sum(counts)):
+        counts[index] += 1
+    return counts
+
+
+def _backdate(model, ids, created_at):
+    for start in range(0, len(ids), BATCH_SIZE):
+        model.objects.filter(id__in=ids[start:start + BATCH_SIZE]).update(createdAt=created_at, updatedAt=created_at)
+
+
+def _ensure_accounts():
+    """Create the well-known accounts under their configured IDs if they are missing."""
+    created = False
+    for key, account_id in accounts.configured_ids().items():
+        _, was_created = Account.objects.get_or_create(id=account_id, defaults={'accountName': key.title()})
+        created = created or was_created
+    if created:
+        # Explicit IDs do not advance the sequence; keep later inserts from colliding
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Account]):
+                cursor.execute(sql)
+        accounts.invalidate()
+
+
+def _master_data(sizes, rng, user, log):
+    item_group = ItemsGroup.objects.create(itemsGroupName='مجموعة تجريبية', createdBy=user)
+    items = Item.objects.bulk_create(
+        [Item(itemName=f'صنف تجريبي {n}', itemGroupId=item_group, mainUnitName='قطعة', createdBy=user)
+         for n in range(1, sizes['items'] + 1)],
+        batch_size=BATCH_SIZE,
+    )
+    store_group = StoreGroup.objects.create(storeGroupName='مخازن تجريبية', createdBy=user)
+    stores = Store.objects.bulk_create(
+        [Store(storeName=f'مخزن تجريبي {n}', storeGroup=store_group, createdBy=user)
+         for n in range(1, sizes['stores'] + 1)]
+    )
+    password = make_password(BENCHMARK_PASSWORD)  # One hash for every agent; hashing is slow on purpose
+    agents = Agent.objects.bulk_create(
+        [Agent(agentName=f'مندوب تجريبي {n}', agentUsername=f'{AGENT_USERNAME_PREFIX}{n}', agentPassword=password,
+               storeID=stores[(n - 1) % len(stores)], createdBy=user)
+         for n in range(1, sizes['agents'] + 1)]
+    )
+    customers = CustomerVendor.objects.bulk_create(
+        [CustomerVendor(customerVendorName=f'عميل تجريبي {n}', type=1, phone_one=f'010{n:08d}', createdBy=user)
+         for n in range(1, sizes['customers'] + 1)],
+        batch_size=BATCH_SIZE,
+    )
+    vendors = CustomerVendor.objects.bulk_create(
+        [CustomerVendor(customerVendorName=f'مورد تجريبي {n}', type=2, createdBy=user)
+         for n in range(1, sizes['vendors'] + 1)],
+        batch_size=BATCH_SIZE,
+    )
+    log(f'{len(items)} items, {len(stores)} stores, {len(agents)} agents, '
+        f'{len(customers)} customers, {len(vendors)} vendors')
+
+    # Each agent visits an even share of the customers
+    today = timezone.localdate()
+    share = max(len(customers) // len(agents), 1)
+    VisitPlan.objects.bulk_create([
+        VisitPlan(
+            agentID=agent,
+            dateFrom=today - timedelta(days=30),
+            dateTo=today + timedelta(days=30),
+            customers=[c.id for c in customers[index * share:(index + 1) * share]],
+            isActive=True,
+            createdBy=user,
+        )
+        for index, agent in enumerate(agents)
+    ])
+    prices = {item.id: Decimal(rng.randint(500, 50000)) / 100 for item in items}
+    return items, stores, agents, customers, vendors, prices
+
+
+def _day_invoices(count, created_at, master, rng, sizes, user):
+    """Invoices, lines and posting transactions of one day."""
+    items, stores, agents, customers, vendors, prices = master
+    cash_accounts = {
+        PAYMENT_TYPE_CASH: accounts.get_id(accounts.CASH),
+        PAYMENT_TYPE_VISA: accounts.get_id(accounts.VISA),
+    }
+    types = [invoice_type for invoice_type, _ in INVOICE_TYPE_WEIGHTS]
+    weights = [weight for _, weight in INVOICE_TYPE_WEIGHTS]
+
+    invoices, lines = [], []
+    for _ in range(count):
+        invoice_type = rng.choices(types, weights)[0]
+        is_sale = invoice_type in (INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_SALES)
+        agent = rng.choice(agents)
+        invoice = InvoiceMaster(
+            invoiceType=invoice_type,
+            customerOrVendorID=rng.choice(customers if is_sale else vendors),
+            storeID=agent.storeID if is_sale else rng.choice(stores),
+            agentID=agent if is_sale else None,
+            paymentType=rng.choice((PAYMENT_TYPE_CASH, PAYMENT_TYPE_CASH, PAYMENT_TYPE_VISA,
+                                    PAYMENT_TYPE_PARTIAL_DEFERRED)),
+            createdBy=user,
+        )
+        invoice_lines = []
+        for item in rng.sample(items, min(max(1, int(rng.expovariate(1 / sizes['lines']))), len(items))):
+            invoice_lines.append(InvoiceDetail(
+                invoiceMasterID=invoice,
+                item=item,
+                storeID=invoice.storeID,
+                quantity=Decimal(rng.randint(1, 24)),
+                price=prices[item.id],
+                createdBy=user,
+            ))
+        invoice.netTotal = sum(line.quantity * line.price for line in invoice_lines)
+        if invoice.paymentType == PAYMENT_TYPE_PARTIAL_DEFERRED:
+            invoice.status = rng.choice((STATUS_UNPAID, STATUS_PARTIALLY_PAID))
+            invoice.totalPaid = (invoice.netTotal * Decimal(rng.randint(10, 90)) / 100).quantize(CENT) \
+                if invoice.status == STATUS_PARTIALLY_PAID else Decimal('0')
+        else:
+            invoice.status = STATUS_PAID
+            invoice.totalPaid = invoice.netTotal
+        invoices.append(invoice)
+        lines.extend(invoice_lines)
+
+    InvoiceMaster.objects.bulk_create(invoices, batch_size=BATCH_SIZE)
+    InvoiceDetail.objects.bulk_create(lines, batch_size=BATCH_SIZE)
+
+    deferred_keys = {
+        True: accounts.get_id(accounts.CUSTOMERS_DEFERRED),
+        False: accounts.get_id(accounts.VENDORS_DEFERRED),
+    }
+    transactions = []
+    for invoice in invoices:
+        is_sale = invoice.invoiceType in (INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_SALES)
+        sign = DEFERRED_SIGNS[invoice.invoiceType]
+        transactions.append(Transaction(
+            invoiceID=invoice, accountID_id=deferred_keys[is_sale], customerVendorID=invoice.customerOrVendorID,
+            amount=sign * invoice.netTotal, type=DEFERRED_TRANSACTION_TYPES[invoice.invoiceType],
+            agentID=invoice.agentID, createdBy=user,
+        ))
+        if invoice.totalPaid:
+            transactions.append(Transaction(
+                invoiceID=invoice,
+                accountID_id=cash_accounts.get(invoice.paymentType, cash_accounts[PAYMENT_TYPE_CASH]),
+                customerVendorID=invoice.customerOrVendorID,
+                # Money comes in for sales and purchase returns and goes out otherwise
+                amount=-sign * invoice.totalPaid, type=1 if sign < 0 else 2,
+                agentID=invoice.agentID, createdBy=user,
+            ))
+    Transaction.objects.bulk_create(transactions, batch_size=BATCH_SIZE)
+
+    _backdate(InvoiceMaster, [invoice.id for invoice in invoices], created_at)
+    _backdate(InvoiceDetail, [line.id for line in lines], created_at)
+    _backdate(Transaction, [t.id for t in transactions], created_at)
+    return len(invoices), len(lines), len(transactions)
+
+
+def _day_vouchers(count, created_at, master, rng, user):
+    """Standalone receipt vouchers: customer credit plus cash debit, as create_voucher posts them."""
+    _, _, agents, customers, _, _ = master
+    cash_id = accounts.get_id(accounts.CASH)
+    deferred_id = accounts.get_id(accounts.CUSTOMERS_DEFERRED)
+    transactions = []
+    for _ in range(count):
+        customer = rng.choice(customers)
+        agent = rng.choice(agents)
+        amount = Decimal(rng.randint(1000, 500000)) / 100
+        transactions.append(Transaction(accountID_id=cash_id, customerVendorID=customer, agentID=agent,
+                                        amount=amount, type=1, notes='سند قبض تجريبي', createdBy=user))
+        transactions.append(Transaction(accountID_id=deferred_id, customerVendorID=customer, agentID=agent,
+                                        amount=-amount, type=1, notes='سند قبض تجريبي', createdBy=user))
+    Transaction.objects.bulk_create(transactions, batch_size=BATCH_SIZE)
+    _backdate(Transaction, [t.id for t in transactions], created_at)
+    return len(transactions)
+
+
+def _day_visits(count, created_at, master, rng, user):
+    _, _, agents, customers, _, _ = master
+    visits = [
+        Visit(
+            agentID=rng.choice(agents),
+            customerVendor=rng.choice(customers),
+            transType=rng.choice(VISIT_TYPES),
+            date=created_at + timedelta(minutes=rng.randint(0, 480)),
+            latitude=Decimal(rng.uniform(29.9, 31.3)).quantize(Decimal('0.0000001')),
+            longitude=Decimal(rng.uniform(30.9, 31.6)).quantize(Decimal('0.0000001')),
+            createdBy=user,
+        )
+        for _ in range(count)
+    ]
+    Visit.objects.bulk_create(visits, batch_size=BATCH_SIZE)
+    _backdate(Visit, [visit.id for visit in visits], created_at)
+    return len(visits)
+
+
+def benchmark_user():
+    """The superuser the benchmark harness logs in as (created if missing)."""
+    user = User.objects.filter(username=BENCHMARK_USERNAME).first()
+    if user is None:
+        user = User.objects.create_superuser(BENCHMARK_USERNAME, '', BENCHMARK_PASSWORD)
+    return user
+
+
+def generate(sizes, seed=1, log=print):
+    """
+    Insert a synthetic dataset of the given sizes (see SCALES for the keys).
+    The same sizes and seed always produce the same rows. Returns a dict of row counts.
+    """
+    rng = random.Random(seed)
+    user = benchmark_user()
+    _ensure_accounts()
+
+    with db_transaction.atomic():
+        master = _master_data(sizes, rng, user, log)
+
+    days = sizes['days']
+    today = timezone.localdate()
+    per_day = zip(
+        _spread(sizes['invoices'], days, rng),
+        _spread(sizes['vouchers'], days, rng),
+        _spread(sizes['visits'], days, rng),
+    )
+    counts = {'invoices': 0, 'lines': 0, 'transactions': 0, 'visits': 0}
+    for offset, (invoice_count, voucher_count, visit_count) in enumerate(per_day):
+        day = today - timedelta(days=days - offset)
+        created_at = ledger.day_bounds(day)[0] + timedelta(hours=9, minutes=rng.randint(0, 600))
+        with db_transaction.atomic():
+            invoices, lines, transactions = _day_invoices(invoice_count, created_at, master, rng, sizes, user)
+            transactions += _day_vouchers(voucher_count, created_at, master, rng, user)
+            visits = _day_visits(visit_count, created_at, master, rng, user)
+        counts['invoices'] += invoices
+        counts['lines'] += lines
+        counts['transactions'] += transactions
+        counts['visits'] += visits
+        if (offset + 1) % 30 == 0 or offset + 1 == days:
+            log(f'{day}: {counts["invoices"]} invoices, {counts["lines"]} lines, '
+                f'{counts["transactions"]} transactions, {counts["visits"]} visits')
+
+    # Bulk inserts skip the signals that keep the derived tables current
+    log('Rebuilding daily account balances, sales facts, customer locations and dashboard counters')
+    ledger.rebuild_account_daily_balances()
+    facts.refresh_sales_facts(full=True)
+    locations.refresh_customer_locations(full=True)
+    counters.reconcile()
+    report_cache.bump_data_version()
+    plans.bump_version()
+    return counts
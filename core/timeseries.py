@@ -0,0 +1,155 @@
+"""
+Sales time series.
+Sales and sales returns (from the daily sales facts) and cash receipts and payments (movements
+of the cash and bank accounts) bucketed by day, week or month with date_trunc in the database,
+in local time. Each bucket is cached on its own: buckets that ended before today are kept
+without expiry under the report cache history version, the bucket holding today is always
+recomputed.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.db.models import Sum, F, Q, Value, DateField
+from django.db.models.functions import Coalesce, Trunc
+from django.utils import timezone
+
+from . import accounts, report_cache
+from .constants import INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_SALES
+from .models import SalesFact, Transaction
+from .partitioning import add_months, created_in_range
+
+ZERO = Decimal('0')
+BUCKETS = ('day', 'week', 'month')
+SERIES = ('sales', 'returns', 'receipts', 'payments')
+
+# Most buckets one call may return (two years of days)
+MAX_POINTS = 732
+
+
+def bucket_start(day, bucket):
+    """First day of the bucket holding `day`; weeks start on Monday like date_trunc('week')."""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start, bucket):
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    if bucket == 'month':
+        return add_months(start, 1)
+    return start + timedelta(days=1)
+
+
+def bucket_starts(date_from, date_to, bucket):
+    """Start days of every bucket overlapping [date_from, date_to], oldest first."""
+    starts = []
+    start = bucket_start(date_from, bucket)
+    while start <= date_to:
+        starts.append(start)
+        start = next_bucket(start, bucket)
+    return starts
+
+
+def _empty_point():
+    return {name: ZERO for name in SERIES}
+
+
+def compute(bucket, date_from, date_to, store_id=None, agent_id=None, customer_id=None):
+    """
+    Totals per bucket between two local days (inclusive) in two grouped queries:
+    {bucket start: {'sales', 'returns', 'receipts', 'payments'}}. Buckets without activity are
+    left out. Receipts and payments are the debits and credits of the cash and bank accounts;
+    vouchers carry no store, so with store_id only invoice payments of that store count.
+    """
+    points = {}
+
+    facts = SalesFact.objects.filter(
+        day__gte=date_from,
+        day__lte=date_to,
+        invoiceType__in=[INVOICE_TYPE_SALES, INVOICE_TYPE_RETURN_SALES],
+    )
+    cash = Transaction.objects.filter(
+        created_in_range(date_from, date_to),
+        accountID_id__in=accounts.cash_bank_ids(),
+        isDeleted=False,
+    )
+    if store_id:
+        facts = facts.filter(storeID_id=store_id)
+        cash = cash.filter(invoiceID__storeID_id=store_id)
+    if agent_id:
+        facts = facts.filter(agentID_id=agent_id)
+        cash = cash.filter(agentID_id=agent_id)
+    if customer_id:
+        facts = facts.filter(customerVendorID_id=customer_id)
+        cash = cash.filter(customerVendorID_id=customer_id)
+
+    # Fact days are already local days; transactions are truncated in the local time zone
+    fact_bucket = F('day') if bucket == 'day' else Trunc('day', bucket, output_field=DateField())
+    cash_bucket = Trunc('createdAt', bucket, output_field=DateField(), tzinfo=timezone.get_current_timezone())
+
+    fact_rows = facts.annotate(bucket=fact_bucket).values('bucket').annotate(
+        sales=Coalesce(Sum('amount', filter=Q(invoiceType=INVOICE_TYPE_SALES)), Value(ZERO)),
+        returns=Coalesce(Sum('amount', filter=Q(invoiceType=INVOICE_TYPE_RETURN_SALES)), Value(ZERO)),
+    ).order_by()
+    for row in fact_rows:
+        point = points.setdefault(row['bucket'], _empty_point())
+        point['sales'] = row['sales']
+        point['returns'] = row['returns']
+
+    cash_rows = cash.annotate(bucket=cash_bucket).values('bucket').annotate(
+        receipts=Coalesce(Sum('amount', filter=Q(amount__gt=0)), Value(ZERO)),
+        payments=Coalesce(Sum('amount', filter=Q(amount__lt=0)), Value(ZERO)),
+    ).order_by()
+    for row in cash_rows:
+        point = points.setdefault(row['bucket'], _empty_point())
+        point['receipts'] = row['receipts']
+        point['payments'] = -row['payments']
+
+    return points
+
+
+def series(bucket='day', date_from=None, date_to=None, store_id=None, agent_id=None, customer_id=None):
+    """
+    One point per bucket overlapping [date_from, date_to] (default: the last 30 days), oldest
+    first; partial buckets at either end cover their whole week or month. Each point is
+    {'bucket': start day, 'sales', 'returns', 'receipts', 'payments'}.
+    Cached closed buckets are read in one round trip; the rest are computed in one pass.
+    Raises ValueError for an unknown bucket, a reversed range or more than MAX_POINTS buckets.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f'bucket must be one of: {", ".join(BUCKETS)}')
+    today = timezone.localdate()
+    date_to = date_to or today
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to:
+        raise ValueError('date_from must not be after date_to')
+    starts = bucket_starts(date_from, date_to, bucket)
+    if len(starts) > MAX_POINTS:
+        raise ValueError(f'At most {MAX_POINTS} buckets can be requested at once')
+
+    filters = {'store_id': store_id, 'agent_id': agent_id, 'customer_id': customer_id}
+    version = report_cache.history_version()
+    keys = {
+        start: report_cache.cache_key(f'timeseries_{bucket}', dict(filters, start=start), version=version)
+        for start in starts
+        if next_bucket(start, bucket) <= today
+    }
+    cache = caches[report_cache.CACHE_ALIAS]
+    cached = cache.get_many(list(keys.values()))
+    points = {start: cached[key] for start, key in keys.items() if key in cached}
+
+    missing = [start for start in starts if start not in points]
+    if missing:
+        computed = compute(
+            bucket, missing[0], next_bucket(missing[-1], bucket) - timedelta(days=1), **filters
+        )
+        for start in missing:
+            points[start] = computed.get(start) or _empty_point()
+        cache.set_many({keys[start]: points[start] for start in missing if start in keys}, None)
+
+    return [dict(points[start], bucket=start) for start in starts]
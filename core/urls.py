@@ -1,6 +1,7 @@
 from django.urls import path, include
 from . import views
 from . import invoice_api
+from . import sync_api
 
 # URLConf
 app_name = 'core'
@@ -144,12 +145,14 @@ urlpatterns = [
     path('api/agents/login/', views.agent_login, name='agent_login'),
     path('api/agents/logout/', views.agent_logout, name='agent_logout'),
     path('api/agents/verify-token/', views.agent_verify_token, name='agent_verify_token'),
+    path('api/agents/token/refresh/', views.agent_refresh_token, name='agent_refresh_token'),
     
     # Store Authentication URLs (API)
     path('api/stores/login/', views.store_login, name='store_login'),
     path('api/stores/agents/', views.store_agents, name='store_agents'),
     path('api/stores/stock/', views.store_stock, name='store_stock'),
     path('api/stores/update-stock/', views.store_update_stock, name='store_update_stock'),
+    path('api/stores/auth-cache/metrics/', views.store_auth_cache_metrics, name='store_auth_cache_metrics'),
     
     # Voucher URLs (API for agents)
     path('api/vouchers/', views.create_voucher, name='create_voucher'),
@@ -169,6 +172,7 @@ urlpatterns = [
     path('api/visits/list/', views.agent_visits_list, name='agent_visits_list'),
     path('api/visits/agent/<int:agent_id>/', views.agent_visits_list, name='agent_visits_by_id'),
     path('api/visits/negative/', views.get_negative_visits, name='get_negative_visits'),
+    path('api/visits/negative/all/', views.negative_visits_report, name='negative_visits_report'),
     
     # VisitPlan API URLs
     path('api/visit-plans/', views.visitplan_list, name='visitplan_list'),
@@ -181,6 +185,7 @@ urlpatterns = [
     path('api/agents/visit-plans/current/', views.agent_current_visitplan, name='agent_current_visitplan'),
     path('api/agents/visit-plans/list/', views.agent_visitplans_list, name='agent_visitplans_list'),
     path('api/agents/visit-plans/active-with-customers/', views.agent_active_plan_with_customers, name='agent_active_plan_with_customers'),
+    path('api/agents/customers/nearby/', views.nearby_customers, name='nearby_customers'),
     
     # Agent Stock URL (API for mobile app)
     path('api/agents/stock/', views.agent_stock, name='agent_stock'),
@@ -188,6 +193,15 @@ urlpatterns = [
     # Agent Cash Balance URL (API for mobile app)
     path('api/agents/cash_balance/', views.agent_cash_balance, name='agent_cash_balance'),
     
+    # Delta sync of the catalog (API for mobile app)
+    path('api/sync/', sync_api.sync_catalog, name='sync_catalog'),
+    
     # Helper API for customers (used by visits)
     path('api/customers/', views.customers_api_list, name='customers_api_list'),
+    
+    # Sales time series for dashboard charts
+    path('api/reports/timeseries/', views.sales_timeseries_api, name='sales_timeseries_api'),
+    
+    # Customer statement API (Agent Authentication Required)
+    path('api/customers/<int:customer_id>/statement/', views.customer_statement_api, name='customer_statement_api'),
 ]
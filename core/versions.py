@@ -0,0 +1,50 @@
+"""
+Shared data versions.
+A version names the current state of some data (report inputs, past days, visit plans, ...):
+caches key their entries on it and ETags hash it, so bumping it makes every dependent entry
+stale at once. Versions are kept in the 'versions' cache, shared by every worker and apart from
+the result caches, so culling results never evicts them.
+A version is an opaque token, not a counter: every bump stores a token that was never used
+before, and a missing key (first use, eviction, cache cleared) is seeded with a new one too.
+Neither an eviction nor two workers bumping at once can bring back a version a reader has
+already cached results under.
+"""
+
+import secrets
+import time
+from functools import partial
+
+from django.core.cache import caches
+from django.db import transaction as db_transaction
+
+CACHE_ALIAS = 'versions'
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def new_token():
+    """A version token no other bump has produced: the time in ns plus random bits."""
+    return f'{time.time_ns():x}{secrets.token_hex(4)}'
+
+
+def get(name):
+    """Current version of `name`, seeded with a new token when the cache has none."""
+    cache = _cache()
+    version = cache.get(name)
+    if version is None:
+        cache.add(name, new_token(), None)
+        # Another worker may have seeded it first
+        version = cache.get(name) or new_token()
+    return version
+
+
+def bump(name):
+    """Make everything cached under the current version of `name` stale."""
+    _cache().set(name, new_token(), None)
+
+
+def bump_on_commit(name):
+    """bump(name) once the current database transaction commits."""
+    db_transaction.on_commit(partial(bump, name))
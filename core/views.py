@@ -16,17 +16,20 @@ from decimal import Decimal
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 import logging
-import base64
 from functools import wraps
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 from .models import *
 from .serializers import *
+from . import accounts, agent_auth, credential_cache, encoding, etags, locations, periods, plans, visits
+from .agent_auth import agent_authentication_required
+from .partitioning import created_in_range
+from .ledger import day_bounds
 
 # Import agent transactions API from authentication
 from authentication.views import agent_transactions_filtered_api as agent_transactions_api
@@ -63,20 +66,23 @@ def itemsgroup_detail(request, id):
 # Item Views
 @extend_schema(
     summary="List all items",
-    description="Retrieve a list of all items with optional filtering by group"
+    description="Retrieve a list of all items with optional filtering by group",
+    parameters=[encoding.LAYOUT_PARAMETER]
 )
 @api_view(['GET'])
+@etags.conditional(etags.item_list_version, private=True, max_age=300)
 def item_list(request):
     """Get all items"""
     queryset = Item.objects.filter(isDeleted=False).select_related('itemGroupId')
     serializer = ItemSerializer(queryset, many=True, context={'request': request})
-    return Response(serializer.data)
+    return Response(encoding.layout(request, serializer.data))
 
 @extend_schema(
     summary="List items by group",
     description="Retrieve items for a specific group",
     parameters=[
-        OpenApiParameter(name='group_id', type=OpenApiTypes.INT, location=OpenApiParameter.PATH, description='Items Group ID')
+        OpenApiParameter(name='group_id', type=OpenApiTypes.INT, location=OpenApiParameter.PATH, description='Items Group ID'),
+        encoding.LAYOUT_PARAMETER,
     ]
 )
 @api_view(['GET'])
@@ -85,7 +91,7 @@ def item_by_group(request, group_id):
     try:
         queryset = Item.objects.filter(itemGroupId=group_id, isDeleted=False).select_related('itemGroupId')
         serializer = ItemSerializer(queryset, many=True, context={'request': request})
-        return Response(serializer.data)
+        return Response(encoding.layout(request, serializer.data))
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -138,29 +144,32 @@ def pricelist_detail(request, id):
 # PriceListDetail Views
 @extend_schema(
     summary="List all price list details",
-    description="Retrieve a list of all price list details"
+    description="Retrieve a list of all price list details",
+    parameters=[encoding.LAYOUT_PARAMETER]
 )
 @api_view(['GET'])
 def pricelistdetail_list(request):
     """Get all price list details"""
     queryset = PriceListDetail.objects.filter(isDeleted=False).select_related('priceList', 'item')
     serializer = PriceListDetailSerializer(queryset, many=True, context={'request': request})
-    return Response(serializer.data)
+    return Response(encoding.layout(request, serializer.data))
 
 @extend_schema(
     summary="List price list details by price list",
     description="Retrieve price list details for a specific price list",
     parameters=[
-        OpenApiParameter(name='pricelist_id', type=OpenApiTypes.INT, location=OpenApiParameter.PATH, description='Price List ID')
+        OpenApiParameter(name='pricelist_id', type=OpenApiTypes.INT, location=OpenApiParameter.PATH, description='Price List ID'),
+        encoding.LAYOUT_PARAMETER,
     ]
 )
 @api_view(['GET'])
+@etags.conditional(etags.pricelist_details_version, private=True, max_age=300)
 def pricelistdetail_by_pricelist(request, pricelist_id):
     """Get price list details filtered by price list"""
     try:
         queryset = PriceListDetail.objects.filter(priceList=pricelist_id, isDeleted=False).select_related('priceList', 'item')
         serializer = PriceListDetailSerializer(queryset, many=True, context={'request': request})
-        return Response(serializer.data)
+        return Response(encoding.layout(request, serializer.data))
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -270,6 +279,7 @@ def customervendor_detail(request, id):
 @api_view(['GET'])
 @authentication_classes([])  # Disable DRF authentication
 @permission_classes([AllowAny])  # Allow any user
+@etags.conditional(etags.customers_version, private=True, max_age=60)
 def customers_api_list(request):
     """Get simple list of customers for dropdowns"""
     try:
@@ -433,7 +443,8 @@ def invoicedetail_detail(request, id):
         OpenApiParameter(name='item_id', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY,
                         description='Filter by specific item ID'),
         OpenApiParameter(name='store_id', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY,
-                        description='Filter by specific store ID')
+                        description='Filter by specific store ID'),
+        encoding.LAYOUT_PARAMETER,
     ]
 )
 @api_view(['GET'])
@@ -478,7 +489,9 @@ def item_stock(request):
                     'is_deleted': item.isDeleted
                 })
         
-        return Response(stock_data)
+        return Response(encoding.layout(
+            request, stock_data, columns=['item_id', 'item_name', 'store_id', 'store_name', 'stock', 'is_deleted']
+        ))
         
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -2617,10 +2630,8 @@ def invoices_purchase_view(request):
         )
     
     # Apply date filters
-    if date_from:
-        queryset = queryset.filter(createdAt__date__gte=date_from)
-    if date_to:
-        queryset = queryset.filter(createdAt__date__lte=date_to)
+    if date_from or date_to:
+        queryset = queryset.filter(created_in_range(date_from, date_to))
     
     # Apply created by filter
     if created_by_filter:
@@ -2686,10 +2697,8 @@ def invoices_sales_view(request):
         )
     
     # Apply date filters
-    if date_from:
-        queryset = queryset.filter(createdAt__date__gte=date_from)
-    if date_to:
-        queryset = queryset.filter(createdAt__date__lte=date_to)
+    if date_from or date_to:
+        queryset = queryset.filter(created_in_range(date_from, date_to))
     
     # Apply created by filter
     if created_by_filter:
@@ -2756,10 +2765,8 @@ def invoices_return_purchase_view(request):
         )
     
     # Apply date filters
-    if date_from:
-        queryset = queryset.filter(createdAt__date__gte=date_from)
-    if date_to:
-        queryset = queryset.filter(createdAt__date__lte=date_to)
+    if date_from or date_to:
+        queryset = queryset.filter(created_in_range(date_from, date_to))
     
     # Apply created by filter
     if created_by_filter:
@@ -2826,10 +2833,8 @@ def invoices_return_sales_view(request):
         )
     
     # Apply date filters
-    if date_from:
-        queryset = queryset.filter(createdAt__date__gte=date_from)
-    if date_to:
-        queryset = queryset.filter(createdAt__date__lte=date_to)
+    if date_from or date_to:
+        queryset = queryset.filter(created_in_range(date_from, date_to))
     
     # Apply created by filter
     if created_by_filter:
@@ -3449,7 +3454,11 @@ def agent_delete(request, id):
                         'isActive': {'type': 'boolean'},
                     }
                 },
-                'token': {'type': 'string', 'description': 'Simple session token (agent ID)'}
+                'token': {'type': 'string', 'description': 'Access token (same as access_token, kept for older app versions)'},
+                'access_token': {'type': 'string', 'description': 'Signed access token; send as "Authorization: Bearer <token>"'},
+                'refresh_token': {'type': 'string', 'description': 'Signed refresh token for /api/agents/token/refresh/'},
+                'token_type': {'type': 'string', 'example': 'Bearer'},
+                'expires_in': {'type': 'integer', 'description': 'Access token lifetime in seconds'},
             }
         },
         400: {'description': 'Invalid credentials or inactive agent'},
@@ -3460,7 +3469,7 @@ def agent_delete(request, id):
 def agent_login(request):
     """
     Agent login endpoint for mobile app authentication.
-    Returns agent data and simple token for session management.
+    Returns agent data with signed access and refresh tokens (see core.agent_auth).
     """
     try:
         username = request.data.get('username')
@@ -3498,7 +3507,8 @@ def agent_login(request):
                 'message': 'Agent account is inactive'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Return success response with agent data
+        # Return success response with agent data and tokens
+        tokens = agent_auth.issue_tokens(agent)
         return Response({
             'success': True,
             'message': 'Login successful',
@@ -3509,7 +3519,8 @@ def agent_login(request):
                 'agentPhone': agent.agentPhone,
                 'isActive': agent.isActive,
             },
-            'token': str(agent.id)  # Simple token for mobile app sessions
+            'token': tokens['access_token'],
+            **tokens,
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -3611,18 +3622,13 @@ def agent_verify_token(request):
                 'message': 'Token is required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Try to get agent by ID (token is agent ID)
         try:
-            agent_id = int(token)
-            agent = Agent.objects.get(
-                id=agent_id,
-                isDeleted=False,
-                isActive=True
-            )
-        except (ValueError, Agent.DoesNotExist):
+            agent = agent_auth.verify_access_token(token)
+        except agent_auth.AgentAuthenticationError as error:
             return Response({
                 'success': False,
-                'message': 'Invalid token'
+                'error': error.code,
+                'message': error.message
             }, status=status.HTTP_401_UNAUTHORIZED)
         
         # Return agent information
@@ -3644,6 +3650,60 @@ def agent_verify_token(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@extend_schema(
+    summary="Refresh agent tokens",
+    description="Exchange a refresh token from agent login for a new access token and refresh token",
+    request={
+        'application/json': {
+            'type': 'object',
+            'properties': {
+                'refresh_token': {'type': 'string', 'description': 'Refresh token from agent login'},
+            },
+            'required': ['refresh_token']
+        }
+    },
+    responses={
+        200: {
+            'type': 'object',
+            'properties': {
+                'success': {'type': 'boolean'},
+                'access_token': {'type': 'string'},
+                'refresh_token': {'type': 'string'},
+                'token_type': {'type': 'string', 'example': 'Bearer'},
+                'expires_in': {'type': 'integer'},
+            }
+        },
+        401: {'description': 'Invalid or expired refresh token'},
+        403: {'description': 'Agent account is inactive'}
+    }
+)
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def agent_refresh_token(request):
+    """
+    Issue new agent tokens from a refresh token without checking the password again.
+    Fails once the agent is deactivated or deleted or has changed password.
+    """
+    refresh_token = request.data.get('refresh_token')
+    if not refresh_token:
+        return Response({
+            'success': False,
+            'error': 'VALIDATION_ERROR',
+            'message': 'refresh_token is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        agent = agent_auth.verify_refresh_token(refresh_token)
+    except agent_auth.AgentAuthenticationError as error:
+        return agent_auth.error_response(error)
+    
+    return Response({
+        'success': True,
+        **agent_auth.issue_tokens(agent),
+    }, status=status.HTTP_200_OK)
+
+
 # ==================== STORE AUTHENTICATION VIEWS ====================
 
 @extend_schema(
@@ -3791,6 +3851,7 @@ def basic_auth_required(view_func):
     """
     Decorator for HTTP Basic Authentication.
     Expects Authorization header with base64 encoded username:password
+    Verified credentials are cached per worker for a short time (see core.credential_cache)
     """
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
@@ -3804,35 +3865,19 @@ def basic_auth_required(view_func):
             response['WWW-Authenticate'] = 'Basic realm="Login Required"'
             return response
         
-        try:
-            # Decode base64 credentials
-            auth_decoded = base64.b64decode(auth_header[6:]).decode('utf-8')
-            username, password = auth_decoded.split(':', 1)
-            
-            # Authenticate user
-            try:
-                user = User.objects.get(username=username)
-                if not user.check_password(password) or not user.is_active:
-                    raise ValueError('Invalid credentials')
-            except (User.DoesNotExist, ValueError):
-                response = Response(
-                    {'error': 'Invalid credentials'},
-                    status=status.HTTP_401_UNAUTHORIZED
-                )
-                response['WWW-Authenticate'] = 'Basic realm="Login Required"'
-                return response
-            
-            # Attach user to request
-            request.authenticated_user = user
-            return view_func(request, *args, **kwargs)
-            
-        except Exception as e:
+        # Authenticate user
+        user = credential_cache.authenticate(auth_header)
+        if user is None:
             response = Response(
-                {'error': 'Authentication failed'},
+                {'error': 'Invalid credentials'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
             response['WWW-Authenticate'] = 'Basic realm="Login Required"'
             return response
+        
+        # Attach user to request
+        request.authenticated_user = user
+        return view_func(request, *args, **kwargs)
     
     return wrapper
 
@@ -3842,7 +3887,8 @@ def basic_auth_required(view_func):
     description="Retrieve stock levels for items filtered by store. Requires HTTP Basic Authentication.",
     parameters=[
         OpenApiParameter(name='storeID', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY, 
-                        description='Filter by store ID (optional, returns all if not provided)')
+                        description='Filter by store ID (optional, returns all if not provided)'),
+        encoding.LAYOUT_PARAMETER,
     ],
     responses={
         200: {
@@ -3861,6 +3907,7 @@ def basic_auth_required(view_func):
     }
 )
 @api_view(['GET'])
+@authentication_classes([credential_cache.CachedBasicAuthentication])
 @basic_auth_required
 def store_stock(request):
     """
@@ -3894,10 +3941,13 @@ def store_stock(request):
         with connection.cursor() as cursor:
             cursor.execute(sql, params)
             columns = [col[0] for col in cursor.description]
-            results = [
-                dict(zip(columns, row))
-                for row in cursor.fetchall()
-            ]
+            if encoding.wants_columnar(request):
+                results = {'columns': columns, 'rows': [list(row) for row in cursor.fetchall()]}
+            else:
+                results = [
+                    dict(zip(columns, row))
+                    for row in cursor.fetchall()
+                ]
         
         return Response({
             'success': True,
@@ -3911,6 +3961,43 @@ def store_stock(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@extend_schema(
+    summary="Store API credential cache metrics",
+    description="Hit/miss counters of the verified Basic Auth credential cache used by the store "
+                "integration endpoints. Counters belong to the worker process that answers (see pid).",
+    responses={
+        200: {
+            'type': 'object',
+            'properties': {
+                'success': {'type': 'boolean'},
+                'data': {
+                    'type': 'object',
+                    'properties': {
+                        'pid': {'type': 'integer'},
+                        'hits': {'type': 'integer'},
+                        'misses': {'type': 'integer'},
+                        'failures': {'type': 'integer'},
+                        'expired': {'type': 'integer'},
+                        'invalidations': {'type': 'integer'},
+                        'entries': {'type': 'integer'},
+                        'ttl_seconds': {'type': 'integer'},
+                        'hit_rate': {'type': 'number'},
+                    }
+                }
+            }
+        }
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def store_auth_cache_metrics(request):
+    """Verified-credential cache counters of this worker process."""
+    return Response({
+        'success': True,
+        'data': credential_cache.metrics(),
+    }, status=status.HTTP_200_OK)
+
+
 @extend_schema(
     summary="Update stock via invoices",
     description="Create invoices for stock updates without customer/vendor. Requires HTTP Basic Authentication.",
@@ -3974,6 +4061,7 @@ def store_stock(request):
     }
 )
 @api_view(['POST'])
+@authentication_classes([credential_cache.CachedBasicAuthentication])
 @basic_auth_required
 def store_update_stock(request):
     """
@@ -4123,8 +4211,7 @@ def store_update_stock(request):
 
 from functools import wraps
 from django.contrib.auth.hashers import check_password
-import base64
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
 
 def parse_datetime_with_timezone(date_string, user_timezone=None):
@@ -4163,56 +4250,6 @@ def parse_datetime_with_timezone(date_string, user_timezone=None):
     except:
         return timezone.now()
 
-def agent_authentication_required(view_func):
-    """
-    Decorator for agent authentication using HTTP Basic Auth.
-    Expects Authorization header with base64 encoded agentUsername:agentPassword
-    """
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
-        # Get Authorization header
-        auth_header = request.META.get('HTTP_AUTHORIZATION')
-        if not auth_header or not auth_header.startswith('Basic '):
-            return Response({
-                'success': False,
-                'error': 'AUTHENTICATION_REQUIRED',
-                'message': 'Agent authentication required. Use Basic Auth with agent credentials.'
-            }, status=status.HTTP_401_UNAUTHORIZED)
-        
-        try:
-            # Decode credentials
-            encoded_credentials = auth_header.split(' ')[1]
-            decoded_credentials = base64.b64decode(encoded_credentials).decode('utf-8')
-            username, password = decoded_credentials.split(':')
-            
-            # Find and authenticate agent
-            agent = Agent.objects.filter(
-                agentUsername=username, 
-                isDeleted=False,
-                isActive=True
-            ).first()
-            
-            if not agent or not agent.check_password(password):
-                return Response({
-                    'success': False,
-                    'error': 'INVALID_CREDENTIALS',
-                    'message': 'Invalid agent credentials'
-                }, status=status.HTTP_401_UNAUTHORIZED)
-            
-            # Add agent to request
-            request.agent = agent
-            return view_func(request, *args, **kwargs)
-            
-        except Exception as e:
-            return Response({
-                'success': False,
-                'error': 'AUTHENTICATION_ERROR',
-                'message': f'Authentication failed: {str(e)}'
-            }, status=status.HTTP_401_UNAUTHORIZED)
-    
-    return _wrapped_view
-
-
 def generate_voucher_id(agent_id, voucher_type):
     """
     Generate voucher ID in format: {agent_id}000{r|p}{auto_increment}
@@ -4296,7 +4333,7 @@ def create_voucher(request):
         customer_vendor_id = data.get('customerVendorId')
         amount = Decimal(str(data.get('amount', 0)))
         payment_method = data.get('paymentMethod', 'cash')
-        account_id = data.get('accountId', 35)  # Default to cash account
+        account_id = data.get('accountId') or accounts.get_id(accounts.CASH)  # Default to cash account
         notes = data.get('notes', '')
         voucher_date = data.get('voucherDate')
         store_id = data.get('storeId')
@@ -4347,7 +4384,7 @@ def create_voucher(request):
         
         # Verify cash account exists
         try:
-            cash_account = Account.objects.get(id=account_id, isDeleted=False)
+            cash_account = accounts.by_id(account_id)
         except Account.DoesNotExist:
             return Response({
                 'success': False,
@@ -4384,7 +4421,7 @@ def create_voucher(request):
             
             # Transaction 2: Credit Customer Account (Reduce customer debt)
             transaction2 = Transaction.objects.create(
-                accountID=Account.objects.get(id=36),  # Customer AR account
+                accountID=accounts.get(accounts.CUSTOMERS_DEFERRED),  # Customer AR account
                 amount=-amount,  # Negative (Credit)
                 notes=notes if notes else f"Payment received - Voucher {voucher_id} - Agent {request.agent.agentName}",
                 type=voucher_type,
@@ -4398,7 +4435,7 @@ def create_voucher(request):
         else:  # Payment (Money OUT)
             # Transaction 1: Debit Vendor Account (Reduce business debt)
             transaction1 = Transaction.objects.create(
-                accountID=Account.objects.get(id=37),  # Vendor AP account
+                accountID=accounts.get(accounts.VENDORS_PAYABLE),  # Vendor AP account
                 amount=amount,  # Positive (Debit)
                 notes=notes if notes else f"Payment made - Voucher {voucher_id} - {customer_name}",
                 type=voucher_type,
@@ -4527,7 +4564,7 @@ def batch_create_vouchers(request):
                 store_id = voucher_data.get('storeId')
                 notes = voucher_data.get('notes', '')
                 voucher_date = voucher_data.get('voucherDate')
-                account_id = voucher_data.get('accountId', 35)
+                account_id = voucher_data.get('accountId') or accounts.get_id(accounts.CASH)
                 
                 # Validation
                 if not voucher_type or voucher_type not in [1, 2]:
@@ -4543,7 +4580,7 @@ def batch_create_vouchers(request):
                     customer_vendor = CustomerVendor.objects.get(id=customer_vendor_id, isDeleted=False)
                 
                 Store.objects.get(id=store_id, isDeleted=False)
-                cash_account = Account.objects.get(id=account_id, isDeleted=False)
+                cash_account = accounts.by_id(account_id)
                 
                 # Generate voucher ID
                 voucher_id = generate_voucher_id(request.agent.id, voucher_type)
@@ -4677,7 +4714,7 @@ def get_vouchers(request):
         if date_from:
             try:
                 date_from_parsed = datetime.strptime(date_from, '%Y-%m-%d').date()
-                query &= Q(createdAt__date__gte=date_from_parsed)
+                query &= created_in_range(date_from=date_from_parsed)
             except ValueError:
                 return Response({
                     'success': False,
@@ -4688,7 +4725,7 @@ def get_vouchers(request):
         if date_to:
             try:
                 date_to_parsed = datetime.strptime(date_to, '%Y-%m-%d').date()
-                query &= Q(createdAt__date__lte=date_to_parsed)
+                query &= created_in_range(date_to=date_to_parsed)
             except ValueError:
                 return Response({
                     'success': False,
@@ -4894,40 +4931,10 @@ def agent_visits_list(request, agent_id=None):
             target_agent = agent
         else:
             # Agent requesting their own visits (requires agent authentication)
-            auth_header = request.META.get('HTTP_AUTHORIZATION')
-            if not auth_header or not auth_header.startswith('Basic '):
-                return Response({
-                    'success': False,
-                    'error': 'AUTHENTICATION_REQUIRED',
-                    'message': 'Agent authentication required'
-                }, status=status.HTTP_401_UNAUTHORIZED)
-            
             try:
-                import base64
-                encoded_credentials = auth_header.split(' ')[1]
-                decoded_credentials = base64.b64decode(encoded_credentials).decode('utf-8')
-                username, password = decoded_credentials.split(':')
-                
-                agent = Agent.objects.filter(
-                    agentUsername=username, 
-                    isDeleted=False,
-                    isActive=True
-                ).first()
-                
-                if not agent or not agent.check_password(password):
-                    return Response({
-                        'success': False,
-                        'error': 'INVALID_CREDENTIALS',
-                        'message': 'Invalid agent credentials'
-                    }, status=status.HTTP_401_UNAUTHORIZED)
-                
-                target_agent = agent
-            except Exception as e:
-                return Response({
-                    'success': False,
-                    'error': 'AUTHENTICATION_ERROR',
-                    'message': f'Authentication failed: {str(e)}'
-                }, status=status.HTTP_401_UNAUTHORIZED)
+                target_agent = agent_auth.authenticate(request)
+            except agent_auth.AgentAuthenticationError as error:
+                return agent_auth.error_response(error)
         
         # Filter visits for the target agent
         queryset = Visit.objects.filter(
@@ -5275,7 +5282,7 @@ def agent_visitplans_list(request):
         queryset = VisitPlan.objects.filter(
             agentID=request.agent,
             isDeleted=False
-        ).order_by('-dateFrom')
+        ).select_related('agentID').order_by('-dateFrom')
         
         # Filter by status if provided
         status_filter = request.GET.get('status')
@@ -5482,57 +5489,22 @@ def get_negative_visits(request):
                 'message': 'agent_id parameter is required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get all visits for the agent
-        queryset = Visit.objects.filter(
-            agentID_id=agent_id,
-            isDeleted=False
-        ).select_related('agentID', 'customerVendor')
-        
-        # Apply date filters
-        date_from = request.GET.get('date_from')
-        date_to = request.GET.get('date_to')
         customer_vendor = request.GET.get('customer_vendor')
+        try:
+            date_from = visits.parse_day(request.GET.get('date_from'))
+            date_to = visits.parse_day(request.GET.get('date_to'))
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'VALIDATION_ERROR',
+                'message': 'date_from and date_to must be YYYY-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        if date_from:
-            queryset = queryset.filter(date__date__gte=date_from)
-        if date_to:
-            queryset = queryset.filter(date__date__lte=date_to)
-        if customer_vendor:
-            queryset = queryset.filter(customerVendor_id=customer_vendor)
-        
-        # Filter negative visits: visits with no related invoices or transactions
-        negative_visits = []
-        for visit in queryset:
-            # Check if visit has related invoice (by matching date, agent, and customer)
-            has_invoice = InvoiceMaster.objects.filter(
-                agentID=visit.agentID,
-                customerOrVendorID=visit.customerVendor,
-                createdAt__date=visit.date.date(),
-                isDeleted=False
-            ).exists()
-            
-            # Check if visit has related transaction (voucher)
-            has_transaction = Transaction.objects.filter(
-                agentID=visit.agentID,
-                customerVendorID=visit.customerVendor,
-                createdAt__date=visit.date.date(),
-                isDeleted=False
-            ).exists()
-            
-            # If no invoice and no transaction, it's a negative visit
-            if not has_invoice and not has_transaction:
-                negative_visits.append({
-                    'id': visit.id,
-                    'agent_id': visit.agentID.id,
-                    'agent_name': visit.agentID.agentName,
-                    'customer_id': visit.customerVendor.id if visit.customerVendor else None,
-                    'customer_name': visit.customerVendor.customerVendorName if visit.customerVendor else None,
-                    'trans_type': visit.transType,
-                    'date': visit.date.isoformat(),
-                    'latitude': float(visit.latitude),
-                    'longitude': float(visit.longitude),
-                    'notes': visit.notes
-                })
+        # Visits with no invoice and no voucher for the customer on the visit day, in one query
+        negative_visits = [
+            visits.visit_row(visit)
+            for visit in visits.negative_visits(agent_id, date_from, date_to, customer_vendor)
+        ]
         
         return Response({
             'success': True,
@@ -5547,6 +5519,104 @@ def get_negative_visits(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@extend_schema(
+    summary="Get negative visits of all agents",
+    description="""
+    Negative visits of every agent (or one) for supervisors, a page at a time, with the number
+    of visits and negative visits per agent.
+    
+    **Filters**:
+    - agent_id (optional): Only this agent
+    - date_from (optional): Start date (YYYY-MM-DD, default: first day of this month)
+    - date_to (optional): End date (YYYY-MM-DD, default: today)
+    - customer_vendor (optional): Filter by customer/vendor ID
+    - page (optional): Page number (default 1)
+    - page_size (optional): Visits per page (default 100, max 500)
+    """,
+    parameters=[
+        OpenApiParameter('agent_id', OpenApiTypes.INT, description='Agent ID'),
+        OpenApiParameter('date_from', OpenApiTypes.DATE, description='Start date (YYYY-MM-DD)'),
+        OpenApiParameter('date_to', OpenApiTypes.DATE, description='End date (YYYY-MM-DD)'),
+        OpenApiParameter('customer_vendor', OpenApiTypes.INT, description='Customer/Vendor ID'),
+        OpenApiParameter('page', OpenApiTypes.INT, description='Page number (default 1)'),
+        OpenApiParameter('page_size', OpenApiTypes.INT, description='Visits per page (default 100, max 500)'),
+    ],
+    responses={
+        200: {
+            'type': 'object',
+            'properties': {
+                'success': {'type': 'boolean'},
+                'summary': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'agent_id': {'type': 'integer'},
+                            'agent_name': {'type': 'string'},
+                            'visits': {'type': 'integer'},
+                            'negative_visits': {'type': 'integer'},
+                        }
+                    }
+                },
+                'data': {'type': 'array', 'items': {'type': 'object'}},
+                'count': {'type': 'integer'},
+                'page': {'type': 'integer'},
+                'page_size': {'type': 'integer'},
+                'total_pages': {'type': 'integer'},
+            }
+        },
+        400: {'description': 'Invalid date, page or page_size'}
+    },
+    tags=['Visits']
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def negative_visits_report(request):
+    """Negative visits of all agents with per-agent counts"""
+    try:
+        try:
+            agent_id = visits.parse_id(request.GET.get('agent_id'))
+            customer_vendor = visits.parse_id(request.GET.get('customer_vendor'))
+            date_to = visits.parse_day(request.GET.get('date_to')) or timezone.localdate()
+            date_from = visits.parse_day(request.GET.get('date_from')) or date_to.replace(day=1)
+            page = int(request.GET.get('page', 1))
+            page_size = int(request.GET.get('page_size', visits.DEFAULT_PAGE_SIZE))
+            if page < 1 or not 1 <= page_size <= visits.MAX_PAGE_SIZE:
+                raise ValueError
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'VALIDATION_ERROR',
+                'message': (
+                    'agent_id and customer_vendor must be positive integers, dates YYYY-MM-DD, page at least 1 '
+                    f'and page_size between 1 and {visits.MAX_PAGE_SIZE}'
+                )
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        summary = visits.summary(agent_id, date_from, date_to, customer_vendor)
+        count = sum(row['negative_visits'] for row in summary)
+        offset = (page - 1) * page_size
+        negative_visits = visits.negative_visits(agent_id, date_from, date_to, customer_vendor)[offset:offset + page_size]
+        
+        return Response({
+            'success': True,
+            'date_from': date_from,
+            'date_to': date_to,
+            'summary': summary,
+            'data': [visits.visit_row(visit) for visit in negative_visits],
+            'count': count,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': (count + page_size - 1) // page_size,
+        })
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': 'PROCESSING_ERROR',
+            'message': f'Error retrieving negative visits: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @extend_schema(
     summary="Get agent's active visit plan with customer details",
     description="""
@@ -5695,90 +5765,140 @@ def get_negative_visits(request):
 @authentication_classes([])
 @permission_classes([AllowAny])
 @agent_authentication_required
+@etags.conditional(etags.active_plan_version, private=True, no_cache=True)
 def agent_active_plan_with_customers(request):
     """Get active visit plan for authenticated agent with detailed customer information"""
     try:
-        from datetime import date
-        today = date.today()
+        # Built once per agent and day, then served from the cache until plans or customers change
+        payload = plans.cached_payload(request.agent)
         
-        # Get the active visit plan that includes today's date
-        visitplan = VisitPlan.objects.filter(
-            agentID=request.agent,
-            isActive=True,
-            dateFrom__lte=today,
-            dateTo__gte=today,
-            isDeleted=False
-        ).first()
-        
-        if not visitplan:
+        if payload is None:
             return Response({
                 'success': False,
                 'error': 'NOT_FOUND',
                 'message': 'No active visit plan found for today'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Get customer IDs from the plan
-        customer_ids = visitplan.customers if visitplan.customers else []
-        
-        if not customer_ids:
-            return Response({
-                'success': True,
-                'data': {
-                    'plan_id': visitplan.id,
-                    'date_from': visitplan.dateFrom,
-                    'date_to': visitplan.dateTo,
-                    'notes': visitplan.notes,
-                    'customers': []
+        return Response({
+            'success': True,
+            'data': payload
+        })
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': 'PROCESSING_ERROR',
+            'message': f'Error retrieving active visit plan: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@extend_schema(
+    summary="Get customers near the agent",
+    description="""
+    Returns the nearest customers to a point (the agent's position), nearest first.
+    Customer locations are the median coordinates of their latest visits, refreshed by the
+    refresh_customer_locations command; customers never visited have no location.
+    
+    **Scopes**:
+    - plan (default): customers of the agent's active visit plan for today
+    - territory: customers whose latest visit was made by the agent
+    """,
+    parameters=[
+        OpenApiParameter('latitude', OpenApiTypes.NUMBER, required=True, description='Latitude of the agent'),
+        OpenApiParameter('longitude', OpenApiTypes.NUMBER, required=True, description='Longitude of the agent'),
+        OpenApiParameter('radius_km', OpenApiTypes.NUMBER, description='Search radius in km (default 5, max 50)'),
+        OpenApiParameter('limit', OpenApiTypes.INT, description='Most customers returned (default 10, max 100)'),
+        OpenApiParameter('scope', OpenApiTypes.STR, enum=[locations.SCOPE_PLAN, locations.SCOPE_TERRITORY],
+                         description='plan (default) or territory'),
+    ],
+    responses={
+        200: {
+            'description': 'Nearby customers retrieved successfully',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'success': True,
+                        'data': [
+                            {
+                                'id': 15,
+                                'customer_name': 'Customer Name',
+                                'phone_one': '01000000000',
+                                'latitude': 30.0444,
+                                'longitude': 31.2357,
+                                'distance_km': 0.42,
+                                'last_visit_at': '2025-10-23T10:30:00+03:00'
+                            }
+                        ],
+                        'count': 1
+                    }
                 }
-            })
-        
-        # Get customers with type=1 (customers only, not vendors)
-        customers = CustomerVendor.objects.filter(
-            id__in=customer_ids,
-            type=1,
-            isDeleted=False
-        ).prefetch_related('customervendorpricelist_set__priceListID')
-        
-        # Build customer list with price list information
-        customer_list = []
-        for customer in customers:
-            # Get the customer's price list (there should be only one due to unique_together constraint)
-            price_list_relation = customer.customervendorpricelist_set.filter(isDeleted=False).first()
-            
-            customer_data = {
-                'id': customer.id,
-                'customer_name': customer.customerVendorName,
-                'phone_one': customer.phone_one,
-                'phone_two': customer.phone_two,
-                'type': customer.type,
-                'notes': customer.notes,
-                'price_list': None
             }
-            
-            if price_list_relation:
-                customer_data['price_list'] = {
-                    'id': price_list_relation.priceListID.id,
-                    'name': price_list_relation.priceListID.priceListName
-                }
-            
-            customer_list.append(customer_data)
+        },
+        400: {'description': 'Missing or invalid coordinates, radius, limit or scope'},
+        401: {'description': 'Agent authentication required'},
+        404: {'description': 'No active visit plan found for today (plan scope)'}
+    },
+    tags=['Agent - Visit Plans']
+)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@agent_authentication_required
+def nearby_customers(request):
+    """Nearest customers of the agent's plan or territory within a radius"""
+    scope = request.GET.get('scope', locations.SCOPE_PLAN)
+    try:
+        latitude = float(request.GET['latitude'])
+        longitude = float(request.GET['longitude'])
+        radius_km = float(request.GET.get('radius_km', locations.DEFAULT_RADIUS_KM))
+        limit = int(request.GET.get('limit', locations.DEFAULT_LIMIT))
+        if (not -90 <= latitude <= 90 or not -180 <= longitude <= 180
+                or not 0 < radius_km <= locations.MAX_RADIUS_KM or not 1 <= limit <= locations.MAX_LIMIT
+                or scope not in (locations.SCOPE_PLAN, locations.SCOPE_TERRITORY)):
+            raise ValueError
+    except (KeyError, ValueError):
+        return Response({
+            'success': False,
+            'error': 'VALIDATION_ERROR',
+            'message': f'latitude and longitude are required; radius_km must be at most {locations.MAX_RADIUS_KM}, '
+                       f'limit between 1 and {locations.MAX_LIMIT} and scope plan or territory'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        if scope == locations.SCOPE_PLAN:
+            visitplan = plans.active_plan(request.agent, timezone.localdate())
+            if visitplan is None:
+                return Response({
+                    'success': False,
+                    'error': 'NOT_FOUND',
+                    'message': 'No active visit plan found for today'
+                }, status=status.HTTP_404_NOT_FOUND)
+            found = locations.nearby(latitude, longitude, radius_km, limit, customer_ids=visitplan.customers or [])
+        else:
+            found = locations.nearby(latitude, longitude, radius_km, limit, agent=request.agent)
         
+        data = [
+            {
+                'id': location.customerVendorID.id,
+                'customer_name': location.customerVendorID.customerVendorName,
+                'phone_one': location.customerVendorID.phone_one,
+                'phone_two': location.customerVendorID.phone_two,
+                'latitude': float(location.latitude),
+                'longitude': float(location.longitude),
+                'distance_km': round(distance, 3),
+                'last_visit_at': location.lastVisitAt,
+            }
+            for location, distance in found
+        ]
         return Response({
             'success': True,
-            'data': {
-                'plan_id': visitplan.id,
-                'date_from': visitplan.dateFrom,
-                'date_to': visitplan.dateTo,
-                'notes': visitplan.notes,
-                'customers': customer_list,
-                'total_customers': len(customer_list)
-            }
+            'data': data,
+            'count': len(data)
         })
     except Exception as e:
         return Response({
             'success': False,
             'error': 'PROCESSING_ERROR',
-            'message': f'Error retrieving active visit plan: {str(e)}'
+            'message': f'Error retrieving nearby customers: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
@@ -5792,7 +5912,8 @@ def agent_active_plan_with_customers(request):
             location=OpenApiParameter.QUERY,
             description='Store ID to get stock for',
             required=True
-        )
+        ),
+        encoding.LAYOUT_PARAMETER,
     ],
     responses={
         200: {
@@ -5817,6 +5938,7 @@ def agent_active_plan_with_customers(request):
 @api_view(['GET'])
 @authentication_classes([])  # Disable DRF authentication
 @permission_classes([AllowAny])  # Allow any user
+@etags.conditional(etags.agent_stock_version, private=True, no_cache=True)
 def agent_stock(request):
     """Get stock levels for all items in a specific store"""
     try:
@@ -5860,7 +5982,7 @@ def agent_stock(request):
         
         return Response({
             'success': True,
-            'data': stock_data
+            'data': encoding.layout(request, stock_data, columns=['item_id', 'item_name', 'stock'])
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -5922,7 +6044,7 @@ def agent_stock(request):
 def agent_cash_balance(request):
     """Get cash balance for a specific agent with optional date filtering"""
     try:
-        from datetime import datetime
+        from datetime import datetime, timedelta
         
         agent_id = request.query_params.get('agent_id')
         date_from = request.query_params.get('date_from')
@@ -5976,7 +6098,27 @@ def agent_cash_balance(request):
                 'message': f'Agent with ID {agent_id} not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Query with date filtering, filtered by cash account (accountID = 35)
+        if not date_from:
+            # Full-history balance: start from the latest closed-period snapshot and
+            # add only the cash transactions posted after it
+            before = None
+            if date_to:
+                before = datetime.strptime(date_to, '%Y-%m-%d').date() + timedelta(days=1)
+            totals = periods.balance(SNAPSHOT_KIND_AGENT_CASH, agent.id, before=before)
+            # Cash received by the agent is a positive amount, reported as credit
+            return Response({
+                'success': True,
+                'data': {
+                    'agent_id': agent.id,
+                    'agent_name': agent.agentName,
+                    'agent_username': agent.agentUsername,
+                    'total_debit': float(totals['credit']),
+                    'total_credit': float(totals['debit']),
+                    'balance': float(totals['balance'])
+                }
+            }, status=status.HTTP_200_OK)
+        
+        # Query with date filtering, filtered by the cash account
         from django.db import connection
         
         query = '''
@@ -5990,20 +6132,21 @@ def agent_cash_balance(request):
             FROM agents a
             LEFT JOIN transactions t ON a.id = t."agentID" 
                 AND t."isDeleted" = FALSE
-                AND t."accountID_id" = 35
+                AND t."accountID_id" = %s
         '''
         
-        params = [agent_id]
+        params = [accounts.get_id(accounts.CASH), agent_id]
         conditions = ['a.id = %s', 'a."isDeleted" = FALSE']
         
+        # Bound "createdAt" with local day boundaries so partitions can be pruned
         if date_from:
             conditions.append('t."createdAt" >= %s')
-            params.append(date_from)
+            params.append(day_bounds(datetime.strptime(date_from, '%Y-%m-%d').date())[0])
         
         if date_to:
-            # Add one day to include the entire end date
-            conditions.append('t."createdAt" < %s::date + interval \'1 day\'')
-            params.append(date_to)
+            # Exclusive upper bound includes the entire end date
+            conditions.append('t."createdAt" < %s')
+            params.append(day_bounds(datetime.strptime(date_to, '%Y-%m-%d').date())[1])
         
         query += ' WHERE ' + ' AND '.join(conditions)
         query += ' GROUP BY a.id, a."agentName", a."agentUsername"'
@@ -6048,6 +6191,246 @@ def agent_cash_balance(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@extend_schema(
+    summary="Customer account statement",
+    description="""
+    Get the account statement of a customer for a date range.
+    
+    Returns the opening balance before date_from and the transactions of the period in
+    posting order, each with its running balance (negative balance = customer owes us).
+    Results are paged with an opaque cursor: pass `next_cursor` from the previous response
+    as `cursor` to get the next page. `next_cursor` is null on the last page.
+    
+    **Authentication Required**: Agent Basic Authentication
+    """,
+    parameters=[
+        OpenApiParameter(name='customer_id', type=OpenApiTypes.INT, location=OpenApiParameter.PATH, description='Customer ID'),
+        OpenApiParameter(name='date_from', type=OpenApiTypes.DATE, description='Start date (YYYY-MM-DD)', required=False),
+        OpenApiParameter(name='date_to', type=OpenApiTypes.DATE, description='End date (YYYY-MM-DD)', required=False),
+        OpenApiParameter(name='cursor', type=OpenApiTypes.STR, description='Cursor returned as next_cursor by the previous page', required=False),
+        OpenApiParameter(name='limit', type=OpenApiTypes.INT, description='Rows per page (default 100, max 500)', required=False),
+    ],
+    responses={
+        200: {
+            'description': 'Statement page',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'success': True,
+                        'data': {
+                            'customer_id': 12,
+                            'customer_name': 'Customer A',
+                            'date_from': '2025-01-01',
+                            'date_to': '2025-01-31',
+                            'opening_balance': -1500.0,
+                            'transactions': [
+                                {
+                                    'id': 901,
+                                    'created_at': '2025-01-03T10:15:00+02:00',
+                                    'type': 2,
+                                    'notes': 'Sales Invoice #455',
+                                    'invoice_id': 455,
+                                    'account_id': 36,
+                                    'account_name': 'Customers',
+                                    'debit': 0.0,
+                                    'credit': 250.0,
+                                    'balance': -1750.0
+                                }
+                            ],
+                            'next_cursor': None
+                        }
+                    }
+                }
+            }
+        },
+        400: {'description': 'Invalid date, limit or cursor'},
+        404: {'description': 'Customer not found'}
+    },
+    tags=['Agent - Customers']
+)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@agent_authentication_required
+def customer_statement_api(request, customer_id):
+    """Account statement of one customer with running balances and cursor paging"""
+    from .statements import statement_page, InvalidCursor
+    
+    try:
+        customer = CustomerVendor.objects.get(id=customer_id, type__in=[1, 3], isDeleted=False)
+    except CustomerVendor.DoesNotExist:
+        return Response({
+            'success': False,
+            'error': 'CUSTOMER_NOT_FOUND',
+            'message': f'Customer with ID {customer_id} not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        date_from = request.query_params.get('date_from')
+        date_to = request.query_params.get('date_to')
+        date_from = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else None
+        date_to = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else None
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': 'INVALID_DATE_FORMAT',
+            'message': 'date_from and date_to must be in YYYY-MM-DD format'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        limit = min(max(int(request.query_params.get('limit', 100)), 1), 500)
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': 'INVALID_LIMIT',
+            'message': 'limit must be an integer'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        page = statement_page(
+            customer.id, date_from, date_to,
+            cursor=request.query_params.get('cursor'),
+            limit=limit
+        )
+    except InvalidCursor as e:
+        return Response({
+            'success': False,
+            'error': 'INVALID_CURSOR',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': 'PROCESSING_ERROR',
+            'message': f'Error retrieving customer statement: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    return Response({
+        'success': True,
+        'data': {
+            'customer_id': customer.id,
+            'customer_name': customer.customerVendorName,
+            'date_from': date_from,
+            'date_to': date_to,
+            'opening_balance': float(page['opening']),
+            'transactions': [
+                {
+                    'id': row['id'],
+                    'created_at': row['created_at'],
+                    'type': row['type'],
+                    'notes': row['notes'],
+                    'invoice_id': row['invoice_id'],
+                    'account_id': row['account_id'],
+                    'account_name': row['account_name'],
+                    'debit': float(row['debit']),
+                    'credit': float(row['credit']),
+                    'balance': float(row['balance'])
+                }
+                for row in page['rows']
+            ],
+            'next_cursor': page['next_cursor']
+        }
+    }, status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    summary="Sales time series",
+    description="""
+    Sales, sales returns, cash receipts and cash payments per day, week or month for charts.
+
+    Buckets are local (Africa/Cairo) calendar days, ISO weeks starting on Monday or calendar
+    months; partial buckets at the ends of the range cover their whole week or month.
+    Receipts and payments are money in and out of the cash and bank accounts. Vouchers have
+    no store, so the store filter limits them to invoice payments of that store.
+    Closed buckets are served from cache; at most 732 buckets per call.
+
+    **Authentication Required**: logged-in user
+    """,
+    parameters=[
+        OpenApiParameter(name='bucket', type=OpenApiTypes.STR, enum=['day', 'week', 'month'], description='Bucket size (default day)', required=False),
+        OpenApiParameter(name='date_from', type=OpenApiTypes.DATE, description='Start date (YYYY-MM-DD, default 29 days before date_to)', required=False),
+        OpenApiParameter(name='date_to', type=OpenApiTypes.DATE, description='End date (YYYY-MM-DD, default today)', required=False),
+        OpenApiParameter(name='store', type=OpenApiTypes.INT, description='Store ID', required=False),
+        OpenApiParameter(name='agent', type=OpenApiTypes.INT, description='Agent ID', required=False),
+        OpenApiParameter(name='customer', type=OpenApiTypes.INT, description='Customer ID', required=False),
+    ],
+    responses={
+        200: {
+            'description': 'Series points, oldest first',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'success': True,
+                        'data': {
+                            'bucket': 'day',
+                            'date_from': '2025-01-01',
+                            'date_to': '2025-01-02',
+                            'points': [
+                                {'bucket': '2025-01-01', 'sales': 12500.0, 'returns': 300.0, 'receipts': 9800.0, 'payments': 1200.0},
+                                {'bucket': '2025-01-02', 'sales': 8400.0, 'returns': 0.0, 'receipts': 7600.0, 'payments': 0.0}
+                            ]
+                        }
+                    }
+                }
+            }
+        },
+        400: {'description': 'Invalid bucket, date, filter or range'}
+    },
+    tags=['Reports']
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sales_timeseries_api(request):
+    """Sales, returns, receipts and payments bucketed by day, week or month"""
+    from .timeseries import series, next_bucket
+
+    try:
+        date_from = request.query_params.get('date_from')
+        date_to = request.query_params.get('date_to')
+        date_from = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else None
+        date_to = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else None
+        filters = {
+            f'{name}_id': int(request.query_params[name])
+            for name in ('store', 'agent', 'customer')
+            if request.query_params.get(name)
+        }
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': 'INVALID_PARAMETER',
+            'message': 'Dates must be YYYY-MM-DD and store, agent and customer must be integers'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    bucket = request.query_params.get('bucket', 'day')
+    try:
+        points = series(bucket, date_from, date_to, **filters)
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'error': 'INVALID_RANGE',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'success': True,
+        'data': {
+            'bucket': bucket,
+            'date_from': points[0]['bucket'],
+            'date_to': next_bucket(points[-1]['bucket'], bucket) - timedelta(days=1),
+            'points': [
+                {
+                    'bucket': point['bucket'],
+                    'sales': float(point['sales']),
+                    'returns': float(point['returns']),
+                    'receipts': float(point['receipts']),
+                    'payments': float(point['payments'])
+                }
+                for point in points
+            ]
+        }
+    }, status=status.HTTP_200_OK)
+
+
 # =============================================
 # INVENTORY MANAGEMENT VIEWS (STORE ADMINS)
 # =============================================
@@ -0,0 +1,151 @@
+"""
+Negative visits: visits after which the agent posted no invoice and no voucher for the
+visited customer on the same local day.
+Computed set-based in one query: NOT EXISTS subqueries correlated on the agent, the customer
+and the bounds of the visit's local day against invoiceMaster and transactions, served by the
+partial indexes of migration 0031.
+"""
+
+from datetime import date
+
+from django.db import connection
+from django.db.models import Count, DateTimeField, Exists, Func, OuterRef, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import InvoiceMaster, Transaction, Visit
+from .partitioning import created_in_range
+
+# (model, customer field) of the postings that make a visit productive
+POSTINGS = ((InvoiceMaster, 'customerOrVendorID'), (Transaction, 'customerVendorID'))
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def parse_day(value):
+    """Date of a 'YYYY-MM-DD' query parameter (None when empty); raises ValueError."""
+    return date.fromisoformat(value) if value else None
+
+
+def parse_id(value):
+    """Positive integer id of a query parameter (None when empty); raises ValueError."""
+    if not value:
+        return None
+    value = int(value)
+    if value < 1:
+        raise ValueError(value)
+    return value
+
+
+class LocalDayStart(Func):
+    """
+    Start of the local day (current time zone) of a timestamp, `days` later, as a timestamp
+    with time zone. The day arithmetic is done in local time, so DST days keep their length.
+    PostgreSQL only.
+    """
+    output_field = DateTimeField()
+
+    def __init__(self, expression, days=0):
+        super().__init__(expression)
+        self.days = days
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        tzname = timezone.get_current_timezone_name()
+        return (
+            f"((DATE_TRUNC('day', {sql} AT TIME ZONE %s) + %s * INTERVAL '1 day') AT TIME ZONE %s)",
+            (*params, tzname, self.days, tzname),
+        )
+
+
+def _posted_on_visit_day(model, posted_range):
+    """Live `model` rows of the outer visit's agent on the visit's local day."""
+    if connection.vendor == 'postgresql':
+        # A range on the raw column, so the createdAt part of the indexes is used
+        same_day = Q(
+            createdAt__gte=LocalDayStart(OuterRef('date')),
+            createdAt__lt=LocalDayStart(OuterRef('date'), days=1),
+        )
+    else:
+        same_day = Q(createdAt__date=OuterRef('visit_day'))
+    return model.objects.filter(
+        posted_range,
+        same_day,
+        agentID=OuterRef('agentID'),
+        isDeleted=False,
+    )
+
+
+def negative_condition(date_from=None, date_to=None):
+    """
+    Q matching the negative ones among visits(): no live invoice or voucher of the visit's agent
+    for its customer (or, for a visit without customer, without customer) on the visit's day.
+    The postings are only searched between date_from and date_to, which must cover the visits.
+    """
+    posted_range = created_in_range(date_from, date_to)
+    condition = Q()
+    for model, customer_field in POSTINGS:
+        posted = _posted_on_visit_day(model, posted_range)
+        condition &= Q(customerVendor__isnull=True) | ~Exists(
+            posted.filter(**{customer_field: OuterRef('customerVendor')})
+        )
+        condition &= Q(customerVendor__isnull=False) | ~Exists(
+            posted.filter(**{f'{customer_field}__isnull': True})
+        )
+    return condition
+
+
+def visits(agent_id=None, date_from=None, date_to=None, customer_vendor=None):
+    """Live visits between two local days (inclusive), annotated with their local day."""
+    queryset = Visit.objects.filter(
+        created_in_range(date_from, date_to, field='date'),
+        isDeleted=False,
+    ).annotate(visit_day=TruncDate('date'))
+    if agent_id:
+        queryset = queryset.filter(agentID_id=agent_id)
+    if customer_vendor:
+        queryset = queryset.filter(customerVendor_id=customer_vendor)
+    return queryset
+
+
+def negative_visits(agent_id=None, date_from=None, date_to=None, customer_vendor=None):
+    """Negative visits, most recent first."""
+    return visits(agent_id, date_from, date_to, customer_vendor).filter(
+        negative_condition(date_from, date_to)
+    ).select_related('agentID', 'customerVendor').order_by('-date', '-id')
+
+
+def summary(agent_id=None, date_from=None, date_to=None, customer_vendor=None):
+    """Visits and negative visits per agent, in one grouped query."""
+    rows = visits(agent_id, date_from, date_to, customer_vendor).values(
+        'agentID_id', 'agentID__agentName'
+    ).annotate(
+        visits=Count('id'),
+        negative_visits=Count('id', filter=negative_condition(date_from, date_to)),
+    ).order_by('agentID__agentName', 'agentID_id')
+    return [
+        {
+            'agent_id': row['agentID_id'],
+            'agent_name': row['agentID__agentName'],
+            'visits': row['visits'],
+            'negative_visits': row['negative_visits'],
+        }
+        for row in rows
+    ]
+
+
+def visit_row(visit):
+    """API representation of a negative visit."""
+    return {
+        'id': visit.id,
+        'agent_id': visit.agentID.id,
+        'agent_name': visit.agentID.agentName,
+        'customer_id': visit.customerVendor.id if visit.customerVendor else None,
+        'customer_name': visit.customerVendor.customerVendorName if visit.customerVendor else None,
+        'trans_type': visit.transType,
+        'date': visit.date.isoformat(),
+        'latitude': float(visit.latitude),
+        'longitude': float(visit.longitude),
+        'notes': visit.notes
+    }
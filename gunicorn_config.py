@@ -9,7 +9,14 @@ backlog = 2048
 
 # Worker processes
 workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+# Threaded workers: a live dashboard stream (/dashboard/live/) holds one thread, not a whole
+# worker, and is not cut off by the worker timeout. Each worker serves at most
+# LIVE_MAX_STREAMS_PER_WORKER streams (settings.py) so the other threads stay free for requests.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+# Every busy thread uses its own database connection, so PostgreSQL sees up to
+# workers * threads connections from this server; LIVE_MAX_STREAMS_PER_WORKER of each worker's
+# are held for as long as the streams stay open. Size max_connections (or a pooler) for that.
 worker_connections = 1000
 timeout = 30
 keepalive = 2
@@ -65,6 +65,7 @@ if DEBUG:
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.encoding.APICompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -172,6 +173,10 @@ REST_FRAMEWORK = {
     'COERCE_DECIMAL_TO_STRING': False,
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_THROTTLE_CLASSES': [
         'rest_framework.throttling.AnonRateThrottle',
@@ -183,6 +188,13 @@ REST_FRAMEWORK = {
     }
 }
 
+# MessagePack API responses (Accept: application/msgpack) when the optional msgpack package is installed
+try:
+    import msgpack  # noqa: F401
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('core.encoding.MessagePackRenderer')
+except ImportError:
+    pass
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Computer Store API',
     'DESCRIPTION': 'E-commerce API for computer hardware store',
@@ -193,6 +205,56 @@ USE_DJANGO_JQUERY = True
 
 # AUTH_USER_MODEL = 'store.Customer'
 
+# Cache (per-process memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend such as FileBasedCache or Redis when running several workers)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='tantawy-default'),
+    },
+    # Report results (see core/report_cache.py) and agent visit plans (core/plans.py); file based so every worker shares it
+    'reports': {
+        'BACKEND': config('REPORT_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('REPORT_CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache', 'reports')),
+        # Closed time-series buckets take one entry each (core/timeseries.py). Culling drops
+        # random entries, which only costs a recomputation: the versions they are keyed on
+        # live in the 'versions' cache
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Data versions the report and plan caches are keyed on (see core/versions.py); a handful of
+    # keys kept apart from 'reports' so culling results never evicts them
+    'versions': {
+        'BACKEND': config('VERSION_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('VERSION_CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache', 'versions')),
+    },
+}
+
+# Seconds a cached report result is kept (it is dropped earlier when invoices/transactions change)
+REPORT_CACHE_TIMEOUT = config('REPORT_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Seconds a live dashboard stream stays open before the browser reconnects (see core/live.py)
+LIVE_STREAM_SECONDS = config('LIVE_STREAM_SECONDS', default=300, cast=int)
+# Live dashboard streams one worker process serves at once. Each holds a gunicorn thread and a
+# database connection while open; further dashboards receive a snapshot every 30 s instead.
+# Keep it well below GUNICORN_THREADS so API requests still find free threads.
+LIVE_MAX_STREAMS_PER_WORKER = config('LIVE_MAX_STREAMS_PER_WORKER', default=2, cast=int)
+
+# Well-known accounts used by invoice/voucher posting and reports (see core/accounts.py)
+WELL_KNOWN_ACCOUNTS = {
+    'CASH': config('ACCOUNT_CASH_ID', default=35, cast=int),
+    'VISA': config('ACCOUNT_VISA_ID', default=10, cast=int),
+    'CUSTOMERS_DEFERRED': config('ACCOUNT_CUSTOMERS_DEFERRED_ID', default=36, cast=int),
+    'VENDORS_PAYABLE': config('ACCOUNT_VENDORS_PAYABLE_ID', default=37, cast=int),
+    'VENDORS_DEFERRED': config('ACCOUNT_VENDORS_DEFERRED_ID', default=38, cast=int),
+}
+
+# Lifetimes of the signed agent API tokens issued at agent login (see core/agent_auth.py)
+AGENT_ACCESS_TOKEN_SECONDS = config('AGENT_ACCESS_TOKEN_SECONDS', default=12 * 3600, cast=int)
+AGENT_REFRESH_TOKEN_SECONDS = config('AGENT_REFRESH_TOKEN_SECONDS', default=30 * 24 * 3600, cast=int)
+
+# Seconds verified Basic Auth credentials of the store integration API are reused (see core/credential_cache.py)
+BASIC_AUTH_CACHE_SECONDS = config('BASIC_AUTH_CACHE_SECONDS', default=60, cast=int)
+
 # Authentication settings
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
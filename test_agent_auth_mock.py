@@ -0,0 +1,164 @@
+import os
+import django
+import base64
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from django.test import RequestFactory, override_settings
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tantawy.settings')
+django.setup()
+
+from rest_framework.response import Response
+
+from core import agent_auth
+from core.models import Agent
+
+
+def basic_header(username, password):
+    return 'Basic ' + base64.b64encode(f'{username}:{password}'.encode()).decode()
+
+
+class TestAgentAuth(unittest.TestCase):
+    def setUp(self):
+        # A fast hasher; the checks do not depend on it
+        fast_hashing = override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+        fast_hashing.enable()
+        self.addCleanup(fast_hashing.disable)
+
+        self.factory = RequestFactory()
+        self.agent = Agent(pk=7, agentName='Test Agent', agentUsername='agent7', isActive=True)
+        self.agent.set_password('secret')
+
+        # Agent lookups by pk or username return the agent as currently stored
+        patcher = patch('core.agent_auth.Agent.objects.filter')
+        self.mock_filter = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_filter.return_value.select_related.return_value.first.side_effect = lambda: self.agent
+
+    def request(self, authorization=None):
+        headers = {'HTTP_AUTHORIZATION': authorization} if authorization else {}
+        return self.factory.get('/api/agents/customers/', **headers)
+
+    def test_access_token_authenticates_agent(self):
+        token = agent_auth.issue_tokens(self.agent)['access_token']
+
+        agent = agent_auth.authenticate(self.request(f'Bearer {token}'))
+
+        self.assertEqual(agent.pk, 7)
+        self.mock_filter.assert_called_with(pk=7, isDeleted=False)
+
+    def test_expired_access_token_is_rejected(self):
+        token = agent_auth.issue_tokens(self.agent)['access_token']
+        later = time.time() + agent_auth.settings.AGENT_ACCESS_TOKEN_SECONDS + 1
+
+        with patch('django.core.signing.time.time', return_value=later):
+            with self.assertRaises(agent_auth.AgentAuthenticationError) as raised:
+                agent_auth.verify_access_token(token)
+
+        self.assertEqual(raised.exception.code, 'TOKEN_EXPIRED')
+        self.assertEqual(raised.exception.http_status, 401)
+
+    def test_refresh_token_outlives_access_token(self):
+        refresh = agent_auth.issue_tokens(self.agent)['refresh_token']
+        later = time.time() + agent_auth.settings.AGENT_ACCESS_TOKEN_SECONDS + 1
+
+        with patch('django.core.signing.time.time', return_value=later):
+            self.assertEqual(agent_auth.verify_refresh_token(refresh).pk, 7)
+
+    def test_refresh_token_is_not_an_access_token(self):
+        refresh = agent_auth.issue_tokens(self.agent)['refresh_token']
+
+        with self.assertRaises(agent_auth.AgentAuthenticationError) as raised:
+            agent_auth.verify_access_token(refresh)
+
+        self.assertEqual(raised.exception.code, 'INVALID_TOKEN')
+
+    def test_password_change_revokes_tokens(self):
+        tokens = agent_auth.issue_tokens(self.agent)
+        self.agent.set_password('changed')
+
+        for verify, token in ((agent_auth.verify_access_token, tokens['access_token']),
+                              (agent_auth.verify_refresh_token, tokens['refresh_token'])):
+            with self.assertRaises(agent_auth.AgentAuthenticationError) as raised:
+                verify(token)
+            self.assertEqual(raised.exception.code, 'INVALID_TOKEN')
+
+    def test_deactivated_agent_is_refused(self):
+        token = agent_auth.issue_tokens(self.agent)['access_token']
+        self.agent.isActive = False
+
+        with self.assertRaises(agent_auth.AgentAuthenticationError) as raised:
+            agent_auth.verify_access_token(token)
+
+        self.assertEqual(raised.exception.code, 'AGENT_INACTIVE')
+        self.assertEqual(raised.exception.http_status, 403)
+
+    def test_deleted_agent_is_refused(self):
+        token = agent_auth.issue_tokens(self.agent)['access_token']
+        self.agent = None
+
+        with self.assertRaises(agent_auth.AgentAuthenticationError) as raised:
+            agent_auth.verify_access_token(token)
+
+        self.assertEqual(raised.exception.code, 'INVALID_TOKEN')
+
+    def test_tampered_token_is_rejected(self):
+        token = agent_auth.issue_tokens(self.agent)['access_token']
+
+        with self.assertRaises(agent_auth.AgentAuthenticationError) as raised:
+            agent_auth.authenticate(self.request(f'Bearer {token[:-2]}xx'))
+
+        self.assertEqual(raised.exception.code, 'INVALID_TOKEN')
+
+    def test_basic_auth_still_accepted(self):
+        agent = agent_auth.authenticate(self.request(basic_header('agent7', 'secret')))
+
+        self.assertEqual(agent.pk, 7)
+        self.mock_filter.assert_called_with(agentUsername='agent7', isDeleted=False)
+
+    def test_basic_auth_wrong_password(self):
+        with self.assertRaises(agent_auth.AgentAuthenticationError) as raised:
+            agent_auth.authenticate(self.request(basic_header('agent7', 'wrong')))
+
+        self.assertEqual(raised.exception.code, 'INVALID_CREDENTIALS')
+
+    def test_basic_auth_inactive_agent(self):
+        self.agent.isActive = False
+
+        with self.assertRaises(agent_auth.AgentAuthenticationError) as raised:
+            agent_auth.authenticate(self.request(basic_header('agent7', 'secret')))
+
+        self.assertEqual(raised.exception.code, 'AGENT_INACTIVE')
+
+    def test_malformed_basic_header(self):
+        with self.assertRaises(agent_auth.AgentAuthenticationError) as raised:
+            agent_auth.authenticate(self.request('Basic not-base64!'))
+
+        self.assertEqual(raised.exception.code, 'INVALID_CREDENTIALS')
+
+    def test_decorator_answers_401_without_credentials(self):
+        view = MagicMock(return_value=Response({'success': True}))
+
+        response = agent_auth.agent_authentication_required(view)(self.request())
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['error'], 'AUTHENTICATION_REQUIRED')
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="Agent API"')
+        view.assert_not_called()
+
+    def test_decorator_sets_request_agent(self):
+        token = agent_auth.issue_tokens(self.agent)['access_token']
+        view = MagicMock(return_value=Response({'success': True}))
+        request = self.request(f'Bearer {token}')
+
+        response = agent_auth.agent_authentication_required(view)(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(request.agent.pk, 7)
+        view.assert_called_once_with(request)
+
+
+if __name__ == '__main__':
+    unittest.main()
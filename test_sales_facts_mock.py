@@ -0,0 +1,153 @@
+import os
+import django
+import unittest
+from datetime import date, datetime, timezone as dt_timezone
+from unittest.mock import patch
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tantawy.settings')
+django.setup()
+
+from core import facts
+from core.models import InvoiceDetail, InvoiceMaster
+
+
+def stored_invoice(pk, created_at, customer_id):
+    """An InvoiceMaster as loaded from the database, without touching it."""
+    invoice = InvoiceMaster(pk=pk, createdAt=created_at, customerOrVendorID_id=customer_id, invoiceType=2)
+    invoice._state.adding = False
+    return invoice
+
+
+def stored_line(pk, master_id):
+    """An InvoiceDetail as loaded from the database, without touching it."""
+    line = InvoiceDetail(pk=pk, invoiceMasterID_id=master_id)
+    line._state.adding = False
+    return line
+
+
+class TestScheduleRefresh(unittest.TestCase):
+    @patch('core.facts.refresh_slices')
+    @patch('core.facts.connection')
+    def test_outside_transaction_rebuilds_now(self, mock_connection, mock_refresh):
+        mock_connection.in_atomic_block = False
+
+        facts.schedule_refresh({(date(2024, 5, 1), 7)})
+
+        mock_refresh.assert_called_once_with({(date(2024, 5, 1), 7)})
+
+    @patch('core.facts.db_transaction.on_commit')
+    @patch('core.facts.refresh_slices')
+    @patch('core.facts.connection')
+    def test_pending_slices_are_rebuilt_once_after_commit(self, mock_connection, mock_refresh, mock_on_commit):
+        mock_connection.in_atomic_block = True
+        mock_connection._pending_sales_fact_slices = None
+        callbacks = []
+        mock_on_commit.side_effect = callbacks.append
+
+        # An invoice and its lines all schedule the same slice
+        for _ in range(3):
+            facts.schedule_refresh({(date(2024, 5, 1), 7)})
+        facts.schedule_refresh({(date(2024, 5, 2), None)})
+        mock_refresh.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+
+        mock_refresh.assert_called_once_with({(date(2024, 5, 1), 7), (date(2024, 5, 2), None)})
+
+    @patch('core.facts.db_transaction.on_commit')
+    @patch('core.facts.refresh_slices')
+    @patch('core.facts.connection')
+    def test_slices_of_a_rolled_back_transaction_are_not_lost(self, mock_connection, mock_refresh, mock_on_commit):
+        mock_connection.in_atomic_block = True
+        mock_connection._pending_sales_fact_slices = None
+
+        # Rolled back: its flush is discarded and never runs
+        facts.schedule_refresh({(date(2024, 5, 1), 7)})
+        callbacks = []
+        mock_on_commit.side_effect = callbacks.append
+        facts.schedule_refresh({(date(2024, 5, 3), 8)})
+        for callback in callbacks:
+            callback()
+
+        mock_refresh.assert_called_once_with({(date(2024, 5, 1), 7), (date(2024, 5, 3), 8)})
+
+
+class TestRefreshSlices(unittest.TestCase):
+    @patch('core.facts.report_cache')
+    @patch('core.facts._rebuild', return_value=2)
+    def test_rebuilds_each_day_once_with_its_customers(self, mock_rebuild, mock_report_cache):
+        written = facts.refresh_slices([
+            (date(2024, 5, 2), None), (date(2024, 5, 1), 7), (date(2024, 5, 1), 3), (date(2024, 5, 1), 7),
+        ])
+
+        self.assertEqual(written, 4)
+        self.assertEqual(
+            [call.args for call in mock_rebuild.call_args_list],
+            [(date(2024, 5, 1), {3, 7}), (date(2024, 5, 2), {None})],
+        )
+        mock_report_cache.bump_data_version.assert_called_once_with()
+        mock_report_cache.bump_history_if_past.assert_called_once_with([date(2024, 5, 1), date(2024, 5, 2)])
+
+    @patch('core.facts.connection')
+    def test_day_rebuilds_are_serialized_on_postgresql(self, mock_connection):
+        mock_connection.vendor = 'postgresql'
+        cursor = mock_connection.cursor.return_value.__enter__.return_value
+
+        facts._lock_day(date(2024, 5, 1))
+
+        cursor.execute.assert_called_once_with(
+            'SELECT pg_advisory_xact_lock(%s, %s)', [facts.LOCK_NAMESPACE, date(2024, 5, 1).toordinal()]
+        )
+
+
+class TestInvoiceSlices(unittest.TestCase):
+    @patch('core.facts.InvoiceMaster.objects.filter')
+    def test_moved_invoice_reports_the_slice_it_left(self, mock_filter):
+        # As stored, possibly changed by another writer since this instance was loaded
+        mock_filter.return_value.values_list.return_value.first.return_value = (
+            datetime(2024, 5, 1, 8, tzinfo=dt_timezone.utc), 7
+        )
+        invoice = stored_invoice(1, datetime(2024, 4, 28, 8, tzinfo=dt_timezone.utc), 6)
+        invoice.createdAt = datetime(2024, 5, 3, 8, tzinfo=dt_timezone.utc)
+        invoice.customerOrVendorID_id = 8
+
+        self.assertEqual(facts.stored_slice(invoice), (date(2024, 5, 1), 7))
+        self.assertEqual(facts.invoice_slice(invoice), (date(2024, 5, 3), 8))
+        mock_filter.assert_called_once_with(pk=1)
+
+    @patch('core.facts.InvoiceMaster.objects.filter')
+    def test_new_invoice_has_no_stored_slice(self, mock_filter):
+        invoice = InvoiceMaster(createdAt=datetime(2024, 5, 1, 8, tzinfo=dt_timezone.utc), customerOrVendorID_id=7)
+
+        self.assertIsNone(facts.stored_slice(invoice))
+        mock_filter.assert_not_called()
+
+    @patch('core.facts.InvoiceDetail.objects.filter')
+    def test_line_uses_its_loaded_invoice(self, mock_line_filter):
+        mock_line_filter.return_value.values_list.return_value.first.return_value = 1
+        invoice = stored_invoice(1, datetime(2024, 5, 1, 8, tzinfo=dt_timezone.utc), 7)
+        line = InvoiceDetail(pk=5, invoiceMasterID=invoice)
+        line._state.adding = False
+
+        self.assertEqual(facts.invoice_slice(line), (date(2024, 5, 1), 7))
+        # Still on the same invoice: nothing extra to rebuild
+        self.assertIsNone(facts.stored_slice(line))
+        mock_line_filter.assert_called_once_with(pk=5)
+
+    @patch('core.facts.InvoiceMaster.objects.filter')
+    @patch('core.facts.InvoiceDetail.objects.filter')
+    def test_line_moved_to_another_invoice_reports_the_old_one(self, mock_line_filter, mock_filter):
+        mock_line_filter.return_value.values_list.return_value.first.return_value = 1
+        mock_filter.return_value.values_list.return_value.first.return_value = (
+            datetime(2024, 4, 30, 8, tzinfo=dt_timezone.utc), 3
+        )
+        line = stored_line(5, 2)
+
+        self.assertEqual(facts.stored_slice(line), (date(2024, 4, 30), 3))
+        mock_filter.assert_called_once_with(pk=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import django
+import unittest
+from unittest.mock import MagicMock, patch
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tantawy.settings')
+django.setup()
+
+from core import rankings
+from core.reports.views import top_customers
+
+
+class TestTopCustomersLimit(unittest.TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        # Computed directly, without the report cache
+        patcher = patch('core.reports.views.report_cache.get_or_compute',
+                        side_effect=lambda name, params, compute: compute())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = patch('core.reports.views.rankings.top_customers', return_value=[])
+        self.mock_top_customers = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = patch('core.reports.views.rankings.net_sales_total', return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = patch('core.reports.views.render', return_value=HttpResponse())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, limit):
+        request = self.factory.get('/reports/top-customers/', {'limit': limit})
+        request.user = MagicMock(is_authenticated=True)
+        return top_customers(request)
+
+    def test_non_positive_limit_is_rejected(self):
+        for limit in ('0', '-5'):
+            response = self.get(limit)
+
+            self.assertEqual(response.status_code, 400)
+        self.mock_top_customers.assert_not_called()
+
+    def test_large_limit_is_capped(self):
+        response = self.get('100000')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.mock_top_customers.call_args.kwargs['limit'], rankings.MAX_TOP_CUSTOMERS)
+
+    def test_all_ranks_every_customer(self):
+        response = self.get('all')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(self.mock_top_customers.call_args.kwargs['limit'])
+
+
+if __name__ == '__main__':
+    unittest.main()
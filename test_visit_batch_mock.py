@@ -0,0 +1,68 @@
+import os
+import django
+import unittest
+from itertools import count
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+from django.utils import timezone
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tantawy.settings')
+django.setup()
+
+from rest_framework.test import APIRequestFactory
+
+from core.models import Agent
+from core.views import batch_create_visits
+
+
+_ids = count(1)
+
+
+def fake_save_table(instance, *args, **kwargs):
+    """Visit._save_table without the database: the row gets an id, signals still run."""
+    instance.pk = next(_ids)
+    return True
+
+
+class TestBatchCreateVisits(unittest.TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.agent = Agent(pk=7, agentName='Test Agent', agentUsername='agent7', isActive=True)
+
+        for target, kwargs in (
+            ('core.agent_auth.authenticate', {'return_value': self.agent}),
+            ('django.db.transaction.atomic', {'return_value': MagicMock()}),
+            ('core.models.Visit._save_table', {'autospec': True, 'side_effect': fake_save_table}),
+        ):
+            patcher = patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        patcher = patch('core.live.record_posting')
+        self.mock_record_posting = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, visits):
+        request = self.factory.post('/api/visits/batch-create/', {'visits': visits}, format='json')
+        return batch_create_visits(request)
+
+    def test_string_dates_are_created(self):
+        now = timezone.localtime()
+        response = self.post([
+            {'transType': 1, 'date': now.isoformat(), 'latitude': 30.05, 'longitude': 31.23},
+            # Without an offset: read in the local time zone
+            {'transType': 1, 'date': (now - timedelta(days=1)).replace(tzinfo=None).isoformat(),
+             'latitude': 30.05, 'longitude': 31.23},
+        ])
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['data']['totalVisits'], 2)
+        self.assertEqual(
+            [call.args for call in self.mock_record_posting.call_args_list],
+            [(7, now.date()), (7, now.date() - timedelta(days=1))],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()